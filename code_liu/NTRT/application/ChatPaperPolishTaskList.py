@@ -7,6 +7,7 @@
 """
 from sqlalchemy import Column, DateTime, Integer, JSON, text
 from sqlalchemy.dialects.mysql import TEXT, TINYINT, VARCHAR
+from sqlalchemy.orm import deferred
 from application.web_utils.base_mysql import Base, BaseCRUD
 
 
@@ -19,8 +20,8 @@ class ChatPaperPolishTaskList(Base):
     user_id = Column(Integer, nullable=False, index=True, comment='用户ID')
     task_name = Column(VARCHAR(255), nullable=False, comment='任务名称')
     task_type = Column(VARCHAR(32), nullable=False, server_default=text("'paper_polish'"), comment='任务类型，取值["paper_polish"(论文润色), "paper_proofread"(论文校对)]')
-    paper_url = Column(JSON, nullable=False,
-                       comment='论文文件存储地址，以数组方式记录，格式如{"bucket_name":"文件存储的bucket名称", "file_path":"文件在bucket下的存储路径"}，用户上传文件存储在OSS的medpeer-article下的ai_paper目录中')
+    paper_url = deferred(Column(JSON, nullable=False,
+                                comment='论文文件存储地址，以数组方式记录，格式如{"bucket_name":"文件存储的bucket名称", "file_path":"文件在bucket下的存储路径"}，用户上传文件存储在OSS的medpeer-article下的ai_paper目录中'))
     paper_length = Column(Integer, nullable=False, server_default=text("'0'"), comment='论文字符数，0为总量待定')
     yanzhi_consumption = Column(Integer, nullable=False, server_default=text("'0'"),
                                 comment='研值消耗情况，0为消耗数额待定')
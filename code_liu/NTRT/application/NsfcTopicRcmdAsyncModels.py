@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 16:08
+# @User  : 刘子都
+# @Description  : 国自然选题推荐任务表的异步CRUD，供高并发接口在事件循环中使用
+"""
+from async_base_mysql import AsyncBaseCRUD
+from application.NsfcTopicRcmdModels import (
+    NsfcTopicRcmdTaskList,
+    NsfcTopicRcmdTaskTopicList,
+    NsfcTopicRcmdTaskAppInfo
+)
+
+
+class AsyncNsfcTopicRcmdTaskListModel(AsyncBaseCRUD):
+    """任务列表异步CRUD操作"""
+    model = NsfcTopicRcmdTaskList
+
+
+class AsyncNsfcTopicRcmdTaskTopicListModel(AsyncBaseCRUD):
+    """主题列表异步CRUD操作"""
+    model = NsfcTopicRcmdTaskTopicList
+
+
+class AsyncNsfcTopicRcmdTaskAppInfoModel(AsyncBaseCRUD):
+    """应用信息异步CRUD操作"""
+    model = NsfcTopicRcmdTaskAppInfo
@@ -5,8 +5,12 @@
 # @User  : 刘子都
 # @Description  : 国自然选题推荐数据清洗模块ORM模型
 """
-from sqlalchemy import Column, Integer, JSON
-from base_mysql import Base, BaseCRUD
+from sqlalchemy import (
+    Column, Integer, JSON, String, and_, bindparam, case, cast, exists, func, literal_column, not_, select, text,
+    type_coerce, update
+)
+from sqlalchemy.orm import deferred
+from base_mysql import Base, BaseCRUD, json_serializer
 
 
 class NsfcTopicRcmdTaskList(Base):
@@ -17,7 +21,8 @@ class NsfcTopicRcmdTaskList(Base):
     }
 
     list_id = Column(Integer, primary_key=True, comment='列表ID', autoincrement=True)
-    breadth_search = Column(JSON, comment='广度搜索结果，JSON格式')
+    # 大字段默认延迟加载，只在显式查询该列或 undefer 时读取
+    breadth_search = deferred(Column(JSON, comment='广度搜索结果，JSON格式'))
 
 
 class NsfcTopicRcmdTaskTopicList(Base):
@@ -28,7 +33,8 @@ class NsfcTopicRcmdTaskTopicList(Base):
     }
 
     list_id = Column(Integer, primary_key=True, comment='列表ID', autoincrement=True)
-    cited_articles = Column(JSON, comment='引用文献，JSON格式')
+    # 大字段默认延迟加载，只在显式查询该列或 undefer 时读取
+    cited_articles = deferred(Column(JSON, comment='引用文献，JSON格式'))
 
 
 class NsfcTopicRcmdTaskAppInfo(Base):
@@ -39,7 +45,8 @@ class NsfcTopicRcmdTaskAppInfo(Base):
     }
 
     list_id = Column(Integer, primary_key=True, comment='列表ID', autoincrement=True)
-    cited_articles = Column(JSON, comment='引用文献，JSON格式')
+    # 大字段默认延迟加载，只在显式查询该列或 undefer 时读取
+    cited_articles = deferred(Column(JSON, comment='引用文献，JSON格式'))
 
 
 class CleaningModelMixin(BaseCRUD):
@@ -83,13 +90,98 @@ class CleaningModelMixin(BaseCRUD):
             ]
         return []
 
-    def batch_update_field(self, db, field_name, updates, batch_size=100):
+    def get_id_bounds(self, db, field_name, extra_filters=None):
+        """查询需要清洗的记录的 list_id 范围，用于并行清洗时划分区间。
+
+        :param db: 数据库会话
+        :param field_name: 目标字段名
+        :param extra_filters: 额外过滤条件列表
+        :return: (最小 list_id, 最大 list_id)，没有记录时为 (None, None)
+        """
+        if self.model is None:
+            raise ValueError("未设置模型类，无法执行查询。")
+
+        where_conditions = [getattr(self.model, field_name).isnot(None)]
+        if extra_filters:
+            where_conditions.extend(extra_filters)
+
+        min_id, max_id = db.query(
+            func.min(self.model.list_id), func.max(self.model.list_id)
+        ).filter(*where_conditions).one()
+        return min_id, max_id
+
+    def count_records_for_cleaning(self, db, field_name, extra_filters=None):
+        """统计需要清洗的记录数。
+
+        :param db: 数据库会话
+        :param field_name: 目标字段名
+        :param extra_filters: 额外过滤条件列表
+        :return: 记录数
+        """
+        if self.model is None:
+            raise ValueError("未设置模型类，无法执行查询。")
+
+        where_conditions = [getattr(self.model, field_name).isnot(None)]
+        if extra_filters:
+            where_conditions.extend(extra_filters)
+        return self.get_count_info(db, where_conditions)
+
+    def iter_records_for_cleaning(self, db, field_name, extra_filters=None, batch_size=100, after_id=None, end_id=None,
+                                  raw=False):
+        """按主键游标（list_id > last_id）流式分页读取需要清洗的记录。
+
+        每页都从上一页最后一个 list_id 之后开始查询，代价与页码深度无关；
+        清洗后不再满足过滤条件的记录也不会导致后续页跳行或重复。
+        单页查询使用服务端游标（yield_per / stream_results）逐块读取，读完整页后再交给调用方，
+        保证同一连接上的 UPDATE 不会与未读完的结果集冲突。
+
+        :param db: 数据库会话
+        :param field_name: 目标字段名
+        :param extra_filters: 额外过滤条件列表
+        :param batch_size: 每页记录数
+        :param after_id: 起始游标（不包含），为 None 时从头开始
+        :param end_id: 结束 list_id（包含），为 None 时读到表尾
+        :param raw: 为 True 时 JSON 字段按原始文本返回、不做反序列化（试运行分阶段计时用）
+        :return: 逐页产出的记录列表，格式为 [{'id': record_id, field_name: field_value}, ...]
+        """
+        if self.model is None:
+            raise ValueError("未设置模型类，无法执行查询。")
+
+        field_column = getattr(self.model, field_name)
+        select_column = type_coerce(field_column, String).label(field_name) if raw else field_column
+        where_conditions = [field_column.isnot(None)]
+        if extra_filters:
+            where_conditions.extend(extra_filters)
+        if end_id is not None:
+            where_conditions.append(self.model.list_id <= end_id)
+
+        last_id = after_id
+        while True:
+            query = db.query(self.model).with_entities(self.model.list_id, select_column).filter(*where_conditions)
+            if last_id is not None:
+                query = query.filter(self.model.list_id > last_id)
+            query = query.order_by(self.model.list_id.asc()).limit(batch_size).yield_per(batch_size)
+
+            page = [{'id': row.list_id, field_name: row._mapping[field_name]} for row in query]
+            if not page:
+                return
+
+            yield page
+            last_id = page[-1]['id']
+            if len(page) < batch_size:
+                return
+
+    def batch_update_field(self, db, field_name, updates, batch_size=100, with_history=False):
         """批量更新字段。
 
+        默认每个批次只执行一条 `UPDATE ... SET field = CASE list_id WHEN ... END WHERE list_id IN (...)`，
+        不先查询记录、也不读取历史快照；需要 `update_data_info` 的历史信息时传入 with_history=True，按条更新。
+
         :param db: 数据库会话
         :param field_name: 更新字段名
         :param updates: 待写入的 (id, processed_data) 列表
         :param batch_size: 批量处理大小
+        :param with_history: 是否逐条读取历史数据后更新
         :return: 受影响的行数
         :author: LZD
         :date: 2025/11/10
@@ -100,6 +192,9 @@ class CleaningModelMixin(BaseCRUD):
         if not updates:
             return 0
 
+        if not with_history:
+            return self._bulk_update_by_id(db, field_name, updates, batch_size)
+
         total_rows = 0
         # 按批次执行更新
         for start in range(0, len(updates), batch_size):
@@ -117,11 +212,200 @@ class CleaningModelMixin(BaseCRUD):
 
         return total_rows
 
+    def _bulk_update_by_id(self, db, field_name, updates, batch_size=100):
+        """按 list_id 用单条 CASE 语句批量更新，每个批次一次往返。
+
+        pymysql 的 executemany 只会合并 INSERT，UPDATE 仍是逐条往返，因此这里拼成一条 CASE 语句。
+
+        :param db: 数据库会话
+        :param field_name: 更新字段名
+        :param updates: 待写入的 (id, processed_data) 列表
+        :param batch_size: 批量处理大小
+        :return: 匹配到的行数（驱动不支持时按提交条数计）
+        """
+        table = self.model.__table__
+        column = table.c[field_name]
+
+        total_rows = 0
+        for start in range(0, len(updates), batch_size):
+            chunk = dict(updates[start:start + batch_size])
+
+            # 值按字段类型绑定（JSON 字段会先序列化），同一批次内重复的 id 以最后一次为准
+            whens = {
+                record_id: bindparam(None, processed_data, type_=column.type)
+                for record_id, processed_data in chunk.items()
+            }
+            statement = (
+                update(table)
+                .where(table.c.list_id.in_(list(chunk)))
+                .values({field_name: case(whens, value=table.c.list_id)})
+            )
+            result = db.execute(statement)
+            total_rows += result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(chunk)
+
+        return total_rows
+
 
 class NsfcTopicRcmdTaskListModel(CleaningModelMixin):
     """任务列表CRUD操作"""
     model = NsfcTopicRcmdTaskList
 
+    @classmethod
+    def _breadth_search_expressions(cls):
+        """构造 breadth_search 下推清洗用到的 MySQL JSON 表达式。
+
+        :return: (article_addition 表达式, 是否含项目数据的条件)
+        """
+        column = cls.model.__table__.c.breadth_search
+
+        # article_addition 不是对象时与 Python 清洗一致，按空对象处理
+        article_addition = func.json_extract(column, '$.article_addition')
+        article_expr = case(
+            (func.coalesce(func.json_type(article_addition), '') == 'OBJECT', article_addition),
+            else_=func.json_object()
+        )
+
+        # 路径不存在时 JSON_TYPE/JSON_LENGTH 返回 NULL，用 COALESCE 保证 NOT 条件可用
+        project_addition = func.json_extract(column, '$.project_addition')
+        has_projects = and_(
+            func.coalesce(func.json_type(project_addition), '') == 'OBJECT',
+            func.coalesce(func.json_length(project_addition), 0) > 0
+        )
+        return article_expr, has_projects
+
+    @classmethod
+    def has_non_object_articles(cls):
+        """article_addition 中存在非对象条目的条件。
+
+        JSON 路径无法按类型过滤，下推时无法像 Python 清洗那样丢弃这些条目，
+        因此下推两步都排除这类记录，由调用方交给 Python 清洗（MySQL 8.0+，依赖 JSON_TABLE）。
+
+        :return: EXISTS 条件
+        """
+        table = cls.model.__table__
+        column_ref = f"`{table.name}`.`{table.c.breadth_search.name}`"
+        article_values = text(
+            f"JSON_TABLE(JSON_EXTRACT({column_ref}, '$.article_addition.*'), '$[*]' "
+            "COLUMNS (article_value JSON PATH '$')) AS article_values"
+        )
+        return exists(
+            select(literal_column('1'))
+            .select_from(article_values)
+            .where(text("COALESCE(JSON_TYPE(article_values.article_value), '') <> 'OBJECT'"))
+        )
+
+    def merge_article_only_rows(self, db, extra_filters=None, limit=1000):
+        """在 MySQL 内完成不含项目数据的记录的清洗：breadth_search 直接替换为 article_addition。
+
+        单条 `UPDATE ... LIMIT n`，数据不经过网络；已更新的记录不再满足过滤条件，调用方循环到返回值小于 limit 即可。
+        article_addition 含非对象条目的记录不在此处理（见 `has_non_object_articles`）。
+
+        :param db: 数据库会话
+        :param extra_filters: 额外过滤条件列表
+        :param limit: 单次更新的最大行数
+        :return: 匹配到的行数
+        """
+        table = self.model.__table__
+        article_expr, has_projects = self._breadth_search_expressions()
+
+        where_conditions = [
+            table.c.breadth_search.isnot(None), not_(has_projects), not_(self.has_non_object_articles())
+        ]
+        if extra_filters:
+            where_conditions.extend(extra_filters)
+
+        statement = (
+            update(table)
+            .where(*where_conditions)
+            .values({table.c.breadth_search: article_expr})
+            .with_dialect_options(mysql_limit=limit)
+        )
+        result = db.execute(statement)
+        return result.rowcount if result.rowcount is not None and result.rowcount >= 0 else 0
+
+    def iter_project_additions(self, db, extra_filters=None, batch_size=100, after_id=None):
+        """按 list_id 游标分页读取含项目数据的记录，只取 project_addition 部分。
+
+        :param db: 数据库会话
+        :param extra_filters: 额外过滤条件列表
+        :param batch_size: 每页记录数
+        :param after_id: 起始游标（不包含），为 None 时从头开始
+        :return: 逐页产出的记录列表，格式为 [{'id': record_id, 'project_addition': {...}}, ...]
+        """
+        table = self.model.__table__
+        _, has_projects = self._breadth_search_expressions()
+
+        # 按 JSON 类型取回，结果由引擎的 json_deserializer 解码
+        project_addition = type_coerce(
+            func.json_extract(table.c.breadth_search, '$.project_addition'), JSON
+        ).label('project_addition')
+
+        # 文章部分在服务端合并，同样排除含非对象文章条目的记录
+        where_conditions = [
+            table.c.breadth_search.isnot(None), has_projects, not_(self.has_non_object_articles())
+        ]
+        if extra_filters:
+            where_conditions.extend(extra_filters)
+
+        last_id = after_id
+        while True:
+            query = db.query(table.c.list_id, project_addition).filter(*where_conditions)
+            if last_id is not None:
+                query = query.filter(table.c.list_id > last_id)
+            query = query.order_by(table.c.list_id.asc()).limit(batch_size).yield_per(batch_size)
+
+            page = [{'id': row.list_id, 'project_addition': row.project_addition} for row in query]
+            if not page:
+                return
+
+            yield page
+            last_id = page[-1]['id']
+            if len(page) < batch_size:
+                return
+
+    def merge_project_entries(self, db, updates, batch_size=100):
+        """把 Python 端标准化后的项目条目合并回 article_addition，并替换 breadth_search。
+
+        每条记录生成 `JSON_INSERT(article_addition, '$."object_id"', CAST(? AS JSON), ...)`，
+        JSON_INSERT 不覆盖已有键，与 Python 清洗中文章条目覆盖同名项目条目的顺序一致；
+        文章部分始终留在服务端，每个批次一条 CASE 语句。
+
+        :param db: 数据库会话
+        :param updates: 待写入的 (id, {object_id: project_info}) 列表
+        :param batch_size: 批量处理大小
+        :return: 匹配到的行数（驱动不支持时按提交条数计）
+        """
+        if not updates:
+            return 0
+
+        table = self.model.__table__
+        article_expr, _ = self._breadth_search_expressions()
+
+        total_rows = 0
+        for start in range(0, len(updates), batch_size):
+            chunk = dict(updates[start:start + batch_size])
+
+            whens = {}
+            for record_id, project_entries in chunk.items():
+                arguments = []
+                for object_id, project_info in project_entries.items():
+                    path = '$."{}"'.format(str(object_id).replace('\\', '\\\\').replace('"', '\\"'))
+                    arguments.extend([
+                        bindparam(None, path, type_=String),
+                        cast(bindparam(None, json_serializer(project_info), type_=String), JSON),
+                    ])
+                whens[record_id] = func.json_insert(article_expr, *arguments) if arguments else article_expr
+
+            statement = (
+                update(table)
+                .where(table.c.list_id.in_(list(chunk)))
+                .values({table.c.breadth_search: case(whens, value=table.c.list_id)})
+            )
+            result = db.execute(statement)
+            total_rows += result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(chunk)
+
+        return total_rows
+
 
 class NsfcTopicRcmdTaskTopicListModel(CleaningModelMixin):
     """主题列表CRUD操作"""
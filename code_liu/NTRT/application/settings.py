@@ -7,6 +7,7 @@
 """
 
 # Database
+# 单个数据库可增加 'POOL': {'POOL_SIZE': 10, 'POOL_PRE_PING': False} 覆盖连接池参数，可用键见 base_mysql.DEFAULT_POOL_OPTIONS
 DATABASES = {
     'default': {
         # 测试服转移至79，由于模型配置由系统组编写，且使用该数据库
@@ -45,4 +46,11 @@ DATABASES = {
         'NAME': 'medicine_test',  # 数据库名
         'CHARSET': 'utf8mb4',  # 字符集
     },
-}
\ No newline at end of file
+}
+
+# 所有数据库共用的连接池参数，覆盖 base_mysql.DEFAULT_POOL_OPTIONS 中的同名项
+DATABASE_POOL = {}
+
+# 为 True 时导入 base_mysql 不创建引擎（也不导入 pymysql），首次使用某个数据库别名时再创建；
+# 设为 False 可在启动时一次性创建全部引擎
+DATABASE_LAZY_INIT = True
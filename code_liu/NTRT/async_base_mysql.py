@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 16:08
+# @User  : 刘子都
+# @Descriotion  :MySQL数据库异步连接工具（sqlalchemy.ext.asyncio + aiomysql/asyncmy）
+                 AsyncBaseCRUD 与 base_mysql.BaseCRUD 方法一致，全部改为协程，便于在同一事件循环中并发查询
+                 需要额外安装 greenlet 与 aiomysql（或 asyncmy）
+"""
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import sessionmaker, undefer
+from sqlalchemy.orm.attributes import flag_modified
+
+from application.settings import DATABASES
+from base_mysql import (
+    LazySessionDict,
+    apply_cursor_pagination,
+    build_cursor_page,
+    estimated_count_statement,
+    get_database_url,
+    get_engine_options
+)
+
+# 默认异步驱动，单个数据库可在配置中用 'ASYNC_DRIVER': 'asyncmy' 覆盖
+DEFAULT_ASYNC_DRIVER = "aiomysql"
+
+
+def create_async_database_engine(database_key, **overrides):
+    """
+    按配置创建异步数据库引擎，连接池参数与同步引擎一致
+    :param str database_key:数据库别名
+    :param any overrides:临时覆盖的连接池参数，键同 base_mysql.DEFAULT_POOL_OPTIONS
+    :return: AsyncEngine
+    """
+    driver = DATABASES[database_key].get("ASYNC_DRIVER", DEFAULT_ASYNC_DRIVER)
+    return create_async_engine(
+        get_database_url(database_key, driver), **get_engine_options(database_key, **overrides)
+    )
+
+
+def create_async_session_local(database_key):
+    """
+    创建数据库别名对应的 AsyncSessionLocal 类
+    :param str database_key:数据库别名
+    :return: sessionmaker（class_=AsyncSession）
+    """
+    # 提交后不过期对象，避免在协程外访问属性时触发隐式 IO；
+    # 用 sessionmaker(class_=AsyncSession) 而非 2.0 才有的 async_sessionmaker，兼容 SQLAlchemy 1.4
+    return sessionmaker(
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False,
+        bind=create_async_database_engine(database_key),
+    )
+
+
+# 异步会话工厂，首次按别名取值时创建引擎，用法：async with async_session_dict['medicine']() as db: ...
+async_session_dict = LazySessionDict(DATABASES, session_factory=create_async_session_local)
+
+
+class AsyncBaseCRUD:
+    model = None
+
+    async def create_single_info(self, db, create_data, create_cond, **extra_param):
+        """
+        单条创建信息
+        :param AsyncSession db:
+        :param dict create_data:创建时使用的数据
+        :param list create_cond:数据查询条件
+        :param any extra_param:额外参数，用于拓展字段
+        :return:
+        """
+        if not all([create_data, create_cond]):
+            return {"result": False, "msg": "传入参数为空！"}
+
+        existing_record = (await db.execute(select(self.model).filter(*create_cond).limit(1))).scalars().first()
+        if existing_record:
+            return {"result": False, "msg": "数据已经存在！"}
+
+        # 不存在，则执行创建
+        create_res = self.model(**create_data)
+        db.add(create_res)
+
+        # 判断是否提交
+        if extra_param.get("is_commit", True):
+            await db.commit()
+            await db.refresh(create_res)
+
+        return {"result": True, "msg": "ok！"}
+
+    async def create_single(self, db, create_data, **extra_param):
+        """
+        单条创建信息不判重
+        :param AsyncSession db:
+        :param dict create_data:创建时使用的数据
+        :param any extra_param:额外参数，用于拓展字段
+            auto_field=>"返回的自增ID字段"
+        :return:
+        """
+        if not create_data:
+            return {"result": False, "msg": "传入参数为空！"}
+
+        # 获取额外字段
+        auto_field = extra_param.get("auto_field", None)
+
+        create_res = self.model(**create_data)
+        db.add(create_res)
+        await db.commit()
+        await db.refresh(create_res)
+
+        # 获取自增ID
+        auto_field_val = None
+        if auto_field:
+            auto_field_val = getattr(create_res, auto_field)
+
+        return {"result": True, "msg": "ok！", "data": auto_field_val}
+
+    async def batch_create_info(self, db, create_list, **extra_param):
+        """
+        批量创新数据不判重
+        :param AsyncSession db:
+        :param list create_list:待插入的数据
+        :param extra_param:
+        :return:
+        """
+        if not create_list:
+            return {"result": False, "msg": "传入参数为空！"}
+
+        # 插入数据（AsyncSession 没有 bulk_insert_mappings，使用 ORM 批量 INSERT）
+        await db.execute(insert(self.model), create_list)
+        await db.commit()
+
+        return {"result": True, "msg": "ok！"}
+
+    async def update_data_info(self, db, update_data, update_cond, **extra_param):
+        """
+        修改目标数据
+        :param AsyncSession db:
+        :param dict update_data:待修改数据
+        :param list update_cond:修改条件
+        :param any extra_param:额外参数，用于拓展字段；full_history 为 True 时加载全部延迟字段
+        :return: history 为修改前的数据：默认只含非延迟字段与待修改字段（未修改的延迟加载 JSON 大字段不包含），
+            需要完整旧行（如记录或比对全部字段）时传 full_history=True
+        """
+        if not all([update_data, update_cond]):
+            return {"result": False, "msg": "传入参数为空！"}
+
+        # 检查数据是否存在（默认只额外加载待修改字段，其余延迟加载的大字段不读取）
+        undefer_options = self._undefer_options(update_data, extra_param.get("full_history", False))
+        query = select(self.model).options(*undefer_options).filter(*update_cond).limit(1)
+        exist = (await db.execute(query)).scalars().first()
+        if not exist:
+            return {"result": False, "msg": "待修改的数据不存在！"}
+
+        # 获取历史信息
+        history_dict = self._get_model_dict(exist)
+
+        # 更新数据
+        for key, value in update_data.items():
+            setattr(exist, key, value)
+            flag_modified(exist, key)
+
+        # 判断是否提交
+        if extra_param.get("is_commit", True):
+            await db.commit()
+
+        return {"result": True, "msg": "数据修改成功！", "history": history_dict}
+
+    async def get_single_info(self, db, field, where=None, **extra_param):
+        """
+        单条查询信息
+        :param AsyncSession db:
+        :param list field:查询字段 [model.Column]
+        :param list where:查询条件 [MyModel.field1 == 'some_value', MyModel.field2 > 10]
+        :param any extra_param:额外参数，用于拓展字段
+            order=>查询条件
+        :return:
+        """
+        if not field:
+            return {"result": False, "msg": "传入参数为空！"}
+
+        # 获取额外参数
+        order = extra_param.get("order")  # 排序条件
+
+        query = select(*field).select_from(self.model)
+
+        if where:
+            query = query.filter(*where)
+
+        # 加入排序条件
+        if order:
+            query = query.order_by(*order)
+
+        # 判断数据是否存在
+        query_res = (await db.execute(query.limit(1))).first()
+        if not query_res:
+            return {"result": False, "msg": "相关数据不存在！", "data": {}}
+
+        return {"result": True, "msg": "查询成功！", "data": query_res._mapping}
+
+    async def get_list_info(self, db, field, where=None, first_row=None, list_rows=None, order=None, **extra_param):
+        """
+        获取列表信息
+        :param AsyncSession db:
+        :param list field:查询字段 [model.Column]
+        :param list where:查询条件 [MyModel.field1 == 'some_value', MyModel.field2 > 10]
+        :param int|None first_row:起始行数
+        :param int|None list_rows:每页显示行数
+        :param tuple order:排序字段
+        :param any extra_param:额外参数，用于拓展字段（同 BaseCRUD.get_list_info）
+            cursor_field=>游标字段（唯一且有序，如主键，需包含在 field 中），传入后使用游标分页，忽略 first_row 与 order
+            cursor=>上一页返回的 next_cursor，首页为 None
+            cursor_desc=>是否降序翻页
+            estimated_count=>是否返回 information_schema 估算总数（estimated_total）
+        """
+        if not field:
+            return {"result": False, "msg": "传入参数为空！"}
+
+        # 获取额外参数
+        cursor_field = extra_param.get("cursor_field")
+        if cursor_field is not None and cursor_field.key not in {getattr(item, "key", None) for item in field}:
+            return {"result": False, "msg": "游标字段必须包含在查询字段中！"}
+
+        query = select(*field).select_from(self.model)
+
+        if where:
+            query = query.filter(*where)
+
+        if cursor_field is not None:
+            # 游标分页：多取一行判断是否有下一页
+            query = apply_cursor_pagination(
+                query, cursor_field, extra_param.get("cursor"), list_rows, extra_param.get("cursor_desc", False)
+            )
+        else:
+            # 加入排序条件
+            if order:
+                query = query.order_by(*order)
+
+            # 加入分页信息
+            if first_row:
+                query = query.offset(first_row)
+            if list_rows:
+                query = query.limit(list_rows)
+
+        # 判断数据是否存在
+        query_res = (await db.execute(query)).all()
+        res = {"result": True, "msg": "ok！", "data": []}
+        if cursor_field is not None:
+            query_res, res["next_cursor"], res["has_more"] = build_cursor_page(query_res, cursor_field.key, list_rows)
+        if extra_param.get("estimated_count"):
+            res["estimated_total"] = await self.get_estimated_count(db)
+        if not query_res:
+            res["msg"] = "相关数据不存在！"
+            return res
+
+        # 组织返回数据
+        buf = []
+        for query_item in query_res:
+            buf.append(query_item._mapping)
+
+        res["data"] = buf
+        return res
+
+    async def get_count_info(self, db, where=None):
+        """
+        获取数据库查询数量
+        :param AsyncSession db:
+        :param where:
+        :return:
+        """
+        query = select(func.count()).select_from(self.model)
+        if where:
+            # 组织查询条件
+            query = query.filter(*where)
+
+        # 返回查询结果
+        return (await db.execute(query)).scalar_one()
+
+    async def get_estimated_count(self, db):
+        """
+        获取表的估算行数（information_schema.TABLES.TABLE_ROWS），用于列表页展示总数
+        :param AsyncSession db:
+        :return: 估算行数，无统计信息时为 None
+        """
+        return (await db.execute(estimated_count_statement(self.model))).scalar()
+
+    @staticmethod
+    def _get_model_dict(model_object):
+        """
+        获取模型类的字典格式
+        :param model_object:sqlalchemy模型实例
+        :return:
+        """
+        buf = {}
+        state = inspect(model_object)
+        for c in state.mapper.column_attrs:
+            # 未加载的延迟字段不读取，避免为历史信息额外查询大字段
+            if c.key in state.unloaded:
+                continue
+            buf[c.key] = getattr(model_object, c.key)
+
+        return buf
+
+    def _undefer_options(self, update_data, full_history=False):
+        """
+        待修改字段的 undefer 选项，使其旧值随主查询一起加载
+        :param dict update_data:待修改数据
+        :param bool full_history:是否加载全部延迟字段
+        :return:
+        """
+        column_keys = [c.key for c in inspect(self.model).column_attrs]
+        keys = column_keys if full_history else [key for key in update_data if key in column_keys]
+        return [undefer(getattr(self.model, key)) for key in keys]
@@ -5,35 +5,217 @@
 # @User  : Mabin
 # @Descriotion  :MySQL数据库连接工具
 """
-from sqlalchemy import create_engine
+import json
+import threading
+
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm.attributes import flag_modified
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, undefer
 from sqlalchemy.ext.declarative import declarative_base
-from application.settings import DATABASES
+from application.settings import DATABASES, DATABASE_POOL, DATABASE_LAZY_INIT
 from sqlalchemy.inspection import inspect
 from sqlalchemy.orm.decl_api import DeclarativeMeta
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库
+    orjson = None
+
 # 数据库模型或类（ORM 模型）的基类
 Base = declarative_base()
 
-# 初始化数据库连接
-session_dict = {}
-for database_key, database_item in DATABASES.items():
-    # 组织数据库链接
-    tmp_database_url = f"mysql+pymysql://{database_item['USER']}:{database_item['PASSWORD']}" \
-                       f"@{database_item['HOST']}:{database_item['PORT']}/{database_item['NAME']}" \
-                       f"?charset={database_item['CHARSET']}"
-
-    # 创建 SQLAlchemy 引擎
-    engine = create_engine(
-        tmp_database_url, pool_pre_ping=True,
-        # poolclass=NullPool
-    )
-
-    # 创建SessionLocal类
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-    session_dict[database_key] = SessionLocal
+# 连接池默认参数：settings.DATABASE_POOL 整体覆盖，单个数据库配置中的 'POOL' 再单独覆盖
+DEFAULT_POOL_OPTIONS = {
+    'POOL_SIZE': 5,  # 常驻连接数
+    'MAX_OVERFLOW': 10,  # 超出常驻连接数后允许临时创建的连接数
+    'POOL_TIMEOUT': 30,  # 等待空闲连接的超时（秒）
+    'POOL_RECYCLE': 3600,  # 连接最长复用时间（秒），应小于 MySQL wait_timeout
+    'POOL_PRE_PING': True,  # 每次检出前 ping 一次，多一次往返；已配置 POOL_RECYCLE 时可关闭
+    'QUERY_CACHE_SIZE': 500,  # SQLAlchemy 编译语句缓存大小
+}
+
+
+def json_serializer(value):
+    """
+    JSON 字段序列化（优先 orjson，不支持的类型或未安装时回退标准库）
+    :param any value:待写入 JSON 字段的 Python 对象
+    :return: JSON 字符串
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(value)
+
+
+def json_deserializer(value):
+    """
+    JSON 字段反序列化（优先 orjson，未安装时使用标准库）
+    :param str|bytes value:数据库返回的 JSON 文本
+    :return: Python 对象
+    """
+    if orjson is not None:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
+def get_pool_options(database_key, **overrides):
+    """
+    合并连接池参数（默认值 < settings.DATABASE_POOL < 数据库配置中的 POOL < overrides）
+    :param str database_key:数据库别名
+    :param any overrides:临时覆盖的参数，键同 DEFAULT_POOL_OPTIONS
+    :return: 连接池参数字典
+    """
+    options = dict(DEFAULT_POOL_OPTIONS)
+    options.update(DATABASE_POOL)
+    options.update(DATABASES[database_key].get('POOL') or {})
+    options.update(overrides)
+    return options
+
+
+def get_database_url(database_key, driver="pymysql"):
+    """
+    组织数据库链接
+    :param str database_key:数据库别名
+    :param str driver:MySQL 驱动，同步为 pymysql，异步为 aiomysql/asyncmy
+    :return: 数据库链接
+    """
+    database_item = DATABASES[database_key]
+    return f"mysql+{driver}://{database_item['USER']}:{database_item['PASSWORD']}" \
+           f"@{database_item['HOST']}:{database_item['PORT']}/{database_item['NAME']}" \
+           f"?charset={database_item['CHARSET']}"
+
+
+def get_engine_options(database_key, **overrides):
+    """
+    组织 create_engine / create_async_engine 的参数
+    :param str database_key:数据库别名
+    :param any overrides:临时覆盖的连接池参数，键同 DEFAULT_POOL_OPTIONS
+    :return: 引擎参数字典
+    """
+    options = get_pool_options(database_key, **overrides)
+    return {
+        "pool_size": options['POOL_SIZE'],
+        "max_overflow": options['MAX_OVERFLOW'],
+        "pool_timeout": options['POOL_TIMEOUT'],
+        "pool_recycle": options['POOL_RECYCLE'],
+        "pool_pre_ping": options['POOL_PRE_PING'],
+        "query_cache_size": options['QUERY_CACHE_SIZE'],
+        "json_serializer": json_serializer,
+        "json_deserializer": json_deserializer,
+    }
+
+
+def create_database_engine(database_key, **overrides):
+    """
+    按配置创建数据库引擎
+    :param str database_key:数据库别名
+    :param any overrides:临时覆盖的连接池参数，键同 DEFAULT_POOL_OPTIONS
+    :return: SQLAlchemy 引擎
+    """
+    return create_engine(get_database_url(database_key), **get_engine_options(database_key, **overrides))
+
+
+def create_session_local(database_key):
+    """
+    创建数据库别名对应的 SessionLocal 类
+    :param str database_key:数据库别名
+    :return: sessionmaker
+    """
+    return sessionmaker(autocommit=False, autoflush=False, bind=create_database_engine(database_key))
+
+
+class LazySessionDict(dict):
+    """
+    会话工厂字典：首次按别名取值时才创建引擎和 SessionLocal
+    只有已创建的别名会出现在 keys()/values()/items() 中
+    """
+
+    def __init__(self, database_keys, session_factory=create_session_local):
+        """
+        :param database_keys:可用的数据库别名
+        :param session_factory:按别名创建会话工厂的函数，默认创建同步 SessionLocal
+        """
+        super().__init__()
+        self._database_keys = set(database_keys)
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+
+    def __missing__(self, key):
+        if key not in self._database_keys:
+            raise KeyError(key)
+
+        with self._lock:
+            if dict.__contains__(self, key):
+                return dict.__getitem__(self, key)
+
+            # 创建SessionLocal类
+            session_local = self._session_factory(key)
+            self[key] = session_local
+            return session_local
+
+    def __contains__(self, key):
+        return key in self._database_keys or dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+# 初始化数据库连接（DATABASE_LAZY_INIT 为 True 时推迟到首次使用，导入本模块不会创建引擎、不会导入 pymysql）
+session_dict = LazySessionDict(DATABASES)
+if not DATABASE_LAZY_INIT:
+    for database_key in DATABASES:
+        session_dict.get(database_key)
+
+
+def apply_cursor_pagination(query, cursor_field, cursor=None, list_rows=None, cursor_desc=False):
+    """
+    为查询加上游标（keyset）分页条件：按 cursor_field 排序、从上一页最后一个值之后读取，多取一行用于判断是否还有下一页
+    Query 与 select() 均适用
+    :param query:查询对象
+    :param cursor_field:游标字段（唯一且有序，如主键）
+    :param any cursor:上一页返回的 next_cursor，首页为 None
+    :param int|None list_rows:每页行数
+    :param bool cursor_desc:是否降序翻页
+    :return: 加入分页条件后的查询对象
+    """
+    if cursor is not None:
+        query = query.filter(cursor_field < cursor if cursor_desc else cursor_field > cursor)
+    query = query.order_by(cursor_field.desc() if cursor_desc else cursor_field.asc())
+    if list_rows:
+        query = query.limit(list_rows + 1)
+    return query
+
+
+def build_cursor_page(query_res, cursor_key, list_rows=None):
+    """
+    截取游标分页结果并计算下一页游标
+    :param list query_res:多取一行后的查询结果
+    :param str cursor_key:游标字段名
+    :param int|None list_rows:每页行数
+    :return: (当前页结果, next_cursor, has_more)
+    """
+    has_more = bool(list_rows) and len(query_res) > list_rows
+    if has_more:
+        query_res = query_res[:list_rows]
+    next_cursor = query_res[-1]._mapping[cursor_key] if has_more else None
+    return query_res, next_cursor, has_more
+
+
+def estimated_count_statement(model):
+    """
+    information_schema 估算行数的查询语句（InnoDB 统计值，不受过滤条件影响，仅适合展示总数）
+    :param DeclarativeMeta model:sqlalchemy模型类
+    :return:
+    """
+    return text(
+        "SELECT TABLE_ROWS FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+    ).bindparams(table_name=model.__tablename__)
 
 
 class BaseCRUD:
@@ -117,14 +299,16 @@ class BaseCRUD:
         :param db :
         :param dict update_data:待修改数据
         :param list update_cond:修改条件
-        :param any extra_param:额外参数，用于拓展字段
-        :return:
+        :param any extra_param:额外参数，用于拓展字段；full_history 为 True 时加载全部延迟字段
+        :return: history 为修改前的数据：默认只含非延迟字段与待修改字段（未修改的延迟加载 JSON 大字段不包含），
+            需要完整旧行（如记录或比对全部字段）时传 full_history=True
         """
         if not all([update_data, update_cond]):
             return {"result": False, "msg": "传入参数为空！"}
 
-        # 检查数据是否存在
-        exist = db.query(self.model).filter(*update_cond).first()
+        # 检查数据是否存在（默认只额外加载待修改字段，其余延迟加载的大字段不读取）
+        undefer_options = self._undefer_options(update_data, extra_param.get("full_history", False))
+        exist = db.query(self.model).options(*undefer_options).filter(*update_cond).first()
         if not exist:
             return {"result": False, "msg": "待修改的数据不存在！"}
 
@@ -187,36 +371,58 @@ class BaseCRUD:
         :param tuple order:排序字段
         :param any extra_param:额外参数，用于拓展字段
             q_list=>Q查询列表（该查询用于实现or、and）
+            cursor_field=>游标字段（唯一且有序，如主键，需包含在 field 中），传入后使用游标分页，忽略 first_row 与 order
+            cursor=>上一页返回的 next_cursor，首页为 None
+            cursor_desc=>是否降序翻页
+            estimated_count=>是否返回 information_schema 估算总数（estimated_total），代替 get_count_info 的 COUNT(*)
         """
         if not field:
             return {"result": False, "msg": "传入参数为空！"}
 
+        # 获取额外参数
+        cursor_field = extra_param.get("cursor_field")
+        if cursor_field is not None and cursor_field.key not in {getattr(item, "key", None) for item in field}:
+            return {"result": False, "msg": "游标字段必须包含在查询字段中！"}
+
         query = db.query(self.model).with_entities(*field)
 
         if where:
             query = query.filter(*where)
 
-        # 加入排序条件
-        if order:
-            query = query.order_by(*order)
+        if cursor_field is not None:
+            # 游标分页：多取一行判断是否有下一页，不需要 COUNT(*) 和 OFFSET
+            query = apply_cursor_pagination(
+                query, cursor_field, extra_param.get("cursor"), list_rows, extra_param.get("cursor_desc", False)
+            )
+        else:
+            # 加入排序条件
+            if order:
+                query = query.order_by(*order)
 
-        # 加入分页信息
-        if first_row:
-            query = query.offset(first_row)
-        if list_rows:
-            query = query.limit(list_rows)
+            # 加入分页信息
+            if first_row:
+                query = query.offset(first_row)
+            if list_rows:
+                query = query.limit(list_rows)
 
         # 判断数据是否存在
         query_res = query.all()
+        res = {"result": True, "msg": "ok！", "data": []}
+        if cursor_field is not None:
+            query_res, res["next_cursor"], res["has_more"] = build_cursor_page(query_res, cursor_field.key, list_rows)
+        if extra_param.get("estimated_count"):
+            res["estimated_total"] = self.get_estimated_count(db)
         if not query_res:
-            return {"result": True, "msg": "相关数据不存在！", "data": []}
+            res["msg"] = "相关数据不存在！"
+            return res
 
         # 组织返回数据
         buf = []
         for query_item in query_res:
             buf.append(query_item._mapping)
 
-        return {"result": True, "msg": "ok！", "data": buf}
+        res["data"] = buf
+        return res
 
     def get_count_info(self, db, where=None):
         """
@@ -235,6 +441,14 @@ class BaseCRUD:
         # 返回查询结果
         return query_count
 
+    def get_estimated_count(self, db):
+        """
+        获取表的估算行数（information_schema.TABLES.TABLE_ROWS），用于列表页展示总数
+        :param db:
+        :return: 估算行数，无统计信息时为 None
+        """
+        return db.execute(estimated_count_statement(self.model)).scalar()
+
     @staticmethod
     def _get_model_dict(model_object):
         """
@@ -244,7 +458,22 @@ class BaseCRUD:
         :return:
         """
         buf = {}
-        for c in inspect(model_object).mapper.column_attrs:
+        state = inspect(model_object)
+        for c in state.mapper.column_attrs:
+            # 未加载的延迟字段不读取，避免为历史信息额外查询大字段
+            if c.key in state.unloaded:
+                continue
             buf[c.key] = getattr(model_object, c.key)
 
         return buf
+
+    def _undefer_options(self, update_data, full_history=False):
+        """
+        待修改字段的 undefer 选项，使其旧值随主查询一起加载
+        :param dict update_data:待修改数据
+        :param bool full_history:是否加载全部延迟字段
+        :return:
+        """
+        column_keys = [c.key for c in inspect(self.model).column_attrs]
+        keys = column_keys if full_history else [key for key in update_data if key in column_keys]
+        return [undefer(getattr(self.model, key)) for key in keys]
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 16:07
+# @User  : 刘子都
+# @Descriotion  : 模块导入耗时基准测试
+                  用 python -X importtime 多次冷启动导入目标模块，取中位数并列出最耗时的依赖；
+                  指定 --max_ms 时超过阈值返回非零退出码，可用于防止启动时间回退
+
+运行方式（在 code_liu/NTRT 目录下）：
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --modules base_mysql data_cleaner --repeat 7 --max_ms 400
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# -X importtime 输出格式：import time:  self [us] | cumulative | imported package
+IMPORT_TIME_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def run_importtime(module):
+    """在新进程中导入模块，解析 -X importtime 输出。
+
+    :param module: 模块名
+    :return: (累计耗时（微秒）, {直接依赖模块名: 累计耗时（微秒）})
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+
+    # 子模块先于父模块输出、缩进多一级，遇到顶层模块时收集到的第一级条目即为它的直接依赖
+    children = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if not match:
+            continue
+        depth = (len(match.group(3)) - 1) // 2
+        name, cumulative = match.group(4), int(match.group(2))
+        if depth == 0:
+            if name == module:
+                return cumulative, children
+            children = {}
+        elif depth == 1:
+            children[name] = cumulative
+    raise RuntimeError(f"未在 -X importtime 输出中找到模块 {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模块导入耗时基准测试")
+    parser.add_argument('--modules', type=str, nargs='+', default=['base_mysql', 'data_cleaner'], help='待测模块')
+    parser.add_argument('--repeat', type=int, default=5, help='每个模块冷启动导入次数')
+    parser.add_argument('--top', type=int, default=8, help='列出耗时最多的依赖数量')
+    parser.add_argument('--max_ms', type=float, default=None, help='导入耗时中位数上限（毫秒），超过时返回非零退出码')
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        runs = [run_importtime(module) for _ in range(args.repeat)]
+        total_ms = statistics.median(total for total, _ in runs) / 1000
+        print(f"{module}: 中位数 {total_ms:.1f}ms（{args.repeat} 次）")
+
+        # 以最后一次运行列出最耗时的直接依赖，便于定位回退来源
+        heaviest = sorted(runs[-1][1].items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for name, value in heaviest:
+            print(f"    {name:<32}{value / 1000:>8.1f}ms")
+
+        if args.max_ms is not None and total_ms > args.max_ms:
+            print(f"  超过阈值 {args.max_ms}ms")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 16:01
+# @User  : 刘子都
+# @Descriotion  : JSON 字段编解码基准测试
+                  以仓库中的 breadth_search / cited_articles 样例为模板扩展到不同大小，
+                  对比标准库 json 与 base_mysql.json_serializer / json_deserializer（orjson）
+
+运行方式（在 code_liu/NTRT 目录下）：
+    python benchmarks/bench_json_codec.py
+    python benchmarks/bench_json_codec.py --sizes 64 1024 4096 --repeat 20
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from base_mysql import json_deserializer, json_serializer, orjson  # noqa: E402
+
+
+def load_templates():
+    """读取样例数据，作为构造测试负载的模板。
+
+    :return: (breadth_search 项目模板 dict, cited_articles 模板 list)
+    """
+    with open(os.path.join(BASE_DIR, 'BS_project_original_key.json'), 'r', encoding='utf-8') as file:
+        breadth_template = json.load(file)
+    with open(os.path.join(BASE_DIR, 'CA_project_original.json'), 'r', encoding='utf-8') as file:
+        cited_template = json.load(file)
+    return breadth_template, cited_template
+
+
+def build_breadth_search(template, target_kb):
+    """按目标大小复制项目条目，构造 breadth_search 负载。
+
+    :param template: 项目模板 {object_id: object_info}
+    :param target_kb: 目标大小（KB）
+    :return: breadth_search 字典
+    """
+    object_info = next(iter(template.values()))
+    entry_size = len(json.dumps(object_info, ensure_ascii=False).encode('utf-8'))
+    count = max(1, target_kb * 1024 // entry_size)
+    project_addition = {}
+    for index in range(count):
+        info = copy.deepcopy(object_info)
+        info['project_id'] = f"pr{index:024d}"
+        project_addition[info['project_id']] = info
+    return {'project_addition': project_addition, 'article_addition': {}}
+
+
+def build_cited_articles(template, target_kb):
+    """按目标大小复制引用条目，构造 cited_articles 负载。
+
+    :param template: 引用数组模板
+    :param target_kb: 目标大小（KB）
+    :return: cited_articles 列表
+    """
+    entry_size = len(json.dumps(template, ensure_ascii=False).encode('utf-8'))
+    rounds = max(1, target_kb * 1024 // entry_size)
+    result = []
+    for index in range(rounds):
+        for item in template:
+            item = copy.deepcopy(item)
+            item['object_id'] = f"{item.get('object_id')}_{index}"
+            result.append(item)
+    return result
+
+
+def measure(func, value, repeat):
+    """多次执行取最优耗时（毫秒）。
+
+    :param func: 被测函数
+    :param value: 输入
+    :param repeat: 重复次数
+    :return: 最短耗时（ms）
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(value)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 字段编解码基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 256, 1024, 4096], help='负载大小（KB）')
+    parser.add_argument('--repeat', type=int, default=10, help='每项重复次数')
+    args = parser.parse_args()
+
+    print(f"orjson: {'已安装 ' + orjson.__version__ if orjson else '未安装（base_mysql 回退标准库）'}")
+    print(f"{'字段':<16}{'大小':>10}{'json.dumps':>14}{'serializer':>14}{'提升':>8}"
+          f"{'json.loads':>14}{'deserializer':>14}{'提升':>8}")
+
+    breadth_template, cited_template = load_templates()
+    builders = [('breadth_search', breadth_template, build_breadth_search),
+                ('cited_articles', cited_template, build_cited_articles)]
+    for field_name, template, builder in builders:
+        for size_kb in args.sizes:
+            payload = builder(template, size_kb)
+            text = json.dumps(payload)
+            std_dump = measure(json.dumps, payload, args.repeat)
+            fast_dump = measure(json_serializer, payload, args.repeat)
+            std_load = measure(json.loads, text, args.repeat)
+            fast_load = measure(json_deserializer, text, args.repeat)
+            print(f"{field_name:<16}{len(text) / 1024:>8.0f}KB"
+                  f"{std_dump:>12.2f}ms{fast_dump:>12.2f}ms{std_dump / fast_dump:>7.1f}x"
+                  f"{std_load:>12.2f}ms{fast_load:>12.2f}ms{std_load / fast_load:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 16:06
+# @User  : 刘子都
+# @Descriotion  : 连接池检出延迟基准测试
+                  对同一个数据库分别开启/关闭 POOL_PRE_PING，测量连接检出和 检出+SELECT 1 的耗时分布，
+                  用于决定 settings 中 POOL_PRE_PING / POOL_RECYCLE 的取值（需要能连上目标数据库）
+
+运行方式（在 code_liu/NTRT 目录下）：
+    python benchmarks/bench_pool_checkout.py --db_key medicine_test
+    python benchmarks/bench_pool_checkout.py --db_key medicine_test --count 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy import text
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from base_mysql import create_database_engine, get_pool_options  # noqa: E402
+
+
+def measure(engine, count, with_query):
+    """重复检出连接并归还，记录每次耗时（毫秒）。
+
+    :param engine: SQLAlchemy 引擎
+    :param count: 检出次数
+    :param with_query: 检出后是否执行一次 SELECT 1
+    :return: 升序排列的耗时列表
+    """
+    durations = []
+    for _ in range(count):
+        start = time.perf_counter()
+        with engine.connect() as connection:
+            if with_query:
+                connection.execute(text('SELECT 1')).scalar()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return durations
+
+
+def percentile(sorted_values, percent):
+    """取已排序列表的百分位数。
+
+    :param sorted_values: 升序列表
+    :param percent: 百分位（0-100）
+    :return: 百分位数
+    """
+    index = min(len(sorted_values) - 1, max(0, -(-len(sorted_values) * percent // 100) - 1))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="连接池检出延迟基准测试")
+    parser.add_argument('--db_key', type=str, default='medicine_test', help='数据库别名')
+    parser.add_argument('--count', type=int, default=1000, help='每种配置的检出次数')
+    args = parser.parse_args()
+
+    print(f"数据库: {args.db_key}  连接池参数: {get_pool_options(args.db_key)}")
+    print(f"{'场景':<24}{'平均':>10}{'P50':>10}{'P99':>10}{'最大':>10}")
+
+    for pre_ping in (True, False):
+        engine = create_database_engine(args.db_key, POOL_PRE_PING=pre_ping)
+        try:
+            # 预热：第一次检出会真正建立连接，不计入统计
+            measure(engine, 1, with_query=True)
+            for with_query in (False, True):
+                durations = measure(engine, args.count, with_query)
+                label = f"pre_ping={'开' if pre_ping else '关'} {'检出+SELECT 1' if with_query else '仅检出'}"
+                print(f"{label:<24}{sum(durations) / len(durations):>8.3f}ms"
+                      f"{percentile(durations, 50):>8.3f}ms{percentile(durations, 99):>8.3f}ms{durations[-1]:>8.3f}ms")
+        finally:
+            engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 16:00
+# @User  : 刘子都
+# @Descriotion  : 数据清洗断点记录
+                  按 数据库/表/字段 记录已提交的 list_id，清洗中断后可从断点继续
+"""
+
+import json
+import os
+from datetime import datetime
+
+
+DEFAULT_CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cleaning_checkpoint.json')
+
+
+class CleaningCheckpoint:
+    """清洗断点存储（本地 JSON 文件）。
+
+    文件内容形如::
+
+        {
+            "medicine:nsfc_topic_rcmd_task_list:breadth_search": {
+                "mode": "serial",          # 写入断点的清洗模式：serial / parallel / pushdown，模式不同时进度作废
+                "phase": "project",        # 下推模式：last_id 所属步骤（project 含项目数据 / fallback 非对象文章条目）
+                "last_id": 12345,          # 单进程/下推模式：最后一个已提交批次的 list_id
+                "ranges": [[0, 500, false, 230]], # 并行模式：区间 (after_id, end_id]、是否完成、区间内最后提交的 list_id
+                "completed": false,
+                "updated_at": "2025-11-10 13:41:00"
+            }
+        }
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_FILE):
+        """加载断点文件。
+
+        :param path: 断点文件路径
+        """
+        self.path = path
+        self._state = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                self._state = json.load(file)
+
+    @staticmethod
+    def task_key(db_key, model_class, field_name):
+        """生成任务的断点键。
+
+        :param db_key: 数据库别名
+        :param model_class: CRUD模型类
+        :param field_name: 字段名
+        :return: 断点键
+        """
+        return f"{db_key}:{model_class.model.__tablename__}:{field_name}"
+
+    def get(self, key):
+        """读取任务断点，不存在时返回空字典。
+
+        :param key: 断点键
+        :return: 断点信息
+        """
+        return dict(self._state.get(key) or {})
+
+    def update(self, key, **values):
+        """更新任务断点并立即落盘。
+
+        :param key: 断点键
+        :param values: 需要更新的字段（last_id / ranges / completed）
+        """
+        state = self._state.setdefault(key, {})
+        state.update(values)
+        state['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._save()
+
+    def reset(self, key, **values):
+        """丢弃任务已有进度，只保留传入的字段并立即落盘。
+
+        :param key: 断点键
+        :param values: 新的断点字段（如 mode）
+        """
+        self._state[key] = {}
+        self.update(key, **values)
+
+    def clear(self):
+        """清空所有断点（整轮清洗完成或 --restart 时调用）。"""
+        self._state = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _save(self):
+        """先写临时文件再替换，避免中途退出留下损坏的断点文件。"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self._state, file, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
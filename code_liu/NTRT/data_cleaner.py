@@ -7,11 +7,15 @@
                   实现breadth_search和cited_articles字段的数据清洗和标准化处理
 """
 
+import argparse
 import json
+import random
+import time
 
 from sqlalchemy import or_, func
 
-from base_mysql import session_dict
+from base_mysql import json_deserializer, json_serializer, session_dict
+from checkpoint import CleaningCheckpoint, DEFAULT_CHECKPOINT_FILE
 from application.NsfcTopicRcmdModels import (
     NsfcTopicRcmdTaskListModel,
     NsfcTopicRcmdTaskTopicListModel,
@@ -21,19 +25,44 @@ from application.NsfcTopicRcmdModels import (
 
 BATCH_SIZE = 100
 DEFAULT_DB_KEY = 'medicine'
+DEFAULT_WORKERS = 1
+RANGES_PER_WORKER = 4  # 每个进程分到的 list_id 区间数，区间更细可以平衡各区间数据量不均
+PROGRESS_POLL_SECONDS = 2  # 并行模式下主进程写入区间进度断点的间隔（秒）
+DEFAULT_SAMPLE_SIZE = 1000
+SAMPLE_MODES = ('even', 'random')
 
 
 class DataCleaner:
     """数据清洗类，负责数据库操作和数据清洗流程"""
 
-    def __init__(self):
+    def __init__(self, db_key=DEFAULT_DB_KEY, batch_size=BATCH_SIZE, workers=DEFAULT_WORKERS,
+                 checkpoint_file=DEFAULT_CHECKPOINT_FILE, restart=False, pushdown=False,
+                 dry_run=False, sample_size=DEFAULT_SAMPLE_SIZE, sample_mode='even'):
         """初始化数据清洗器。
 
+        :param db_key: 数据库别名
+        :param batch_size: 每批读取/更新的记录数
+        :param workers: 并行进程数，大于 1 时按 list_id 区间多进程清洗
+        :param checkpoint_file: 断点文件路径，为 None 时不记录断点
+        :param restart: 是否忽略已有断点、从头开始清洗
+        :param pushdown: 是否把支持下推的任务（breadth_search）交给 MySQL JSON 函数在服务端清洗
+        :param dry_run: 试运行，只对抽样记录执行读取和处理并输出性能报告，不写库、不记录断点
+        :param sample_size: 试运行抽样的记录数
+        :param sample_mode: 抽样方式，even 为按 list_id 等距抽样，random 为随机抽样
         :author: LZD
         :date: 2025/11/10
         """
-        self.db_key = DEFAULT_DB_KEY
-        self.batch_size = BATCH_SIZE
+        self.db_key = db_key
+        self.batch_size = batch_size
+        self.workers = max(1, int(workers or 1))
+        self.checkpoint = CleaningCheckpoint(checkpoint_file) if checkpoint_file else None
+        self.restart = restart
+        self.pushdown = pushdown
+        self.dry_run = dry_run
+        self.sample_size = max(1, int(sample_size or 1))
+        if sample_mode not in SAMPLE_MODES:
+            raise ValueError(f"未知的抽样方式: {sample_mode}")
+        self.sample_mode = sample_mode
         try:
             self._task_list_model = NsfcTopicRcmdTaskListModel()
             self._topic_list_model = NsfcTopicRcmdTaskTopicListModel()
@@ -52,55 +81,33 @@ class DataCleaner:
             print("=" * 60)
             print("开始执行数据清洗任务")
             print(f"数据库: {self.db_key}")
+            print(f"并行进程数: {self.workers}")
+            print(f"服务端下推: {'开启' if self.pushdown else '关闭'}")
             print("=" * 60)
             print()
 
-            cleaning_plan = [
-                {
-                    'model_class': NsfcTopicRcmdTaskListModel,
-                    'field_name': 'breadth_search',
-                    'extra_filters': [
-                        or_(
-                            func.json_contains_path(
-                                NsfcTopicRcmdTaskListModel.model.breadth_search,
-                                'one',
-                                '$.article_addition'
-                            ) == 1,
-                            func.json_contains_path(
-                                NsfcTopicRcmdTaskListModel.model.breadth_search,
-                                'one',
-                                '$.project_addition'
-                            ) == 1
-                        )
-                    ],
-                    'processor': self._process_breadth_search,
-                    'display_name': 'breadth_search 字段',
-                },
-                {
-                    'model_class': NsfcTopicRcmdTaskTopicListModel,
-                    'field_name': 'cited_articles',
-                    'extra_filters': [
-                        func.json_type(
-                            NsfcTopicRcmdTaskTopicListModel.model.cited_articles
-                        ) == 'ARRAY'
-                    ],
-                    'processor': self._process_cited_articles,
-                    'display_name': '主题列表表的 cited_articles 字段',
-                },
-                {
-                    'model_class': NsfcTopicRcmdTaskAppInfoModel,
-                    'field_name': 'cited_articles',
-                    'extra_filters': [
-                        func.json_type(
-                            NsfcTopicRcmdTaskAppInfoModel.model.cited_articles
-                        ) == 'ARRAY'
-                    ],
-                    'processor': self._process_cited_articles,
-                    'display_name': '应用信息表的 cited_articles 字段',
-                },
-            ]
-
-            for task in cleaning_plan:
+            cleaning_plan = self._build_cleaning_plan()
+
+            # 试运行：只抽样读取和处理，不写库也不动断点
+            if self.dry_run:
+                print(f"试运行模式：抽样 {self.sample_size} 条（{self.sample_mode}），不写入数据库\n")
+                for task in cleaning_plan:
+                    self._profile_dataset(
+                        session=session,
+                        model_class=task['model_class'],
+                        field_name=task['field_name'],
+                        extra_filters=task['extra_filters'],
+                        processor=task['processor'],
+                        display_name=task['display_name'],
+                    )
+                return
+
+            # 断点续跑：默认从上次中断的位置继续，--restart 时清空断点
+            if self.checkpoint and self.restart:
+                self.checkpoint.clear()
+                print("已清空断点，从头开始清洗\n")
+
+            for task_index, task in enumerate(cleaning_plan):
                 self._clean_dataset(
                     session=session,
                     model_class=task['model_class'],
@@ -108,14 +115,73 @@ class DataCleaner:
                     extra_filters=task['extra_filters'],
                     processor=task['processor'],
                     display_name=task['display_name'],
+                    task_index=task_index,
+                    pushdown=task.get('pushdown'),
                 )
 
+            # 整轮完成后清空断点，下一轮重新全量清洗
+            if self.checkpoint:
+                self.checkpoint.clear()
+
             print("=" * 60)
             print("所有数据清洗任务完成！")
             print("=" * 60)
         finally:
             session.close()
 
+    def _build_cleaning_plan(self):
+        """构建清洗任务列表。
+
+        并行模式下子进程按下标重新构建任务，避免跨进程传递 SQLAlchemy 表达式。
+
+        :return: 清洗任务列表
+        """
+        return [
+            {
+                'model_class': NsfcTopicRcmdTaskListModel,
+                'field_name': 'breadth_search',
+                'extra_filters': [
+                    or_(
+                        func.json_contains_path(
+                            NsfcTopicRcmdTaskListModel.model.breadth_search,
+                            'one',
+                            '$.article_addition'
+                        ) == 1,
+                        func.json_contains_path(
+                            NsfcTopicRcmdTaskListModel.model.breadth_search,
+                            'one',
+                            '$.project_addition'
+                        ) == 1
+                    )
+                ],
+                'processor': self._process_breadth_search,
+                'pushdown': self._clean_breadth_search_pushdown,
+                'display_name': 'breadth_search 字段',
+            },
+            {
+                'model_class': NsfcTopicRcmdTaskTopicListModel,
+                'field_name': 'cited_articles',
+                'extra_filters': [
+                    func.json_type(
+                        NsfcTopicRcmdTaskTopicListModel.model.cited_articles
+                    ) == 'ARRAY'
+                ],
+                'processor': self._process_cited_articles,
+                'display_name': '主题列表表的 cited_articles 字段',
+            },
+            {
+                'model_class': NsfcTopicRcmdTaskAppInfoModel,
+                'field_name': 'cited_articles',
+                'extra_filters': [
+                    func.json_type(
+                        NsfcTopicRcmdTaskAppInfoModel.model.cited_articles
+                    ) == 'ARRAY'
+                ],
+                'processor': self._process_cited_articles,
+                'display_name': '应用信息表的 cited_articles 字段',
+            },
+        ]
+
     def _process_records(self, records, field_name, processor_func):
         """对查询结果进行处理并生成更新内容。
 
@@ -147,7 +213,7 @@ class DataCleaner:
                 parsed_payload = raw_payload
             elif isinstance(raw_payload, str):
                 try:
-                    parsed_payload = json.loads(raw_payload)
+                    parsed_payload = json_deserializer(raw_payload)
                 except json.JSONDecodeError:
                     skipped += 1
                     continue
@@ -182,28 +248,28 @@ class DataCleaner:
         else:
             raise ValueError(f"未注册的模型类: {model_class}")
 
-    def _fetch_records_with_condition(self, session, model_class, field_name, extra_filters=None, offset=None, limit=None):
-        """使用模型类查询满足条件的记录。
+    def _fetch_records_with_condition(self, session, model_class, field_name, extra_filters=None, after_id=None, end_id=None):
+        """使用模型类按 list_id 游标逐页查询满足条件的记录。
 
         :param session: 数据库会话
         :param model_class: CRUD模型类
         :param field_name: 目标字段名
         :param extra_filters: 额外的过滤条件列表
-        :param offset: 起始偏移量
-        :param limit: 分页大小
-        :return: 查询结果列表，格式为 [{'id': record_id, field_name: field_value}, ...]
+        :param after_id: 起始 list_id（不包含），为 None 时从头开始
+        :param end_id: 结束 list_id（包含），为 None 时读到表尾
+        :return: 逐页产出的查询结果，格式为 [{'id': record_id, field_name: field_value}, ...]
         :author: LZD
         :date: 2025/11/10
         """
         model = self._get_model_instance(model_class)
-        records = model.fetch_records_for_cleaning(
+        return model.iter_records_for_cleaning(
             session,
             field_name,
             extra_filters or [],
-            offset=offset,
-            limit=limit
+            batch_size=self.batch_size,
+            after_id=after_id,
+            end_id=end_id
         )
-        return records
 
     def _write_updates(self, session, model_class, field_name, updates):
         """使用模型类将处理结果写回数据库。
@@ -228,7 +294,8 @@ class DataCleaner:
             session.rollback()
             raise
 
-    def _clean_dataset(self, session, model_class, field_name, extra_filters, processor, display_name):
+    def _clean_dataset(self, session, model_class, field_name, extra_filters, processor, display_name, task_index=None,
+                       pushdown=None):
         """通用清洗流程封装。
 
         :param session: 数据库会话
@@ -237,39 +304,428 @@ class DataCleaner:
         :param extra_filters: 额外过滤条件列表
         :param processor: 数据处理回调函数
         :param display_name: 用于输出的展示名称
+        :param task_index: 任务在清洗计划中的下标，并行模式下子进程据此重建任务
+        :param pushdown: 服务端下推清洗函数，开启 --pushdown 时代替逐条拉取处理
         :author: LZD
         :date: 2025/11/10
         """
         print(f"开始清洗{display_name}...")
-        total_found = 0
-        total_processed = 0
-        total_skipped = 0
-        total_updated = 0
-        offset = 0
 
-        while True:
-            records = self._fetch_records_with_condition(
-                session, model_class, field_name, extra_filters, offset=offset, limit=self.batch_size
+        checkpoint_key = CleaningCheckpoint.task_key(self.db_key, model_class, field_name)
+        state = self.checkpoint.get(checkpoint_key) if self.checkpoint else {}
+        if state.get('completed'):
+            print(f"{display_name} 已在上次运行中完成，跳过\n")
+            return
+
+        # 各模式的进度含义不同（下推模式分步骤记录 last_id，并行模式记录区间），模式变化时从头开始；
+        # 已清洗的记录不再满足过滤条件，从头开始只多一次扫描，不会重复清洗
+        if self.pushdown and pushdown is not None:
+            mode = 'pushdown'
+        elif self.workers > 1 and task_index is not None:
+            mode = 'parallel'
+        else:
+            mode = 'serial'
+        if state.get('mode') != mode:
+            if state.get('last_id') is not None or state.get('ranges'):
+                print(f"  断点由 {state.get('mode') or '未知'} 模式写入，与本次 {mode} 模式不同，忽略断点从头开始")
+            state = {}
+            if self.checkpoint:
+                self.checkpoint.reset(checkpoint_key, mode=mode)
+
+        if mode == 'pushdown':
+            # 下推模式主要耗时在数据库端，单进程执行
+            stats = pushdown(session, model_class, extra_filters, state=state, checkpoint_key=checkpoint_key)
+        elif mode == 'parallel':
+            stats = self._clean_dataset_parallel(
+                session, model_class, field_name, extra_filters, task_index, checkpoint_key, state
             )
-            if not records:
-                break
+        else:
+            after_id = state.get('last_id')
+            if after_id is not None:
+                print(f"  从断点 list_id > {after_id} 继续")
+            stats = self._clean_range(
+                session, model_class, field_name, extra_filters, processor,
+                after_id=after_id, checkpoint_key=checkpoint_key
+            )
+
+        if self.checkpoint:
+            self.checkpoint.update(checkpoint_key, completed=True)
 
-            total_found += len(records)
+        print(f"  查询到 {stats['found']} 条记录")
+        print(f"  处理成功: {stats['processed']} 条，跳过: {stats['skipped']} 条")
+        print(f"  更新成功: {stats['updated']} 条记录")
+        print(f"{display_name} 清洗完成\n")
+
+    def _clean_range(self, session, model_class, field_name, extra_filters, processor, after_id=None, end_id=None,
+                     checkpoint_key=None, on_commit=None):
+        """清洗 (after_id, end_id] 区间内的记录。
+
+        :param session: 数据库会话
+        :param model_class: CRUD模型类
+        :param field_name: 字段名称
+        :param extra_filters: 额外过滤条件列表
+        :param processor: 数据处理回调函数
+        :param after_id: 起始 list_id（不包含），为 None 时从头开始
+        :param end_id: 结束 list_id（包含），为 None 时读到表尾
+        :param checkpoint_key: 断点键，传入时每批提交后记录最后一个 list_id
+        :param on_commit: 每批提交后以最后一个 list_id 调用的回调（并行模式下子进程据此上报区间进度）
+        :return: 统计信息 {'found', 'processed', 'skipped', 'updated'}
+        """
+        stats = {'found': 0, 'processed': 0, 'skipped': 0, 'updated': 0}
+
+        # 按 list_id 游标分页，更新后不再满足过滤条件的记录不会影响后续分页
+        for records in self._fetch_records_with_condition(
+            session, model_class, field_name, extra_filters, after_id=after_id, end_id=end_id
+        ):
+            stats['found'] += len(records)
             updates, processed, skipped = self._process_records(
                 records, field_name, processor
             )
-            total_processed += processed
-            total_skipped += skipped
-            updated_rows = self._write_updates(
+            stats['processed'] += processed
+            stats['skipped'] += skipped
+            stats['updated'] += self._write_updates(
                 session, model_class, field_name, updates
             )
-            total_updated += updated_rows
-            offset += len(records)
 
-        print(f"  查询到 {total_found} 条记录")
-        print(f"  处理成功: {total_processed} 条，跳过: {total_skipped} 条")
-        print(f"  更新成功: {total_updated} 条记录")
-        print(f"{display_name} 清洗完成\n")
+            # 本批已提交，记录断点
+            if checkpoint_key and self.checkpoint:
+                self.checkpoint.update(checkpoint_key, last_id=records[-1]['id'])
+            if on_commit is not None:
+                on_commit(records[-1]['id'])
+
+        return stats
+
+    def _clean_breadth_search_pushdown(self, session, model_class, extra_filters, state=None, checkpoint_key=None):
+        """服务端下推清洗 breadth_search。
+
+        1. 不含项目数据的记录：set-based UPDATE，直接用 article_addition 替换整个字段，数据不出库；
+        2. 含项目数据的记录：只取回 project_addition 在 Python 端标准化，
+           写回时由 MySQL 合并服务端的 article_addition，文章部分不经过网络；
+        3. article_addition 含非对象条目的记录（服务端无法按类型丢弃）：走与非下推模式相同的 Python 清洗，
+           保证两种模式清洗结果一致。
+
+        第 2、3 步各自按 list_id 递增处理，断点以 phase 区分 last_id 属于哪一步。
+
+        :param session: 数据库会话
+        :param model_class: CRUD模型类
+        :param extra_filters: 额外过滤条件列表
+        :param state: 下推模式写入的断点（phase / last_id），为空时从头开始
+        :param checkpoint_key: 断点键，传入时每批提交后记录步骤与最后一个 list_id
+        :return: 统计信息 {'found', 'processed', 'skipped', 'updated'}
+        """
+        stats = {'found': 0, 'processed': 0, 'skipped': 0, 'updated': 0}
+        model = self._get_model_instance(model_class)
+        state = state or {}
+        phase = state.get('phase')
+        after_id = state.get('last_id')
+        if after_id is not None:
+            print(f"  从断点 {phase} 步骤 list_id > {after_id} 继续")
+
+        # 已清洗的记录不再满足过滤条件，重复执行到本次匹配数不足 limit 为止，天然支持断点续跑
+        limit = self.batch_size * 10
+        while True:
+            try:
+                rows = model.merge_article_only_rows(session, extra_filters, limit=limit)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            stats['found'] += rows
+            stats['processed'] += rows
+            stats['updated'] += rows
+            if rows < limit:
+                break
+        print(f"  服务端合并仅含文章数据的记录 {stats['updated']} 条")
+
+        project_after_id = after_id if phase == 'project' else None
+        project_records = [] if phase == 'fallback' else model.iter_project_additions(
+            session, extra_filters, self.batch_size, after_id=project_after_id
+        )
+        for records in project_records:
+            stats['found'] += len(records)
+            updates, processed, skipped = self._process_records(
+                records, 'project_addition', self._standardize_project_addition
+            )
+            stats['processed'] += processed
+            stats['skipped'] += skipped
+
+            if updates:
+                try:
+                    stats['updated'] += model.merge_project_entries(session, updates, self.batch_size)
+                    session.commit()
+                except Exception:
+                    session.rollback()
+                    raise
+
+            # 本批已提交，记录断点
+            if checkpoint_key and self.checkpoint:
+                self.checkpoint.update(checkpoint_key, phase='project', last_id=records[-1]['id'])
+
+        # 第 3 步从头（或本步骤的断点）开始；断点先切换到 fallback 步骤，_clean_range 每批提交后只更新 last_id
+        fallback_after_id = after_id if phase == 'fallback' else None
+        if checkpoint_key and self.checkpoint:
+            self.checkpoint.update(checkpoint_key, phase='fallback', last_id=fallback_after_id)
+        fallback_stats = self._clean_range(
+            session, model_class, 'breadth_search',
+            list(extra_filters or []) + [model_class.has_non_object_articles()],
+            self._process_breadth_search,
+            after_id=fallback_after_id, checkpoint_key=checkpoint_key,
+        )
+        if fallback_stats['found']:
+            print(f"  含非对象文章条目、改走 Python 清洗的记录 {fallback_stats['found']} 条")
+        for key in stats:
+            stats[key] += fallback_stats[key]
+
+        return stats
+
+    def _clean_dataset_parallel(self, session, model_class, field_name, extra_filters, task_index,
+                                checkpoint_key=None, state=None):
+        """按 list_id 区间把清洗任务分发到多个进程，并汇总各进程统计。
+
+        区间划分会写入断点，续跑时沿用上次的划分，只执行未完成的区间；子进程每批提交后
+        通过队列上报区间内最后一个 list_id，由主进程写入断点，续跑时未完成的区间从该位置继续。
+
+        :param session: 数据库会话（仅用于查询 list_id 范围）
+        :param model_class: CRUD模型类
+        :param field_name: 字段名称
+        :param extra_filters: 额外过滤条件列表
+        :param task_index: 任务在清洗计划中的下标
+        :param checkpoint_key: 断点键
+        :param state: 已有断点信息
+        :return: 汇总后的统计信息
+        """
+        stats = {'found': 0, 'processed': 0, 'skipped': 0, 'updated': 0}
+
+        # 续跑时沿用断点中的区间划分：已清洗的记录不再满足过滤条件，重新计算的范围会与上次不同。
+        # 区间格式为 [after_id, end_id, 是否完成, 区间内最后提交的 list_id]，兼容旧断点的三元组
+        ranges = [list(item) + [None] * (4 - len(item)) for item in (state or {}).get('ranges') or []]
+        if ranges:
+            resumed = sum(1 for item in ranges if not item[2] and item[3] is not None)
+            print(f"  从断点继续，剩余 {sum(1 for item in ranges if not item[2])}/{len(ranges)} 个区间"
+                  f"（其中 {resumed} 个从区间内断点继续）")
+        else:
+            model = self._get_model_instance(model_class)
+            min_id, max_id = model.get_id_bounds(session, field_name, extra_filters)
+            session.rollback()
+            if min_id is None:
+                return stats
+
+            ranges = [
+                [after_id, end_id, False, None]
+                for after_id, end_id in self._split_id_ranges(min_id, max_id, self.workers * RANGES_PER_WORKER)
+            ]
+            print(f"  list_id 范围 [{min_id}, {max_id}]，划分为 {len(ranges)} 个区间")
+            if self.checkpoint:
+                self.checkpoint.update(checkpoint_key, ranges=ranges)
+
+        # 多进程模块只在并行模式下导入，缩短单进程运行的启动时间
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+        from multiprocessing import Manager
+
+        with Manager() as manager, ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+            progress = manager.Queue() if self.checkpoint else None
+            futures = {
+                executor.submit(
+                    _clean_range_worker,
+                    self.db_key,
+                    self.batch_size,
+                    task_index,
+                    item[0] if item[3] is None else item[3],
+                    item[1],
+                    progress,
+                    index,
+                ): index
+                for index, item in enumerate(ranges)
+                if not item[2]
+            }
+            running = set(futures)
+            while running:
+                done, running = wait(running, timeout=PROGRESS_POLL_SECONDS, return_when=FIRST_COMPLETED)
+
+                # 先写入子进程上报的区间进度，再处理已完成的区间
+                changed = self._drain_range_progress(progress, ranges)
+                for future in done:
+                    item = ranges[futures[future]]
+                    range_stats = future.result()
+                    print(f"  区间 ({item[0]}, {item[1]}] 完成：查询 {range_stats['found']} 条，更新 {range_stats['updated']} 条")
+                    for key in stats:
+                        stats[key] += range_stats[key]
+                    item[2] = True
+                    changed = True
+                if changed and self.checkpoint:
+                    self.checkpoint.update(checkpoint_key, ranges=ranges)
+
+        return stats
+
+    @staticmethod
+    def _drain_range_progress(progress, ranges):
+        """取出子进程上报的 (区间下标, 最后提交的 list_id)，更新区间断点。
+
+        :param progress: 进度队列，为 None 时不记录
+        :param ranges: 区间断点列表
+        :return: 是否有更新
+        """
+        if progress is None:
+            return False
+        changed = False
+        while not progress.empty():
+            index, last_id = progress.get()
+            ranges[index][3] = last_id
+            changed = True
+        return changed
+
+    def _profile_dataset(self, session, model_class, field_name, extra_filters, processor, display_name):
+        """试运行：抽样执行 读取/解码/处理/编码 四个阶段并输出性能报告，不写入数据库。
+
+        按 batch_size 抽取若干页（页起点在 list_id 范围内等距或随机分布），
+        JSON 字段以原始文本读取，解码与写回前的序列化单独计时；写入阶段不执行、不计入预估。
+
+        :param session: 数据库会话
+        :param model_class: CRUD模型类
+        :param field_name: 字段名称
+        :param extra_filters: 额外过滤条件列表
+        :param processor: 数据处理回调函数
+        :param display_name: 用于输出的展示名称
+        """
+        print(f"试运行{display_name}...")
+
+        model = self._get_model_instance(model_class)
+        total = model.count_records_for_cleaning(session, field_name, extra_filters)
+        min_id, max_id = model.get_id_bounds(session, field_name, extra_filters)
+        session.rollback()
+        if not total or min_id is None:
+            print("  没有需要清洗的记录\n")
+            return
+
+        # 每页记录数与正式运行一致，抽样数不足一页时按抽样数取
+        page_size = min(self.batch_size, self.sample_size)
+        pages = -(-self.sample_size // page_size)
+        starts = self._sample_page_starts(min_id, max_id, pages)
+
+        timings = {'fetch': 0.0, 'decode': 0.0, 'process': 0.0, 'encode': 0.0}
+        sizes = []
+        seen_ids = set()
+        sampled = processed_total = skipped_total = 0
+
+        for after_id in starts:
+            if sampled >= self.sample_size:
+                break
+
+            # 读取：只取一页，JSON 按原始文本返回
+            start_time = time.perf_counter()
+            records = next(iter(model.iter_records_for_cleaning(
+                session, field_name, extra_filters, batch_size=page_size, after_id=after_id, raw=True
+            )), [])
+            timings['fetch'] += time.perf_counter() - start_time
+            session.rollback()
+
+            # 相邻抽样页可能重叠，重复记录不再计入
+            records = [record for record in records if record['id'] not in seen_ids]
+            records = records[:self.sample_size - sampled]
+            if not records:
+                continue
+            seen_ids.update(record['id'] for record in records)
+            sampled += len(records)
+
+            # 解码
+            start_time = time.perf_counter()
+            decoded = []
+            for record in records:
+                raw_payload = record[field_name]
+                if isinstance(raw_payload, str):
+                    sizes.append(len(raw_payload.encode('utf-8')))
+                    try:
+                        raw_payload = json_deserializer(raw_payload)
+                    except json.JSONDecodeError:
+                        raw_payload = None
+                decoded.append({'id': record['id'], field_name: raw_payload})
+            timings['decode'] += time.perf_counter() - start_time
+
+            # 处理
+            start_time = time.perf_counter()
+            updates, processed, skipped = self._process_records(decoded, field_name, processor)
+            timings['process'] += time.perf_counter() - start_time
+            processed_total += processed
+            skipped_total += skipped
+
+            # 编码：与写回时 JSON 字段的序列化一致
+            start_time = time.perf_counter()
+            for _, processed_data in updates:
+                json_serializer(processed_data)
+            timings['encode'] += time.perf_counter() - start_time
+
+        if not sampled:
+            print("  抽样未取到记录\n")
+            return
+
+        print(f"  需要清洗的记录: {total} 条，list_id 范围 [{min_id}, {max_id}]")
+        print(f"  抽样 {sampled} 条（{len(starts)} 页），处理成功: {processed_total} 条，跳过: {skipped_total} 条")
+        for phase, seconds in timings.items():
+            rate = sampled / seconds if seconds > 0 else float('inf')
+            print(f"  {phase:<8} 耗时 {seconds:>8.3f}s  {rate:>12.1f} 行/秒")
+
+        if sizes:
+            sizes.sort()
+            print(
+                "  字段大小: 平均 {:.1f}KB，P50 {:.1f}KB，P90 {:.1f}KB，P99 {:.1f}KB，最大 {:.1f}KB".format(
+                    sum(sizes) / len(sizes) / 1024,
+                    self._percentile(sizes, 50) / 1024,
+                    self._percentile(sizes, 90) / 1024,
+                    self._percentile(sizes, 99) / 1024,
+                    sizes[-1] / 1024,
+                )
+            )
+
+        # 预估总耗时：按抽样的单行耗时线性外推，并行时按进程数均分，不含写入
+        seconds_per_row = sum(timings.values()) / sampled
+        projected = seconds_per_row * total / self.workers
+        print(f"  预估总耗时（不含写入，{self.workers} 进程）: {projected:.1f}s（约 {projected / 3600:.2f} 小时）")
+        print(f"{display_name} 试运行完成\n")
+
+    def _sample_page_starts(self, min_id, max_id, pages):
+        """生成抽样页的起点游标（不包含）。
+
+        :param min_id: 最小 list_id
+        :param max_id: 最大 list_id
+        :param pages: 抽样页数
+        :return: 升序的 after_id 列表
+        """
+        lower = min_id - 1
+        span = max_id - lower
+        pages = max(1, min(pages, span))
+        if self.sample_mode == 'random':
+            return sorted(random.sample(range(lower, max_id), pages))
+        return [lower + span * index // pages for index in range(pages)]
+
+    @staticmethod
+    def _percentile(sorted_values, percent):
+        """取已排序列表的百分位数（最近秩法）。
+
+        :param sorted_values: 升序列表
+        :param percent: 百分位（0-100）
+        :return: 百分位数
+        """
+        index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+        return sorted_values[min(index, len(sorted_values) - 1)]
+
+    @staticmethod
+    def _split_id_ranges(min_id, max_id, parts):
+        """将 [min_id, max_id] 等宽切分为若干 (after_id, end_id] 区间。
+
+        :param min_id: 最小 list_id
+        :param max_id: 最大 list_id
+        :param parts: 期望的区间数
+        :return: [(after_id, end_id), ...]
+        """
+        span = max_id - min_id + 1
+        step = max(1, -(-span // max(1, parts)))
+        ranges = []
+        lower = min_id - 1
+        while lower < max_id:
+            upper = min(lower + step, max_id)
+            ranges.append((lower, upper))
+            lower = upper
+        return ranges
 
     def _open_session(self):
         """打开数据库会话。
@@ -331,14 +787,8 @@ class DataCleaner:
         if not isinstance(data, dict):
             return None
 
-        result = {}
-
         # 处理项目数据：需要标准化
-        project_addition = data.get('project_addition', {})
-        if isinstance(project_addition, dict):
-            for object_id, project_data in project_addition.items():
-                if isinstance(project_data, dict):
-                    result[object_id] = DataCleaner._standardize_project_info(project_data)
+        result = DataCleaner._standardize_project_addition(data.get('project_addition', {}))
 
         # 处理文章数据：直接复制
         article_addition = data.get('article_addition', {})
@@ -349,6 +799,20 @@ class DataCleaner:
 
         return result
 
+    @staticmethod
+    def _standardize_project_addition(project_addition):
+        """标准化 project_addition 中的全部项目条目。
+
+        :param project_addition: {object_id: project_data}
+        :return: {object_id: 标准化后的项目字段}，非字典条目会被丢弃
+        """
+        result = {}
+        if isinstance(project_addition, dict):
+            for object_id, project_data in project_addition.items():
+                if isinstance(project_data, dict):
+                    result[object_id] = DataCleaner._standardize_project_info(project_data)
+        return result
+
     @staticmethod
     def _standardize_project_info(object_info):
         """将项目 object_info 转换为统一字段命名和格式。
@@ -405,5 +869,74 @@ class DataCleaner:
         return processed
 
 
+def _init_worker():
+    """子进程初始化：丢弃从父进程继承的连接池，每个进程使用自己的连接。"""
+    # session_dict 只遍历已创建的别名，不会为未使用的数据库创建引擎
+    for session_factory in session_dict.values():
+        engine = session_factory.kw.get('bind')
+        if engine is not None:
+            engine.dispose(close=False)
+
+
+def _clean_range_worker(db_key, batch_size, task_index, after_id, end_id, progress=None, range_index=None):
+    """子进程入口：独立会话清洗一个 list_id 区间。
+
+    :param db_key: 数据库别名
+    :param batch_size: 每批读取/更新的记录数
+    :param task_index: 任务在清洗计划中的下标
+    :param after_id: 起始 list_id（不包含），续跑时为区间内最后提交的 list_id
+    :param end_id: 结束 list_id（包含）
+    :param progress: 进度队列，每批提交后放入 (range_index, 最后一个 list_id)
+    :param range_index: 区间在断点中的下标
+    :return: 区间统计信息
+    """
+    cleaner = DataCleaner(db_key=db_key, batch_size=batch_size, checkpoint_file=None)
+    task = cleaner._build_cleaning_plan()[task_index]
+    session = cleaner._open_session()
+    try:
+        return cleaner._clean_range(
+            session,
+            task['model_class'],
+            task['field_name'],
+            task['extra_filters'],
+            task['processor'],
+            after_id=after_id,
+            end_id=end_id,
+            on_commit=(lambda last_id: progress.put((range_index, last_id))) if progress is not None else None,
+        )
+    finally:
+        session.close()
+
+
+def parse_input_argv():
+    """解析命令行参数并执行清洗。"""
+    parser = argparse.ArgumentParser(description="国自然选题推荐数据清洗")
+    parser.add_argument('--db_key', type=str, default=DEFAULT_DB_KEY, help='数据库别名')
+    parser.add_argument('--batch_size', type=int, default=BATCH_SIZE, help='每批读取/更新的记录数')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='并行进程数，大于 1 时按 list_id 区间多进程清洗')
+    parser.add_argument('--checkpoint_file', type=str, default=DEFAULT_CHECKPOINT_FILE, help='断点文件路径')
+    parser.add_argument('--restart', action='store_true', help='忽略已有断点，从头开始清洗')
+    parser.add_argument('--dry_run', '--dry-run', action='store_true',
+                        help='试运行：只抽样读取和处理，输出各阶段耗时与预估总耗时，不写入数据库')
+    parser.add_argument('--sample', type=int, default=DEFAULT_SAMPLE_SIZE, help='试运行抽样的记录数')
+    parser.add_argument('--sample_mode', type=str, choices=SAMPLE_MODES, default='even',
+                        help='试运行抽样方式：even 按 list_id 等距，random 随机')
+    parser.add_argument('--pushdown', action='store_true',
+                        help='breadth_search 在 MySQL 端用 JSON 函数合并，只有项目条目回到 Python 标准化')
+    args = parser.parse_args()
+
+    DataCleaner(
+        db_key=args.db_key,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint_file=args.checkpoint_file,
+        restart=args.restart,
+        pushdown=args.pushdown,
+        dry_run=args.dry_run,
+        sample_size=args.sample,
+        sample_mode=args.sample_mode,
+    ).run()
+
+
 if __name__ == '__main__':
-    DataCleaner().run()
+    parse_input_argv()
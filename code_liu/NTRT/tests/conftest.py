@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 18:40
+# @User  : 刘子都
+# @Descriotion  : 单元测试公共配置：项目根目录加入导入路径，提供 SQLite 内存库会话
+                  SQLite 的 JSON 函数与 MySQL 不同（如 json_type 返回小写），只用于验证分页、批量更新与断点逻辑
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from base_mysql import Base, json_deserializer, json_serializer
+
+
+@pytest.fixture
+def session():
+    """SQLite 内存库会话，已按模型建表。"""
+    engine = create_engine("sqlite://", json_serializer=json_serializer, json_deserializer=json_deserializer)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield db
+    finally:
+        db.close()
+        engine.dispose()
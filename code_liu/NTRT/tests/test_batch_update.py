@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 18:55
+# @User  : 刘子都
+# @Descriotion  : 批量写回：batch_update_field 的 CASE 单语句更新与逐条（带历史）更新
+"""
+
+from application.NsfcTopicRcmdModels import NsfcTopicRcmdTaskTopicList, NsfcTopicRcmdTaskTopicListModel
+
+
+def seed(session, count):
+    session.add_all(NsfcTopicRcmdTaskTopicList(list_id=i, cited_articles=[i]) for i in range(1, count + 1))
+    session.commit()
+
+
+def stored(session):
+    rows = session.query(NsfcTopicRcmdTaskTopicList.list_id, NsfcTopicRcmdTaskTopicList.cited_articles)
+    return {row.list_id: row.cited_articles for row in rows.order_by(NsfcTopicRcmdTaskTopicList.list_id)}
+
+
+def test_case_update_writes_each_row_across_chunks(session):
+    seed(session, 5)
+    model = NsfcTopicRcmdTaskTopicListModel()
+    updates = [(1, {"a": {"n": 1}}), (3, {"c": {"n": 3}}), (4, {}), (5, {"e": {"title": "中文"}})]
+
+    rows = model.batch_update_field(session, 'cited_articles', updates, batch_size=2)
+    session.commit()
+
+    assert rows == 4
+    assert stored(session) == {1: {"a": {"n": 1}}, 2: [2], 3: {"c": {"n": 3}}, 4: {}, 5: {"e": {"title": "中文"}}}
+
+
+def test_duplicate_id_in_chunk_keeps_last_value(session):
+    seed(session, 2)
+    model = NsfcTopicRcmdTaskTopicListModel()
+
+    rows = model.batch_update_field(session, 'cited_articles', [(1, {"old": {}}), (1, {"new": {}})])
+    session.commit()
+
+    assert rows == 1
+    assert stored(session)[1] == {"new": {}}
+
+
+def test_empty_updates_do_nothing(session):
+    model = NsfcTopicRcmdTaskTopicListModel()
+
+    assert model.batch_update_field(session, 'cited_articles', []) == 0
+
+
+def test_with_history_updates_row_by_row(session):
+    seed(session, 2)
+    model = NsfcTopicRcmdTaskTopicListModel()
+
+    rows = model.batch_update_field(session, 'cited_articles', [(2, {"b": {}}), (9, {"x": {}})], with_history=True)
+    session.commit()
+
+    assert rows == 1
+    assert stored(session) == {1: [1], 2: {"b": {}}}
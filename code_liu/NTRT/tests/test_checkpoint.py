@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 19:00
+# @User  : 刘子都
+# @Descriotion  : 清洗断点：CleaningCheckpoint 读写，DataCleaner 中断后续跑与 completed 跳过
+"""
+
+import pytest
+from sqlalchemy import func
+
+from application.NsfcTopicRcmdModels import NsfcTopicRcmdTaskTopicList, NsfcTopicRcmdTaskTopicListModel
+from checkpoint import CleaningCheckpoint
+from data_cleaner import DataCleaner
+
+NEEDS_CLEANING = [func.json_type(NsfcTopicRcmdTaskTopicList.cited_articles) == 'array']
+TASK_KEY = 'medicine:nsfc_topic_rcmd_task_topic_list:cited_articles'
+
+
+class Interrupted(Exception):
+    pass
+
+
+def seed(session, count):
+    session.add_all(
+        NsfcTopicRcmdTaskTopicList(list_id=i, cited_articles=[{"object_id": i, "object_info": {}}])
+        for i in range(1, count + 1)
+    )
+    session.commit()
+
+
+def recording_processor(seen, fail_on=None):
+    """记录处理过的 list_id（即 object_id），处理到 fail_on 时模拟中断。"""
+    def processor(data):
+        object_id = data[0]["object_id"]
+        if object_id == fail_on:
+            raise Interrupted(object_id)
+        seen.append(object_id)
+        return DataCleaner._process_cited_articles(data)
+    return processor
+
+
+def clean(session, checkpoint_file, processor):
+    cleaner = DataCleaner(db_key='medicine', batch_size=2, checkpoint_file=str(checkpoint_file))
+    cleaner._clean_dataset(
+        session, NsfcTopicRcmdTaskTopicListModel, 'cited_articles', NEEDS_CLEANING, processor, 'cited_articles'
+    )
+    return cleaner
+
+
+def test_checkpoint_persists_across_instances(tmp_path):
+    path = tmp_path / 'checkpoint.json'
+    checkpoint = CleaningCheckpoint(str(path))
+    checkpoint.update('a', last_id=10)
+    checkpoint.update('a', completed=True)
+
+    state = CleaningCheckpoint(str(path)).get('a')
+
+    assert state['last_id'] == 10 and state['completed'] is True and 'updated_at' in state
+    assert CleaningCheckpoint(str(path)).get('missing') == {}
+
+
+def test_clear_removes_file(tmp_path):
+    path = tmp_path / 'checkpoint.json'
+    checkpoint = CleaningCheckpoint(str(path))
+    checkpoint.update('a', last_id=10)
+
+    checkpoint.clear()
+
+    assert not path.exists() and CleaningCheckpoint(str(path)).get('a') == {}
+
+
+def test_interrupted_run_resumes_after_last_committed_batch(session, tmp_path):
+    seed(session, 5)
+    path = tmp_path / 'checkpoint.json'
+
+    seen = []
+    with pytest.raises(Interrupted):
+        clean(session, path, recording_processor(seen, fail_on=4))
+    state = CleaningCheckpoint(str(path)).get(TASK_KEY)
+    assert seen == [1, 2, 3]
+    assert state['last_id'] == 2 and not state.get('completed')
+
+    # 第二批（3、4）未提交，续跑从 list_id > 2 开始
+    seen = []
+    clean(session, path, recording_processor(seen))
+    state = CleaningCheckpoint(str(path)).get(TASK_KEY)
+    assert seen == [3, 4, 5]
+    assert state['completed'] is True
+
+
+def test_completed_task_is_skipped(session, tmp_path):
+    seed(session, 3)
+    path = tmp_path / 'checkpoint.json'
+    CleaningCheckpoint(str(path)).update(TASK_KEY, completed=True)
+
+    seen = []
+    clean(session, path, recording_processor(seen))
+
+    assert seen == []
+
+
+def test_reset_drops_progress(tmp_path):
+    path = tmp_path / 'checkpoint.json'
+    checkpoint = CleaningCheckpoint(str(path))
+    checkpoint.update('a', last_id=10, phase='project', ranges=[[0, 5, True, 5]])
+
+    checkpoint.reset('a', mode='serial')
+
+    state = CleaningCheckpoint(str(path)).get('a')
+    assert state['mode'] == 'serial'
+    assert 'last_id' not in state and 'phase' not in state and 'ranges' not in state
+
+
+def test_progress_from_another_mode_is_ignored(session, tmp_path):
+    seed(session, 4)
+    path = tmp_path / 'checkpoint.json'
+
+    # 下推模式第 2 步写入的 last_id 不能作为逐条清洗的起点，否则会漏掉只有第 3 步处理的记录
+    CleaningCheckpoint(str(path)).update(TASK_KEY, mode='pushdown', phase='project', last_id=3)
+
+    seen = []
+    clean(session, path, recording_processor(seen))
+
+    state = CleaningCheckpoint(str(path)).get(TASK_KEY)
+    assert seen == [1, 2, 3, 4]
+    assert state['mode'] == 'serial' and 'phase' not in state and state['completed'] is True
+
+
+def test_progress_without_mode_is_ignored(session, tmp_path):
+    seed(session, 3)
+    path = tmp_path / 'checkpoint.json'
+    CleaningCheckpoint(str(path)).update(TASK_KEY, last_id=2)
+
+    seen = []
+    clean(session, path, recording_processor(seen))
+
+    assert seen == [1, 2, 3]
+
+
+def test_same_mode_resumes_from_last_id(session, tmp_path):
+    seed(session, 4)
+    path = tmp_path / 'checkpoint.json'
+    CleaningCheckpoint(str(path)).update(TASK_KEY, mode='serial', last_id=2)
+
+    seen = []
+    clean(session, path, recording_processor(seen))
+
+    assert seen == [3, 4]
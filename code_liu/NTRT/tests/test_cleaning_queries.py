@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 18:50
+# @User  : 刘子都
+# @Descriotion  : 清洗读取：按 list_id 游标分页（iter_records_for_cleaning）
+"""
+
+from sqlalchemy import func
+
+from application.NsfcTopicRcmdModels import NsfcTopicRcmdTaskTopicList, NsfcTopicRcmdTaskTopicListModel
+
+# SQLite 的 json_type 返回小写类型名（MySQL 为 ARRAY）
+NEEDS_CLEANING = func.json_type(NsfcTopicRcmdTaskTopicList.cited_articles) == 'array'
+
+
+def seed(session, values):
+    session.add_all(
+        NsfcTopicRcmdTaskTopicList(list_id=list_id, cited_articles=value) for list_id, value in values.items()
+    )
+    session.commit()
+
+
+def collect_ids(pages):
+    return [[record['id'] for record in page] for page in pages]
+
+
+def test_pages_follow_list_id_and_skip_filtered_rows(session):
+    seed(session, {1: [1], 2: {"done": True}, 3: [3], 4: [4], 5: None, 6: [6]})
+    model = NsfcTopicRcmdTaskTopicListModel()
+
+    pages = list(model.iter_records_for_cleaning(session, 'cited_articles', [NEEDS_CLEANING], batch_size=2))
+
+    assert collect_ids(pages) == [[1, 3], [4, 6]]
+    assert pages[0][0] == {'id': 1, 'cited_articles': [1]}
+
+
+def test_after_id_and_end_id_bound_the_range(session):
+    seed(session, {i: [i] for i in range(1, 9)})
+    model = NsfcTopicRcmdTaskTopicListModel()
+
+    pages = model.iter_records_for_cleaning(session, 'cited_articles', batch_size=2, after_id=2, end_id=6)
+
+    assert collect_ids(pages) == [[3, 4], [5, 6]]
+
+
+def test_rows_cleaned_between_pages_do_not_shift_later_pages(session):
+    seed(session, {i: [i] for i in range(1, 7)})
+    model = NsfcTopicRcmdTaskTopicListModel()
+
+    seen = []
+    for page in model.iter_records_for_cleaning(session, 'cited_articles', [NEEDS_CLEANING], batch_size=2):
+        seen.extend(record['id'] for record in page)
+
+        # 本页清洗后不再满足过滤条件；OFFSET 分页会因此跳过后续记录
+        model.batch_update_field(session, 'cited_articles', [(record['id'], {}) for record in page])
+        session.commit()
+
+    assert seen == [1, 2, 3, 4, 5, 6]
+
+
+def test_raw_mode_returns_json_text(session):
+    seed(session, {1: [{"object_id": "a"}]})
+    model = NsfcTopicRcmdTaskTopicListModel()
+
+    page = next(model.iter_records_for_cleaning(session, 'cited_articles', raw=True))
+
+    assert isinstance(page[0]['cited_articles'], str)
+    assert '"object_id"' in page[0]['cited_articles']
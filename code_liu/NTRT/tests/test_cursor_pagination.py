@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 18:40
+# @User  : 刘子都
+# @Descriotion  : 游标分页：apply_cursor_pagination / build_cursor_page 与 get_list_info(cursor_field=...)
+"""
+
+from sqlalchemy import select
+
+from application.NsfcTopicRcmdModels import NsfcTopicRcmdTaskList, NsfcTopicRcmdTaskListModel
+from base_mysql import apply_cursor_pagination, build_cursor_page
+
+
+def seed(session, count):
+    session.add_all(NsfcTopicRcmdTaskList(list_id=i, breadth_search={"n": i}) for i in range(1, count + 1))
+    session.commit()
+
+
+def read_pages(session, list_rows, cursor_desc=False):
+    """用 select() 逐页读取，返回每页的 list_id 列表。"""
+    pages, cursor = [], None
+    while True:
+        query = apply_cursor_pagination(
+            select(NsfcTopicRcmdTaskList.list_id), NsfcTopicRcmdTaskList.list_id, cursor, list_rows, cursor_desc
+        )
+        rows, cursor, has_more = build_cursor_page(session.execute(query).all(), "list_id", list_rows)
+        pages.append([row.list_id for row in rows])
+        if not has_more:
+            assert cursor is None
+            return pages
+
+
+def test_pages_cover_all_rows_in_order(session):
+    seed(session, 7)
+
+    assert read_pages(session, 3) == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_descending_pages(session):
+    seed(session, 5)
+
+    assert read_pages(session, 2, cursor_desc=True) == [[5, 4], [3, 2], [1]]
+
+
+def test_exact_multiple_has_no_empty_trailing_page(session):
+    seed(session, 4)
+
+    assert read_pages(session, 2) == [[1, 2], [3, 4]]
+
+
+def test_build_cursor_page_without_limit_returns_everything():
+    rows = [{"list_id": 1}, {"list_id": 2}]
+
+    assert build_cursor_page(rows, "list_id") == (rows, None, False)
+
+
+def test_get_list_info_cursor_mode(session):
+    seed(session, 5)
+    model = NsfcTopicRcmdTaskListModel()
+    field = [NsfcTopicRcmdTaskList.list_id]
+
+    first = model.get_list_info(session, field, list_rows=2, cursor_field=NsfcTopicRcmdTaskList.list_id)
+    second = model.get_list_info(
+        session, field, list_rows=2, cursor_field=NsfcTopicRcmdTaskList.list_id, cursor=first["next_cursor"]
+    )
+    last = model.get_list_info(
+        session, field, list_rows=2, cursor_field=NsfcTopicRcmdTaskList.list_id, cursor=second["next_cursor"]
+    )
+
+    assert [row["list_id"] for row in first["data"]] == [1, 2] and first["has_more"]
+    assert [row["list_id"] for row in second["data"]] == [3, 4] and second["has_more"]
+    assert [row["list_id"] for row in last["data"]] == [5]
+    assert last["has_more"] is False and last["next_cursor"] is None
+
+
+def test_get_list_info_filters_apply_before_cursor(session):
+    seed(session, 6)
+    model = NsfcTopicRcmdTaskListModel()
+
+    res = model.get_list_info(
+        session,
+        [NsfcTopicRcmdTaskList.list_id],
+        [NsfcTopicRcmdTaskList.list_id % 2 == 0],
+        list_rows=2,
+        cursor_field=NsfcTopicRcmdTaskList.list_id,
+        cursor=2,
+    )
+
+    assert [row["list_id"] for row in res["data"]] == [4, 6] and res["has_more"] is False
+
+
+def test_get_list_info_rejects_cursor_field_outside_selection(session):
+    model = NsfcTopicRcmdTaskListModel()
+
+    res = model.get_list_info(
+        session, [NsfcTopicRcmdTaskList.breadth_search], cursor_field=NsfcTopicRcmdTaskList.list_id
+    )
+
+    assert res["result"] is False
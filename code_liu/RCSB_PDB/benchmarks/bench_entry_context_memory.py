@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 16:14
+# @User  : 刘子都
+# @Descriotion  : EntryContext 内存基准测试
+                  构造 N 个在途 Entry，按 创建 → Entry → 实体 → Assembly/ChemComp/DrugBank 的阶段推进，
+                  用 tracemalloc 统计每个阶段平均每条在途 Entry 占用的字节数，
+                  并与改造前的 dataclass 版本（保留 __dict__ 与各阶段原始载荷）对比
+
+运行方式（在 code_liu/RCSB_PDB 目录下）：
+    python benchmarks/bench_entry_context_memory.py
+    python benchmarks/bench_entry_context_memory.py --count 500 --entities 8 --assembly_kb 256
+"""
+
+import argparse
+import copy
+import gc
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.spiders.rcsb_pdb.services import EntryContext  # noqa: E402
+
+STAGES = ("创建", "Entry", "实体", "Assembly/ChemComp/DrugBank")
+
+
+@dataclass
+class LegacyEntryContext:
+    """
+    改造前的上下文结构，仅用于对比。
+    """
+
+    pdb_id: str
+    file_urls: List[str]
+    file_audit: Dict[str, Dict[str, Any]]
+    validation_url: Optional[str]
+    validation_pdf_url: Optional[str]
+    result: Dict[str, Any] = field(
+        default_factory=lambda: {
+            "rcsb_id": None,
+            "properties": {},
+            "polymer_entities": [],
+            "nonpolymer_entities": [],
+            "branched_entities": [],
+            "chemcomp": [],
+            "drugbank": [],
+        }
+    )
+    pending: Dict[str, int] = field(
+        default_factory=lambda: {"entry": 1, "entity": 0, "comp": 0, "drugbank": 0, "assembly": 0, "asset": 0}
+    )
+    comp_ids: Set[str] = field(default_factory=set)
+    drugbank_ids: Set[str] = field(default_factory=set)
+    comp_data: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    drugbank_data: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    assembly_data: Optional[Dict[str, Any]] = None
+    revision_date: Optional[str] = None
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    stats: Dict[str, int] = field(
+        default_factory=lambda: {"entity_total": 0, "comp_total": 0, "drugbank_total": 0}
+    )
+
+    def __getitem__(self, item):
+        """
+        支持字典式读取。
+
+        :param str item: 属性名
+        :return: 属性值
+        """
+        return getattr(self, item)
+
+    def __setitem__(self, key, value):
+        """
+        支持字典式写入。
+
+        :param str key: 属性名
+        :param value: 新值
+        """
+        setattr(self, key, value)
+
+
+def build_payloads(index, entities, assembly_kb):
+    """
+    构造单条 Entry 的模拟载荷，体量参照 data.rcsb.org 的 REST 返回。
+
+    :param int index: 序号
+    :param int entities: 每条 Entry 的实体数
+    :param int assembly_kb: Assembly 载荷大小（KB）
+    :return: (properties, 实体列表, assembly)
+    :rtype: tuple
+    """
+    pdb_id = f"{index:04X}"
+    properties = {
+        "rcsb_id": pdb_id,
+        "rcsb_accession_info": {"revision_date": "2025-11-20T00:00:00Z"},
+        "struct": {"title": f"Structure {pdb_id} " * 8},
+        "citation": [{"title": f"Citation {pdb_id}-{n}", "year": 2020 + n} for n in range(3)],
+    }
+    entity_list = [
+        {
+            "rcsb_id": f"{pdb_id}_{n}",
+            "entity_poly": {"pdbx_seq_one_letter_code": "ACDEFGHIKLMNPQRSTVWY" * 20},
+            "entity_poly_seq": [{"mon_id": "ALA", "num": m} for m in range(64)],
+        }
+        for n in range(entities)
+    ]
+    atoms = max(1, assembly_kb * 1024 // 64)
+    assembly = {
+        "rcsb_assembly_container_identifiers": {"entry_id": pdb_id},
+        "pdbx_struct_oper_list": [{"id": str(n), "matrix": [[1.0, 0.0, 0.0]] * 3} for n in range(atoms // 8)],
+    }
+    return pdb_id, properties, entity_list, assembly
+
+
+def run_stages(context_class, payloads, comp_cache, drugbank_cache):
+    """
+    按阶段推进全部上下文，记录每个阶段结束时的内存占用。
+
+    :param type context_class: EntryContext 或 LegacyEntryContext
+    :param list payloads: build_payloads 的结果列表
+    :param dict comp_cache: 跨 Entry 共享的 ChemComp 数据（模拟 ReferenceCache）
+    :param dict drugbank_cache: 跨 Entry 共享的 DrugBank 数据
+    :return: 各阶段已分配字节数（相对于载荷本身）
+    :rtype: list
+    """
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    sizes = []
+
+    contexts = {}
+    for pdb_id, _, _, _ in payloads:
+        contexts[pdb_id] = context_class(
+            pdb_id=pdb_id,
+            file_urls=[f"https://files.rcsb.org/download/{pdb_id}.cif"],
+            file_audit={},
+            validation_url=None,
+            validation_pdf_url=None,
+        )
+    sizes.append(tracemalloc.get_traced_memory()[0] - baseline)
+
+    # 载荷按 API 返回的方式逐条拷贝进上下文，模拟 response.json() 产生的新对象。
+
+    for pdb_id, properties, _, _ in payloads:
+        context = contexts[pdb_id]
+        context["result"]["rcsb_id"] = pdb_id
+        context["result"]["properties"] = copy.deepcopy(properties)
+        context["revision_date"] = properties["rcsb_accession_info"]["revision_date"]
+        context["pending"]["entry"] = 0
+    sizes.append(tracemalloc.get_traced_memory()[0] - baseline)
+
+    for pdb_id, _, entity_list, _ in payloads:
+        context = contexts[pdb_id]
+        for entity in entity_list:
+            context["result"]["polymer_entities"].append(copy.deepcopy(entity))
+    sizes.append(tracemalloc.get_traced_memory()[0] - baseline)
+
+    for pdb_id, _, _, assembly in payloads:
+        context = contexts[pdb_id]
+        if isinstance(context, EntryContext):
+            context.add_references(comp_cache, drugbank_cache)
+            context.apply_assembly(copy.deepcopy(assembly))
+        else:
+            context["comp_ids"] = set(comp_cache)
+            context["drugbank_ids"] = set(drugbank_cache)
+            context["comp_data"].update(comp_cache)
+            context["drugbank_data"].update(drugbank_cache)
+            context["assembly_data"] = copy.deepcopy(assembly)
+    sizes.append(tracemalloc.get_traced_memory()[0] - baseline)
+
+    tracemalloc.stop()
+    del contexts
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EntryContext 内存基准测试")
+    parser.add_argument("--count", type=int, default=500, help="同时在途的 Entry 数（对应 max_in_flight）")
+    parser.add_argument("--entities", type=int, default=4, help="每条 Entry 的实体数")
+    parser.add_argument("--assembly_kb", type=int, default=64, help="每条 Entry 的 Assembly 大小（KB）")
+    args = parser.parse_args()
+
+    payloads = [build_payloads(index, args.entities, args.assembly_kb) for index in range(args.count)]
+    comp_cache = {"ALA": {"rcsb_id": "ALA", "comp_id": "ALA"}, "ATP": {"rcsb_id": "ATP", "comp_id": "ATP"}}
+    drugbank_cache = {"DB00171": {"comp_id": "DB00171"}}
+
+    legacy = run_stages(LegacyEntryContext, payloads, comp_cache, drugbank_cache)
+    current = run_stages(EntryContext, payloads, comp_cache, drugbank_cache)
+
+    print(f"在途 Entry: {args.count}  实体/Entry: {args.entities}  Assembly: {args.assembly_kb}KB")
+    print(f"{'阶段':<28}{'改造前 B/条':>14}{'当前 B/条':>14}{'节省':>8}")
+    for stage, old, new in zip(STAGES, legacy, current):
+        old_per_entry = old / args.count
+        new_per_entry = new / args.count
+        saving = (1 - new_per_entry / old_per_entry) * 100 if old_per_entry else 0.0
+        print(f"{stage:<28}{old_per_entry:>14,.0f}{new_per_entry:>14,.0f}{saving:>7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 10:12
+# @User  : 刘子都
+# @Descriotion  : 自定义下载处理器
+"""
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 10:12
+# @User  : 刘子都
+# @Descriotion  : 长连接复用的 HTTP 下载处理器（按域名配置连接池大小，统计连接复用情况）
+"""
+from twisted.web.client import HTTPConnectionPool
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+
+
+class CountingConnectionPool(HTTPConnectionPool):
+    """
+    在 Twisted 连接池基础上增加两项能力：
+        1. 按域名设置可保持的空闲长连接数量（`host_limits`），未配置的域名使用 `maxPersistentPerHost`
+        2. 统计每个域名新建连接与复用连接的次数，写入 Scrapy stats
+
+    :param reactor: Twisted 反应器
+    :param dict host_limits: 域名 → 最大空闲长连接数
+    :param stats: Scrapy StatsCollector，可为 None
+    """
+
+    def __init__(self, reactor, host_limits=None, stats=None):
+        super().__init__(reactor, persistent=True)
+        self.host_limits = host_limits or {}
+        self.default_limit = self.maxPersistentPerHost
+        self.stats = stats
+        self.new_connections = 0
+        self.reused_connections = 0
+
+    def getConnection(self, key, endpoint):
+        """
+        获取连接；若本次调用没有触发 `_newConnection`，即视为复用了池中的长连接。
+
+        :param key: 连接池键，Scrapy 为 (scheme, host, port) 形式的元组
+        :param endpoint: 新建连接时使用的 endpoint
+        :return: Deferred[HTTP11ClientProtocol]
+        """
+        before = self.new_connections
+        result = super().getConnection(key, endpoint)
+        if self.new_connections == before:
+            self.reused_connections += 1
+            self._inc_stats("reused", key)
+        return result
+
+    def _newConnection(self, key, endpoint):
+        """
+        新建连接（TCP + TLS 握手），计数后交给父类处理。
+        """
+        self.new_connections += 1
+        self._inc_stats("new", key)
+        return super()._newConnection(key, endpoint)
+
+    def _putConnection(self, key, connection):
+        """
+        连接空闲后放回池中，放回前按域名切换允许保留的连接数量。
+        """
+        self.maxPersistentPerHost = self.host_limits.get(self._host_of(key), self.default_limit)
+        try:
+            super()._putConnection(key, connection)
+        finally:
+            self.maxPersistentPerHost = self.default_limit
+
+    def _inc_stats(self, kind, key):
+        """
+        累加全局及按域名的连接计数。
+
+        :param str kind: new 或 reused
+        :param key: 连接池键
+        """
+        if not self.stats:
+            return
+        self.stats.inc_value(f"http_pool/connections_{kind}")
+        host = self._host_of(key)
+        if host:
+            self.stats.inc_value(f"http_pool/{host}/connections_{kind}")
+
+    @staticmethod
+    def _host_of(key):
+        """
+        从连接池键中取出域名。
+
+        :param key: 连接池键
+        :return: 域名字符串，无法识别时返回 None
+        :rtype: str or None
+        """
+        if not isinstance(key, tuple) or len(key) < 2:
+            return None
+        host = key[1]
+        if isinstance(host, bytes):
+            host = host.decode("ascii", "ignore")
+        return host
+
+
+class PooledHTTPDownloadHandler(HTTP11DownloadHandler):
+    """
+    替换 Scrapy 默认 http/https 下载处理器的连接池。
+
+    相关配置：
+        HTTP_POOL_MAX_PER_HOST：每个域名默认保留的空闲长连接数，默认取 CONCURRENT_REQUESTS_PER_DOMAIN
+        HTTP_POOL_HOST_LIMITS：按域名覆盖空闲长连接数，如 {"files.rcsb.org": 16}
+        HTTP_POOL_KEEPALIVE：空闲长连接的保持时间（秒），默认 240
+
+    使用示例（settings 或 Spider 的 custom_settings）：
+    DOWNLOAD_HANDLERS = {
+        "http": "src.handlers.pooled_http_handler.PooledHTTPDownloadHandler",
+        "https": "src.handlers.pooled_http_handler.PooledHTTPDownloadHandler",
+    }
+    """
+
+    def __init__(self, settings, crawler):
+        super().__init__(settings, crawler)
+
+        from twisted.internet import reactor
+
+        # 用可计数的连接池替换父类创建的连接池
+        self._pool = CountingConnectionPool(
+            reactor,
+            host_limits=settings.getdict("HTTP_POOL_HOST_LIMITS"),
+            stats=getattr(crawler, "stats", None),
+        )
+        self._pool.default_limit = self._pool.maxPersistentPerHost = (
+            settings.getint("HTTP_POOL_MAX_PER_HOST")
+            or settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN")
+        )
+        self._pool.cachedConnectionTimeout = settings.getint("HTTP_POOL_KEEPALIVE", 240)
+        self._pool._factory.noisy = False
+
+    def close(self):
+        """
+        关闭连接池前输出连接复用统计。
+        """
+        total = self._pool.new_connections + self._pool.reused_connections
+        if total and self._crawler.spider:
+            self._crawler.spider.logger.info(
+                "🔌 HTTP 连接池：新建 %d，复用 %d，复用率 %.1f%%",
+                self._pool.new_connections,
+                self._pool.reused_connections,
+                self._pool.reused_connections * 100.0 / total,
+            )
+        return super().close()
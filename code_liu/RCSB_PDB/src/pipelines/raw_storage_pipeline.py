@@ -5,7 +5,17 @@
 # @User  : Mabin
 # @Description  :MongoDB临时数据存储管道（临时数据只作为记录使用，不做复杂操作）
 """
+import time
 from datetime import datetime
+
+import bson
+from bson.raw_bson import RawBSONDocument
+from pymongo import InsertOne
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+from twisted.internet import task
+
+from src.signals import items_stored
 from src.utils.mongodb_manager import MongoDBManager
 from src.utils.mysql_manager import MySQLManager
 
@@ -15,6 +25,13 @@ class MongoDBRawStoragePipeline:
     collection_name = "information"  # MongoDB入库集合名
     item_class = None  # 当前管道所接受的item类型（子类需要明确）
 
+    # 缓冲写入（bulk_size 为 0 时逐条 insert_one；可被 settings 中 MONGO_BULK_* 覆盖）
+    bulk_size = 0  # 累计多少条文档后批量写入
+    bulk_max_bytes = 8 * 1024 * 1024  # 缓冲区 BSON 总字节数上限
+    bulk_flush_interval = 5.0  # 定时写入间隔（秒），保证低流量时数据也能及时落库
+    bulk_max_retries = 5  # 连接失败时同一批次最多重试次数，超过后丢弃该批次
+    bulk_max_retry_bytes = 64 * 1024 * 1024  # 连接失败期间缓冲区上限，超过后丢弃待重试批次，避免 Mongo 长时间不可用时耗尽内存
+
     def __init__(self):
         """
         初始化相关属性
@@ -22,6 +39,16 @@ class MongoDBRawStoragePipeline:
         """
         self.database_model = None
         self.current_settings = None
+        self.metadata = None
+        self.logger = None
+        self._buffer = []
+        self._receipts = []  # 与 _buffer 一一对应的 Item 回执，写入成功后通过 items_stored 信号发出
+        self._buffer_bytes = 0
+        self._signals = None
+        self._spider = None
+        self._last_flush = time.monotonic()
+        self._flush_loop = None
+        self._failed_flushes = 0  # 连续连接失败次数，大于 0 时只由定时任务重试
 
     def open_spider(self, spider):
         """
@@ -45,6 +72,38 @@ class MongoDBRawStoragePipeline:
             "EXTENSIONS": tmp_settings.get("EXTENSIONS"),
         }
 
+        # 元数据在整个运行周期内不变，只构造一次
+        self.metadata = {
+            "spider_name": spider.name,
+            "allowed_domains": spider.allowed_domains,
+            "start_urls": spider.start_urls,
+            "spider_settings": self.current_settings,
+        }
+        self.logger = spider.logger
+        self._spider = spider
+        crawler = getattr(spider, "crawler", None)
+        self._signals = crawler.signals if crawler is not None else None
+
+        # 读取缓冲写入配置，启用时开启定时写入
+        self.bulk_size = spider.settings.getint("MONGO_BULK_SIZE", self.bulk_size)
+        self.bulk_max_bytes = spider.settings.getint("MONGO_BULK_MAX_BYTES", self.bulk_max_bytes)
+        self.bulk_flush_interval = spider.settings.getfloat("MONGO_BULK_FLUSH_INTERVAL", self.bulk_flush_interval)
+        self.bulk_max_retries = spider.settings.getint("MONGO_BULK_MAX_RETRIES", self.bulk_max_retries)
+        self.bulk_max_retry_bytes = spider.settings.getint("MONGO_BULK_MAX_RETRY_BYTES", self.bulk_max_retry_bytes)
+        if self.bulk_size > 0 and self.bulk_flush_interval > 0:
+            self._flush_loop = task.LoopingCall(self._flush_if_stale)
+            self._flush_loop.start(self.bulk_flush_interval, now=False)
+
+    def close_spider(self, spider):
+        """
+        关闭前写入缓冲区剩余文档
+        :param spider:
+        :return:
+        """
+        if self._flush_loop is not None and self._flush_loop.running:
+            self._flush_loop.stop()
+        self.flush()
+
     def process_item(self, item, spider):
         """
         记录数据库
@@ -58,24 +117,168 @@ class MongoDBRawStoragePipeline:
             return item
 
         # 组织入库数据
-        create_date = dict(
-            dict(item),
-            **{
-                "metadata": {
-                    "spider_name": spider.name,
-                    "allowed_domains": spider.allowed_domains,
-                    "start_urls": spider.start_urls,
-                    "spider_settings": self.current_settings,
-                },
-                "create_time": datetime.now(),
-            }
-        )
-
-        # 执行数据入库
-        self.database_model.db[self.collection_name].insert_one(create_date)
+        create_date = dict(item)
+        create_date["metadata"] = self.metadata
+        create_date["create_time"] = datetime.now()
+
+        # 未启用缓冲时逐条入库
+        if self.bulk_size <= 0:
+            self.database_model.db[self.collection_name].insert_one(create_date)
+            self._notify_stored([self.item_receipt(item)])
+            return item
+
+        # 只编码一次 BSON：既用于统计缓冲字节数，也直接作为 RawBSONDocument 写入
+        # 预先生成 _id：连接中断后重试时，已写入的文档报 _id 重复而不是再插入一份
+        create_date["_id"] = ObjectId()
+        raw = bson.encode(create_date)
+        self._enqueue(InsertOne(RawBSONDocument(raw)), len(raw), self.item_receipt(item))
 
         return item
 
+    def item_receipt(self, item):
+        """
+        Item 写入成功后需要回传给爬虫的信息（子类按需覆盖），为 None 时不发送
+        缓冲写入时 item_scraped 早于真正落库，需要“已入库”语义的逻辑应监听 items_stored 信号
+        :param item:
+        :return:
+        """
+        return None
+
+    def _notify_stored(self, receipts):
+        """
+        发送 items_stored 信号
+        :param list receipts: 已写入 Item 的回执
+        :return:
+        """
+        receipts = [receipt for receipt in receipts if receipt is not None]
+        if receipts and self._signals is not None:
+            self._signals.send_catch_log(signal=items_stored, receipts=receipts, spider=self._spider)
+
+    def _enqueue(self, operation, size, receipt=None):
+        """
+        写操作进入缓冲区，达到条数或字节阈值时立即写入
+        :param operation: pymongo 写操作（InsertOne / UpdateOne 等）
+        :param int size: 该操作文档的 BSON 字节数
+        :param receipt: Item 回执，写入成功后随 items_stored 信号发出
+        :return:
+        """
+        self._buffer.append(operation)
+        self._receipts.append(receipt)
+        self._buffer_bytes += size
+        if self._should_flush():
+            self.flush()
+
+    def _should_flush(self):
+        """
+        是否达到写入阈值；连接失败后改由定时任务重试，缓冲区超过重试上限时才立即写入（失败即丢弃）
+        :return:
+        """
+        if self._failed_flushes:
+            return self._buffer_bytes >= self.bulk_max_retry_bytes
+        return len(self._buffer) >= self.bulk_size or self._buffer_bytes >= self.bulk_max_bytes
+
+    def _flush_if_stale(self):
+        """
+        定时任务：距上次写入超过间隔时写入缓冲区
+        LoopingCall 遇到未捕获的异常会停止，这里记录后吞掉，保证后续仍按时写入
+        :return:
+        """
+        try:
+            if self._buffer and time.monotonic() - self._last_flush >= self.bulk_flush_interval:
+                self.flush()
+        except Exception as exc:
+            if self.logger:
+                self.logger.error("MongoDB 定时写入 %s 失败：%s", self.collection_name, exc)
+
+    def flush(self):
+        """
+        以无序 bulk_write 写入缓冲区，单条失败不影响其余文档
+        连接类错误（ConnectionFailure：AutoReconnect、NetworkTimeout 等）时整批放回缓冲区，由定时任务重试，
+        超过 bulk_max_retries 次或缓冲区超过 bulk_max_retry_bytes 时丢弃；其余错误（OperationFailure、
+        InvalidDocument 等）重试也不会成功，记录后直接丢弃，均不发送回执
+        :return:
+        """
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        operations, receipts, operations_bytes = self._buffer, self._receipts, self._buffer_bytes
+        self._buffer, self._receipts, self._buffer_bytes = [], [], 0
+        try:
+            self.database_model.db[self.collection_name].bulk_write(operations, ordered=False)
+        except BulkWriteError as exc:
+            details = exc.details or {}
+            errors = details.get("writeErrors") or []
+
+            # 无序写入时其余文档已落库，只有出错的下标未写入；重试时 _id 重复说明上次已写入
+            failed = {error.get("index") for error in errors if not self._already_written(error)}
+            self._failed_flushes = 0
+            self._notify_stored([receipt for index, receipt in enumerate(receipts) if index not in failed])
+            if self.logger:
+                self.logger.error(
+                    "MongoDB 批量写入 %s 部分失败：%d/%d 条，首个错误：%s",
+                    self.collection_name,
+                    len(errors),
+                    len(operations),
+                    errors[0].get("errmsg") if errors else exc,
+                )
+        except ConnectionFailure as exc:
+            if not self._retry_allowed(operations_bytes, len(operations), exc):
+                return
+            self._buffer = operations + self._buffer
+            self._receipts = receipts + self._receipts
+            self._buffer_bytes += operations_bytes
+        except PyMongoError as exc:
+            self._failed_flushes = 0
+            if self.logger:
+                self.logger.error(
+                    "MongoDB 批量写入 %s 失败，丢弃 %d 条：%s", self.collection_name, len(operations), exc
+                )
+        else:
+            self._failed_flushes = 0
+            self._notify_stored(receipts)
+
+    @staticmethod
+    def _already_written(error):
+        """
+        判断批量写入错误是否为 _id 重复（连接中断重试时，上次实际已写入的文档）
+        :param dict error: writeErrors 中的一项
+        :return:
+        """
+        return error.get("code") == 11000 and error.get("keyPattern") == {"_id": 1}
+
+    def _retry_allowed(self, batch_bytes, batch_count, exc):
+        """
+        连接失败时判断批次能否放回缓冲区重试：超过重试次数或重试缓冲上限时记录并放弃
+        :param int batch_bytes: 批次字节数
+        :param int batch_count: 批次条数
+        :param exc: 连接异常
+        :return: 是否放回缓冲区
+        """
+        self._failed_flushes += 1
+        if (
+            self._failed_flushes > self.bulk_max_retries
+            or batch_bytes + self._buffer_bytes > self.bulk_max_retry_bytes
+        ):
+            self._failed_flushes = 0
+            if self.logger:
+                self.logger.error(
+                    "MongoDB 写入 %s 连接失败且超过重试上限，丢弃 %d 条：%s",
+                    self.collection_name,
+                    batch_count,
+                    exc,
+                )
+            return False
+        if self.logger:
+            self.logger.error(
+                "MongoDB 写入 %s 连接失败，%d 条放回缓冲区等待重试（第 %d/%d 次）：%s",
+                self.collection_name,
+                batch_count,
+                self._failed_flushes,
+                self.bulk_max_retries,
+                exc,
+            )
+        return True
+
 
 class MySQLRawStoragePipeline:
     connect_key = "default"  # MySQL链接标识
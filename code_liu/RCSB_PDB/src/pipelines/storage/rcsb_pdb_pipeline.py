@@ -4,6 +4,14 @@ RCSB PDB All API Pipeline
 
 负责将 RcsbAllApiItem 写入 MongoDB（或其他存储，依据项目 Pipeline 基类实现）
 """
+import hashlib
+import json
+import time
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import ConnectionFailure, OperationFailure, PyMongoError
+
 from src.items.rcsb_pdb_item import RcsbAllApiItem
 from src.pipelines.raw_storage_pipeline import MongoDBRawStoragePipeline
 
@@ -16,10 +24,239 @@ class RcsbPdbPipeline(MongoDBRawStoragePipeline):
         connect_key: Mongo 连接配置 key。
         collection_name: 写入的集合名称。
         item_class: 期望的 Item 类型。
+        bulk_size: 缓冲写入条数，文档较大，按条数与字节数双阈值批量写入。
+        storage_mode: insert（每次新增文档）或 upsert（按 pdb_id 覆盖，内容未变化时跳过），
+            可被 settings 中 RCSB_STORAGE_MODE 覆盖。
+        dedup_on_open: upsert 模式启动时先删除重复的 pdb_id（每个只保留最新插入的一条）再建唯一索引，
+            可被 settings 中 RCSB_UPSERT_DEDUP 覆盖；从 insert 模式切换时开启一次即可。
+        upsert_key: upsert 模式的唯一键。
+        hash_exclude_fields: 不参与内容哈希的字段（每次抓取都会变化的字段）。
     """
 
     connect_key = "default"
     collection_name = "rcsb_pdb_structures_all"
     item_class = RcsbAllApiItem
+    bulk_size = 50
+    storage_mode = "insert"
+    dedup_on_open = False
+    upsert_key = "pdb_id"
+    hash_exclude_fields = ("created_at",)
+
+    def __init__(self):
+        super().__init__()
+        self._upserts = {}
+        self._upsert_receipts = {}
+        self.unchanged_skipped = 0
+        self.upserted = 0
+
+    def open_spider(self, spider):
+        """
+        启动数据库链接；upsert 模式下确保唯一索引存在
+        :param spider:
+        :return:
+        """
+        super().open_spider(spider)
+        self.storage_mode = spider.settings.get("RCSB_STORAGE_MODE", self.storage_mode).lower()
+        self.dedup_on_open = spider.settings.getbool("RCSB_UPSERT_DEDUP", self.dedup_on_open)
+        if self.storage_mode == "upsert":
+            self._ensure_upsert_index()
+
+    def _ensure_upsert_index(self):
+        """
+        创建 upsert 键的唯一索引
+        insert 模式写入的集合中可能已有重复的 pdb_id，此时建唯一索引会失败：开启 dedup_on_open 时先去重；
+        否则退回普通索引并告警，upsert 仍可运行（更新其中一条），但不能防止并发写入产生新的重复
+        :return:
+        """
+        collection = self.database_model.db[self.collection_name]
+        unique_name = f"uniq_{self.upsert_key}"
+        fallback_name = f"idx_{self.upsert_key}"
+        indexes = collection.index_information()
+        if unique_name in indexes:
+            return
+
+        if self.dedup_on_open:
+            removed = self._dedup_by_key(collection)
+            self.logger.info("🧹 %s 按 %s 去重，删除 %d 条旧文档", self.collection_name, self.upsert_key, removed)
+            if fallback_name in indexes:
+                collection.drop_index(fallback_name)
+        elif fallback_name in indexes:
+            self.logger.warning(
+                "%s 仍使用普通索引 %s（存在重复 %s），设置 RCSB_UPSERT_DEDUP=True 运行一次以去重并建立唯一索引",
+                self.collection_name,
+                fallback_name,
+                self.upsert_key,
+            )
+            return
+
+        try:
+            collection.create_index([(self.upsert_key, ASCENDING)], unique=True, name=unique_name)
+        except OperationFailure as exc:
+            if exc.code != 11000:
+                raise
+            self.logger.warning(
+                "%s 存在重复的 %s，无法建立唯一索引，退回普通索引；设置 RCSB_UPSERT_DEDUP=True 运行一次以去重：%s",
+                self.collection_name,
+                self.upsert_key,
+                exc,
+            )
+            collection.create_index([(self.upsert_key, ASCENDING)], name=fallback_name)
+
+    def _dedup_by_key(self, collection):
+        """
+        一次性迁移：每个 upsert 键只保留 _id 最大（最后插入）的文档，删除其余重复文档
+        :param collection: 目标集合
+        :return: 删除的文档数
+        """
+        duplicates = collection.aggregate(
+            [
+                {"$match": {self.upsert_key: {"$ne": None}}},
+                {"$sort": {"_id": DESCENDING}},
+                {"$group": {"_id": f"${self.upsert_key}", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": 1}}},
+            ],
+            allowDiskUse=True,
+        )
+        removed = 0
+        stale_ids = []
+        for group in duplicates:
+            stale_ids.extend(group["ids"][1:])
+            if len(stale_ids) >= 1000:
+                removed += collection.delete_many({"_id": {"$in": stale_ids}}).deleted_count
+                stale_ids = []
+        if stale_ids:
+            removed += collection.delete_many({"_id": {"$in": stale_ids}}).deleted_count
+        return removed
+
+    def item_receipt(self, item):
+        """
+        回传 pdb_id 与 revision，爬虫在写入成功后才记录完成状态与增量 revision
+        :param item:
+        :return:
+        """
+        return {"pdb_id": item.get("pdb_id"), "revision": item.get("max_revision_date")}
+
+    def close_spider(self, spider):
+        """
+        写入剩余缓冲并输出 upsert 统计
+        :param spider:
+        :return:
+        """
+        super().close_spider(spider)
+        if self.storage_mode == "upsert":
+            spider.logger.info(
+                "📊 %s upsert 写入 %d 条，内容未变化跳过 %d 条",
+                self.collection_name,
+                self.upserted,
+                self.unchanged_skipped,
+            )
+
+    def process_item(self, item, spider):
+        """
+        insert 模式沿用基类逻辑；upsert 模式计算内容哈希后进入缓冲
+        :param item:
+        :param spider:
+        :return:
+        """
+        if self.storage_mode != "upsert" or not isinstance(item, self.item_class):
+            return super().process_item(item, spider)
+
+        document = dict(item)
+        key = document.get(self.upsert_key)
+        if not key:
+            spider.logger.warning("缺少 %s，按 insert 模式写入", self.upsert_key)
+            return super().process_item(item, spider)
+
+        # 内容哈希基于规范化后的 payload（键排序的 JSON），排除每次抓取都会变化的字段
+
+        payload = {k: v for k, v in document.items() if k not in self.hash_exclude_fields}
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        document["content_hash"] = hashlib.sha256(encoded).hexdigest()
+        document["metadata"] = self.metadata
+        document["update_time"] = datetime.now()
+
+        # 同一批次内重复的 pdb_id 只保留最后一次；字节数按 UTF-8 编码后的 JSON 估算文档大小
+
+        self._upserts[key] = document
+        self._upsert_receipts[key] = self.item_receipt(item)
+        self._buffer_bytes += len(encoded)
+        if self._should_flush():
+            self.flush()
+        return item
+
+    def _should_flush(self):
+        """
+        upsert 缓冲按待查询的文档数计算条数阈值
+        :return:
+        """
+        if self._failed_flushes:
+            return self._buffer_bytes >= self.bulk_max_retry_bytes
+        return len(self._upserts) + len(self._buffer) >= self.bulk_size or self._buffer_bytes >= self.bulk_max_bytes
+
+    def _flush_if_stale(self):
+        """
+        定时任务：upsert 缓冲同样需要按时间写入
+        :return:
+        """
+        if self._upserts and time.monotonic() - self._last_flush >= self.bulk_flush_interval:
+            self.flush()
+            return
+        super()._flush_if_stale()
+
+    def flush(self):
+        """
+        upsert 模式：一次查询取回本批已存储的哈希，只为内容变化的文档生成 UpdateOne
+        查询失败的处理与 bulk_write 相同：连接错误放回缓冲区按上限重试，其余错误丢弃本批
+        :return:
+        """
+        if self._upserts:
+            pending, pending_receipts, pending_bytes = self._upserts, self._upsert_receipts, self._buffer_bytes
+            self._upserts, self._upsert_receipts, self._buffer_bytes = {}, {}, 0
+            collection = self.database_model.db[self.collection_name]
+            try:
+                stored = {
+                    doc[self.upsert_key]: doc.get("content_hash")
+                    for doc in collection.find(
+                        {self.upsert_key: {"$in": list(pending)}},
+                        {self.upsert_key: 1, "content_hash": 1, "_id": 0},
+                    )
+                }
+            except ConnectionFailure as exc:
+                self._last_flush = time.monotonic()
+                if not self._retry_allowed(pending_bytes, len(pending), exc):
+                    return
+
+                # 连接失败时整批放回缓冲区（期间新到的同 pdb_id 文档更新，优先保留），等待定时任务重试
 
+                pending.update(self._upserts)
+                pending_receipts.update(self._upsert_receipts)
+                self._upserts, self._upsert_receipts = pending, pending_receipts
+                self._buffer_bytes += pending_bytes
+                return
+            except PyMongoError as exc:
+                self._last_flush = time.monotonic()
+                self._failed_flushes = 0
+                if self.logger:
+                    self.logger.error(
+                        "MongoDB 查询 %s 已存储哈希失败，丢弃 %d 条：%s", self.collection_name, len(pending), exc
+                    )
+                return
+            unchanged = []
+            for key, document in pending.items():
+                if stored.get(key) == document["content_hash"]:
 
+                    # 内容未变化，库中已是最新，视为写入成功
+                    self.unchanged_skipped += 1
+                    unchanged.append(pending_receipts.get(key))
+                    continue
+                self._buffer.append(
+                    UpdateOne(
+                        {self.upsert_key: key},
+                        {"$set": document, "$setOnInsert": {"create_time": document["update_time"]}},
+                        upsert=True,
+                    )
+                )
+                self._receipts.append(pending_receipts.get(key))
+                self.upserted += 1
+            self._notify_stored(unchanged)
+        super().flush()
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 17:20
+# @User  : 刘子都
+# @Descriotion  : 自定义 Scrapy 信号
+"""
+
+# 存储 Pipeline 把一批 Item 真正写入数据库后发送（缓冲写入时晚于 item_scraped）。
+# 参数：receipts（各 Item 的回执列表，见 MongoDBRawStoragePipeline.item_receipt）、spider
+
+items_stored = object()
@@ -21,14 +21,23 @@ API_ENDPOINTS = {
     "chemcomp": f"{API_BASE}/chemcomp",
     "drugbank": f"{API_BASE}/drugbank",
     "assembly": f"{API_BASE}/assembly",
+    "schema": "https://data.rcsb.org/rest/v1/schema",
 }
+# GraphQL 接口，一次查询即可取回多个 Entry 及其实体、Assembly、ChemComp、DrugBank
+
+GRAPHQL_API = "https://data.rcsb.org/graphql"
+
 # 定义常用的 HTTP 状态码
 
 HTTP_STATUS = {
     "success": 200,
+    "partial_content": 206,
     "not_found": 404,
     "method_not_allowed": 405,
 }
+# 附件探测需要在回调中看到的状态码：全部 4xx/5xx。3xx 不在其中，交给 RedirectMiddleware 跟随跳转
+
+PROBE_HANDLED_HTTP_STATUS = list(range(400, 600))
 # 定义 Redis Hash 的键名，用于存储每个 PDB ID 的最新 revision 日期，实现增量去重
 
 REDIS_REVISION_HASH = "rcsb_all_api:revision"
@@ -37,6 +46,28 @@ REDIS_REVISION_HASH = "rcsb_all_api:revision"
 
 REDIS_TTL_SECONDS = 60 * 60 * 24 * 60  # 60 天
 
+# ChemComp / DrugBank 跨 Entry 缓存：进程内 LRU 上限 + Redis Hash（整表 TTL）。
+# 常见单体（ALA、HOH、NAG 等）会被成千上万个结构引用，命中缓存即可免去网络请求与规范化。
+
+REDIS_CHEMCOMP_CACHE_HASH = "rcsb_all_api:chemcomp"
+REDIS_DRUGBANK_CACHE_HASH = "rcsb_all_api:drugbank"
+REFERENCE_CACHE_TTL_SECONDS = 60 * 60 * 24 * 7  # 7 天
+REFERENCE_CACHE_MAX_SIZE = 5000
+
+# 持久化抓取边界（frontier）：按运行名保存 Search 偏移、待处理与已完成的 PDB ID，进程崩溃后可从断点继续。
+# 实际键名为 `{前缀}:{frontier 名}:state|pending|completed`，整轮完成后删除。
+
+REDIS_FRONTIER_PREFIX = "rcsb_all_api:frontier"
+
+# 分布式模式：seeder 分页 Search 后把 PDB ID 写入 Redis Stream，多个 worker 通过消费组领取（XREADGROUP）与确认（XACK）。
+# 实际键名为 `{前缀}:{队列名}:stream|seen|seeded|failed`；worker 领取后超过 `QUEUE_CLAIM_IDLE_SECONDS` 未确认的消息
+# 视为所属 worker 已失联，由其它 worker 重新领取，累计投递 `QUEUE_MAX_DELIVERIES` 次仍未完成的记入 failed。
+
+REDIS_QUEUE_PREFIX = "rcsb_all_api:queue"
+QUEUE_CONSUMER_GROUP = "workers"
+QUEUE_CLAIM_IDLE_SECONDS = 600
+QUEUE_MAX_DELIVERIES = 3
+
 # 默认的 Assembly ID，通常 assembly-1 就是代表全链，但有些 PDB 可能没有这个 ID
 
 DEFAULT_ASSEMBLY_ID = "1"
@@ -93,3 +124,130 @@ FIELD_SCHEMAS = {
     },
 }
 
+
+
+# ========== GraphQL 查询 ==========
+# GraphQL 只返回显式选择的字段。启动时按 Data API 的 JSON Schema（`/rest/v1/schema/{名称}`）
+# 生成完整字段选择（`GraphQLQueryBuilder`），与 REST 文档字段一致；Schema 取不到时才退回下方
+# 手写的精简字段集（只覆盖 Spider 与 `FIELD_SCHEMAS` 用到的字段，输出少于 REST 模式）。
+# 嵌套的 ChemComp/DrugBank 会在解析时拆分到 `comp_data` / `drugbank_data`，保证结果结构与 REST 模式一致。
+
+# 生成批量查询所需的 Schema：{Schema 名称: 在查询中的位置}；rest_batch 只用到 entry
+
+GRAPHQL_SCHEMA_NAMES = {
+    "entry": "entries",
+    "polymer_entity": "polymer_entities",
+    "nonpolymer_entity": "nonpolymer_entities",
+    "branched_entity": "branched_entities",
+    "assembly": "assemblies",
+    "chem_comp": "ChemCompFields",
+    "drugbank": "drugbank",
+}
+
+# 由 Schema 生成字段选择时的最大嵌套深度，超出部分直接忽略
+
+GRAPHQL_SCHEMA_MAX_DEPTH = 6
+
+GRAPHQL_CHEM_COMP_FRAGMENT = """
+fragment ChemCompFields on CoreChemComp {
+  rcsb_id
+  chem_comp {
+    id name type formula formula_weight pdbx_formal_charge
+    one_letter_code three_letter_code mon_nstd_parent_comp_id
+  }
+  rcsb_chem_comp_info {
+    atom_count atom_count_chiral atom_count_heavy bond_count bond_count_aromatic
+    initial_release_date revision_date
+  }
+  rcsb_chem_comp_descriptor { InChI InChIKey SMILES SMILES_stereo }
+  drugbank {
+    drugbank_container_identifiers { drugbank_id }
+    drugbank_info { name description indication mechanism_of_action drug_groups synonyms cas_number }
+    drugbank_target { name ordinal target_actions organism_common_name seq_one_letter_code }
+  }
+}
+"""
+
+# Entry 自身字段（不含嵌套实体），`rest_batch` 模式只取这一部分，实体仍走 REST；
+# 同样只是 entry Schema 加载失败时的精简回退
+
+GRAPHQL_ENTRY_FIELDS = """
+    rcsb_id
+    struct { title pdbx_descriptor }
+    struct_keywords { pdbx_keywords text }
+    rcsb_accession_info {
+      deposit_date initial_release_date revision_date major_revision minor_revision status_code
+    }
+    rcsb_entry_container_identifiers {
+      entry_id polymer_entity_ids non_polymer_entity_ids branched_entity_ids assembly_ids
+    }
+    rcsb_entry_info {
+      experimental_method resolution_combined molecular_weight deposited_atom_count
+      polymer_entity_count nonpolymer_entity_count branched_entity_count
+    }
+    exptl { crystals_number details method method_details }
+    audit_author { identifier_ORCID name pdbx_ordinal }
+    citation {
+      book_id_ISBN book_publisher book_publisher_city book_title coordinate_linkage country id
+      journal_abbrev journal_full journal_id_ASTM journal_id_CSD journal_id_ISSN journal_issue
+      journal_volume language page_first page_last pdbx_database_id_DOI pdbx_database_id_PubMed
+      title year
+    }
+    cell {
+      Z_PDB angle_alpha angle_beta angle_gamma formula_units_Z length_a length_b length_c
+      pdbx_unique_axis volume
+    }
+    pdbx_vrpt_summary { report_creation_date PDB_resolution PDB_revision_date }
+"""
+
+GRAPHQL_ENTRY_ONLY_QUERY = """
+query Entries($ids: [String!]!) {
+  entries(entry_ids: $ids) {""" + GRAPHQL_ENTRY_FIELDS + """  }
+}
+"""
+
+GRAPHQL_ENTRIES_QUERY = GRAPHQL_CHEM_COMP_FRAGMENT + """
+query Entries($ids: [String!]!) {
+  entries(entry_ids: $ids) {""" + GRAPHQL_ENTRY_FIELDS + """    polymer_entities {
+      rcsb_id
+      entity_poly {
+        type rcsb_entity_polymer_type pdbx_seq_one_letter_code pdbx_seq_one_letter_code_can
+        pdbx_strand_id rcsb_sample_sequence_length
+      }
+      rcsb_polymer_entity { pdbx_description formula_weight pdbx_number_of_molecules pdbx_ec }
+      rcsb_polymer_entity_container_identifiers { entry_id entity_id asym_ids auth_asym_ids uniprot_ids }
+      rcsb_entity_source_organism { ncbi_taxonomy_id ncbi_scientific_name }
+      chem_comp_monomers { ...ChemCompFields }
+    }
+    nonpolymer_entities {
+      rcsb_id
+      pdbx_entity_nonpoly { comp_id name entity_id }
+      rcsb_nonpolymer_entity { pdbx_description formula_weight pdbx_number_of_molecules }
+      rcsb_nonpolymer_entity_container_identifiers { entry_id entity_id comp_id asym_ids auth_asym_ids }
+      nonpolymer_comp { ...ChemCompFields }
+    }
+    branched_entities {
+      rcsb_id
+      pdbx_entity_branch { type rcsb_branched_component_count }
+      rcsb_branched_entity { pdbx_description formula_weight pdbx_number_of_molecules }
+      rcsb_branched_entity_container_identifiers { entry_id entity_id asym_ids auth_asym_ids }
+      chem_comp_monomers { ...ChemCompFields }
+    }
+    assemblies {
+      rcsb_id
+      rcsb_assembly_container_identifiers { entry_id assembly_id }
+      pdbx_struct_assembly { details method_details oligomeric_count oligomeric_details }
+      rcsb_assembly_info { polymer_entity_count polymer_monomer_count modeled_polymer_monomer_count }
+      rcsb_struct_symmetry { kind type oligomeric_state stoichiometry symbol }
+    }
+  }
+}
+"""
+
+# 实体中嵌套 ChemComp 的字段名，解析时拆出，不保留在实体结果中
+
+GRAPHQL_ENTITY_COMP_KEYS = {
+    "polymer_entities": "chem_comp_monomers",
+    "nonpolymer_entities": "nonpolymer_comp",
+    "branched_entities": "chem_comp_monomers",
+}
@@ -5,14 +5,21 @@
 # @User  : 刘子都
 # @Descriotion  : RCSB PDB 爬虫 - 支持批量全量与增量更新。
 """
+import os
+import socket
+import sys
 from collections import deque
 from datetime import datetime, timezone
 from typing import Any, Dict, Generator, List, Optional
 
 import scrapy
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from twisted.internet import task
 
 from src.constant import BASE_DIR
 from src.items.rcsb_pdb_item import RcsbAllApiItem
+from src.signals import items_stored
 from src.utils.mongodb_manager import MongoDBManager
 from src.utils.redis_manager import RedisManager
 
@@ -20,12 +27,34 @@ from .constants import (
     API_BASE as CONST_API_BASE,
     API_ENDPOINTS,
     DEFAULT_ASSEMBLY_ID,
+    GRAPHQL_API as CONST_GRAPHQL_API,
+    GRAPHQL_SCHEMA_NAMES,
+    HTTP_STATUS,
+    QUEUE_CLAIM_IDLE_SECONDS,
+    QUEUE_CONSUMER_GROUP,
+    QUEUE_MAX_DELIVERIES,
+    REDIS_CHEMCOMP_CACHE_HASH,
+    REDIS_DRUGBANK_CACHE_HASH,
+    REDIS_FRONTIER_PREFIX,
+    REDIS_QUEUE_PREFIX,
     REDIS_REVISION_HASH as CONST_REDIS_HASH,
     REDIS_TTL_SECONDS as CONST_REDIS_TTL,
+    REFERENCE_CACHE_MAX_SIZE,
+    REFERENCE_CACHE_TTL_SECONDS,
     SEARCH_API as CONST_SEARCH_API,
 )
 from .request_builder import RequestBuilder
-from .services import DataParser, EntryContext, FileDownloader, RevisionState
+from .services import (
+    CrawlFrontier,
+    DataParser,
+    DistributedQueue,
+    EntryContext,
+    FileDownloader,
+    GraphQLQueryBuilder,
+    IdListSource,
+    ReferenceCache,
+    RevisionState,
+)
 
 
 class RcsbAllApiSpider(scrapy.Spider):
@@ -46,15 +75,25 @@ class RcsbAllApiSpider(scrapy.Spider):
     # ========== 配置区域 ==========
     DEFAULT_MAX_TARGETS = 100
     DEFAULT_BATCH_SIZE = 100
+    DEFAULT_GRAPHQL_BATCH_SIZE = 10
+    DEFAULT_MAX_IN_FLIGHT = 500  # 同时处理中的 Entry 上限，超过后暂停拉取 Search 下一页
     INCREMENT_COLLECTION = "rcsb_increment_state"
     INCREMENT_DOC_ID = "rcsb_all_api"
     REDIS_REVISION_HASH = CONST_REDIS_HASH
     REDIS_TTL_SECONDS = CONST_REDIS_TTL
+    REVISION_FLUSH_SIZE = 100
+    REVISION_FLUSH_INTERVAL = 5.0
+    REFERENCE_CACHE_MAX_SIZE = REFERENCE_CACHE_MAX_SIZE
+    REFERENCE_CACHE_TTL_SECONDS = REFERENCE_CACHE_TTL_SECONDS
+    QUEUE_CLAIM_IDLE_SECONDS = QUEUE_CLAIM_IDLE_SECONDS
+    QUEUE_MAX_DELIVERIES = QUEUE_MAX_DELIVERIES
+    SEARCH_MAX_RETRIES = 3  # 同一页 Search 非 200 或请求失败时的重试次数，用尽后 Search 标记为失败
     # =============================
 
     SEARCH_API = CONST_SEARCH_API
     API_BASE = CONST_API_BASE
     API_ENDPOINTS = API_ENDPOINTS
+    GRAPHQL_API = CONST_GRAPHQL_API
 
     SECTION_MAP = {
         "polymer_entity": "CorePolymerEntity",
@@ -71,6 +110,7 @@ class RcsbAllApiSpider(scrapy.Spider):
     # - 下载延迟：0.3 秒，随机化
     # - 超时和重试：30 秒超时，3 次重试
     # - 自动限流：启用，目标并发 4.0
+    # - 连接池：按域名保留长连接，统计新建/复用次数（http_pool/* stats）
     # - Pipeline：文件下载 → 文件替换（OSS上传） → 数据存储（MongoDB）
 
     custom_settings = {
@@ -88,6 +128,18 @@ class RcsbAllApiSpider(scrapy.Spider):
         "AUTOTHROTTLE_START_DELAY": 0.3,
         "AUTOTHROTTLE_MAX_DELAY": 2.0,
         "AUTOTHROTTLE_TARGET_CONCURRENCY": 4.0,
+        # ========== 连接池 ==========
+        # 探测与 API 请求共用长连接，避免每次探测都重新握手（TCP + TLS）
+        "DOWNLOAD_HANDLERS": {
+            "http": "src.handlers.pooled_http_handler.PooledHTTPDownloadHandler",
+            "https": "src.handlers.pooled_http_handler.PooledHTTPDownloadHandler",
+        },
+        "HTTP_POOL_HOST_LIMITS": {
+            "files.rcsb.org": 16,
+            "cdn.rcsb.org": 16,
+            "data.rcsb.org": 16,
+        },
+        "HTTP_POOL_KEEPALIVE": 240,
         # ========== 其他 ==========
         "LOG_LEVEL": "INFO",
         "DOWNLOADER_MIDDLEWARES": {
@@ -110,13 +162,22 @@ class RcsbAllApiSpider(scrapy.Spider):
         start_from=None,
         batch_size=None,
         overlap_days=None,
+        fetch_mode=None,
+        graphql_batch_size=None,
+        max_in_flight=None,
+        frontier=None,
+        queue=None,
+        role=None,
+        id_file=None,
+        shard_index=None,
+        shard_count=None,
         *args,
         **kwargs,
     ):
         """
         初始化爬虫并加载依赖。
 
-        :param pdb_id: 指定单个结构 ID
+        :param pdb_id: 指定单个结构 ID，传入后跳过 Search 只抓取该结构
         :type pdb_id: str or None
         :param output_filename: 自定义输出文件名
         :type output_filename: str or None
@@ -132,6 +193,24 @@ class RcsbAllApiSpider(scrapy.Spider):
         :type batch_size: int or None
         :param overlap_days: 增量模式向前重叠天数
         :type overlap_days: int or None
+        :param fetch_mode: 数据获取方式，rest（逐个端点）、rest_batch（整页 Entry 一次查询，实体仍走 REST）或 graphql（批量查询）
+        :type fetch_mode: str or None
+        :param graphql_batch_size: graphql 模式下单次查询的 Entry 数量
+        :type graphql_batch_size: int or None
+        :param max_in_flight: 同时处理中的 Entry 上限（在途窗口大小）
+        :type max_in_flight: int or None
+        :param frontier: 持久化抓取边界的名称，传入后记录 Search 偏移与待处理/已完成 ID，同名重启时从断点继续
+        :type frontier: str or None
+        :param queue: 分布式队列名称，传入后进入分布式模式（多机共享同一个 Redis Stream）
+        :type queue: str or None
+        :param role: 分布式角色，seeder（分页 Search 并入队）或 worker（领取 ID 并抓取，默认）
+        :type role: str or None
+        :param id_file: ID 列表文件（每行一个 ID，`-` 表示标准输入），传入后跳过 Search 直接按列表抓取
+        :type id_file: str or None
+        :param shard_index: id_file 分片序号（从 0 开始）
+        :type shard_index: int or None
+        :param shard_count: id_file 分片总数，各进程用相同的 shard_count 与不同的 shard_index 取互不重叠的子集
+        :type shard_count: int or None
         """
         super().__init__(*args, **kwargs)
 
@@ -141,21 +220,45 @@ class RcsbAllApiSpider(scrapy.Spider):
         if self.mode not in {"full", "incremental"}:
             self.mode = "full"
 
+        # 设置数据获取方式：rest 按端点逐个请求，rest_batch 每页 Entry 合并为一次查询，graphql 每批 Entry 一次查询全部数据
+
+        self.fetch_mode = (fetch_mode or "rest").lower()
+        if self.fetch_mode not in {"rest", "rest_batch", "graphql"}:
+            self.fetch_mode = "rest"
+
         # - `max_targets`：最大结构数量
         # - `batch_size`：每批数量
         # - `start_from`：起始偏移
         # - `overlap_days`：增量模式重叠天数
 
+        # ID 列表模式下未指定 `max_targets` 时不限制数量，以列表为准
+
         self.max_targets = (
-            int(max_targets) if max_targets else self.DEFAULT_MAX_TARGETS
+            int(max_targets) if max_targets else (sys.maxsize if id_file else self.DEFAULT_MAX_TARGETS)
         )
         self.batch_size = (
             int(batch_size)
             if batch_size
             else min(self.DEFAULT_BATCH_SIZE, self.max_targets)
         )
+
+        # ID 来源：`id_file`（可分片）或单个 `pdb_id`，两者都不传时走 Search API
+
+        self.id_source = None
+        if id_file:
+            self.id_source = IdListSource(
+                id_file,
+                shard_index=int(shard_index) if shard_index else 0,
+                shard_count=int(shard_count) if shard_count else 1,
+            )
+        elif pdb_id:
+            self.id_source = IdListSource.from_ids([pdb_id])
         self.start_from = int(start_from) if start_from else 0
         self.overlap_days = int(overlap_days) if overlap_days else 1
+        self.graphql_batch_size = (
+            int(graphql_batch_size) if graphql_batch_size else self.DEFAULT_GRAPHQL_BATCH_SIZE
+        )
+        self.max_in_flight = max(1, int(max_in_flight) if max_in_flight else self.DEFAULT_MAX_IN_FLIGHT)
 
         # 初始化数据库连接
 
@@ -165,8 +268,11 @@ class RcsbAllApiSpider(scrapy.Spider):
 
         # 初始化各个服务模块
 
-        self.request_builder = RequestBuilder(self.SEARCH_API, self.API_ENDPOINTS)
+        self.request_builder = RequestBuilder(self.SEARCH_API, self.API_ENDPOINTS, self.GRAPHQL_API)
         self.data_parser = DataParser()
+        self._flush_loop = None
+        self.graphql_queries = GraphQLQueryBuilder()
+        self.schema_pending = 0
         self.file_downloader = FileDownloader(self.logger, timeout=5, max_retries=5)
         self.revision_state = RevisionState(
             collection=self.increment_collection,
@@ -175,15 +281,90 @@ class RcsbAllApiSpider(scrapy.Spider):
             redis_hash=self.REDIS_REVISION_HASH,
             ttl_seconds=self.REDIS_TTL_SECONDS,
             overlap_days=self.overlap_days,
+            flush_size=self.REVISION_FLUSH_SIZE,
+            flush_interval=self.REVISION_FLUSH_INTERVAL,
+            logger=self.logger,
+        )
+
+        # ChemComp / DrugBank 跨 Entry 缓存，只有两级缓存都未命中的 ID 才发起网络请求
+
+        self.comp_cache = ReferenceCache(
+            "ChemComp",
+            self.redis_conn,
+            REDIS_CHEMCOMP_CACHE_HASH,
+            ttl_seconds=self.REFERENCE_CACHE_TTL_SECONDS,
+            max_size=self.REFERENCE_CACHE_MAX_SIZE,
+            logger=self.logger,
+        )
+        self.drugbank_cache = ReferenceCache(
+            "DrugBank",
+            self.redis_conn,
+            REDIS_DRUGBANK_CACHE_HASH,
+            ttl_seconds=self.REFERENCE_CACHE_TTL_SECONDS,
+            max_size=self.REFERENCE_CACHE_MAX_SIZE,
+            logger=self.logger,
         )
 
         # 获取增量模式的起始日期
 
         self.increment_start_date = self.revision_state.increment_start
 
+        # 分布式模式（可选）：seeder 只负责 Search 入队，worker 只从共享队列领取 ID
+
+        self.role = None
+        self.work_queue = None
+        if queue:
+            self.role = (role or "worker").lower()
+            if self.role not in {"seeder", "worker"}:
+                self.role = "worker"
+            self.work_queue = DistributedQueue(
+                self.redis_conn,
+                REDIS_QUEUE_PREFIX,
+                queue,
+                consumer=f"{socket.gethostname()}:{os.getpid()}",
+                group=QUEUE_CONSUMER_GROUP,
+                ttl_seconds=self.REDIS_TTL_SECONDS,
+                claim_idle_seconds=self.QUEUE_CLAIM_IDLE_SECONDS,
+                max_deliveries=self.QUEUE_MAX_DELIVERIES,
+                logger=self.logger,
+            )
+            self.work_queue.ensure_group()
+            if frontier:
+                self.logger.warning("分布式模式下进度由共享队列记录，忽略 frontier=%s", frontier)
+                frontier = None
+            if self.role == "worker" and self.id_source:
+                self.logger.warning("worker 只从共享队列领取 ID，忽略 id_file/pdb_id（应传给 seeder）")
+                self.id_source = None
+
+        # 持久化抓取边界（可选），与 revision/缓存共用同一个 Redis 连接
+
+        self.frontier = (
+            CrawlFrontier(
+                self.redis_conn,
+                REDIS_FRONTIER_PREFIX,
+                frontier,
+                ttl_seconds=self.REDIS_TTL_SECONDS,
+                flush_size=self.REVISION_FLUSH_SIZE,
+                flush_interval=self.REVISION_FLUSH_INTERVAL,
+                logger=self.logger,
+            )
+            if frontier
+            else None
+        )
+
         # 初始化运行状态变量
 
+        # - `entry_queue`：Search 已返回、尚未进入在途窗口的 PDB ID
+        # - `search_in_flight`：是否有未返回的 Search 请求，保证同一时刻最多一页
+        # - `next_search_start`：下一页 Search 的偏移
+        # - `search_exhausted`：Search 正常翻到末尾或达到 `max_targets`（Search 出错时只有 `search_finished`）
+        # - `search_failed`：同一页 Search 重试 `SEARCH_MAX_RETRIES` 次仍失败，本轮 Search 不完整
+
         self.search_finished = False
+        self.search_exhausted = False
+        self.search_failed = False
+        self.search_in_flight = False
+        self.next_search_start = self.start_from
         self.total_enqueued = 0
         self.entry_queue: deque[str] = deque()
         self.entry_contexts: Dict[str, Dict[str, Any]] = {}
@@ -191,15 +372,227 @@ class RcsbAllApiSpider(scrapy.Spider):
         self.duplicate_skipped = 0
         self.file_audit: Dict[str, Dict[str, Any]] = {}
 
+        # worker 不请求 Search；`queue_messages` 记录 PDB ID 对应的队列消息，完成时确认
+
+        self.queue_messages: Dict[str, str] = {}
+        if self.role == "worker":
+            self.search_finished = self.search_exhausted = True
+
+        if self.frontier:
+            self._restore_frontier()
+
+        # ID 列表模式不请求 Search；读完列表即视为“Search 结束”
+
+        if self.id_source:
+            self.search_finished = True
+            self.search_exhausted = self.id_source.exhausted
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        """
+        创建爬虫并注册信号：opened 启动缓冲的定时写入，空闲信号用于在途窗口的兜底补充，items_stored 用于在存储 Pipeline 写入成功后记录 revision 与完成状态。
+
+        :param crawler: Scrapy Crawler
+        :type crawler: scrapy.crawler.Crawler
+        :return: 爬虫实例
+        :rtype: RcsbAllApiSpider
+        """
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider._on_spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(spider._on_spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(spider._on_items_stored, signal=items_stored)
+        return spider
+
+    def _on_spider_opened(self, spider):
+        """
+        启动定时任务，按 `REVISION_FLUSH_INTERVAL` 写入缓冲中的 revision，写入稀疏时也不会一直滞留在内存里。
+
+        :param spider: 当前爬虫
+        :type spider: scrapy.Spider
+        :return: None
+        :rtype: None
+        """
+        self._flush_loop = task.LoopingCall(self._flush_stale_buffers)
+        self._flush_loop.start(self.REVISION_FLUSH_INTERVAL, now=False)
+        return None
+
+    def _flush_stale_buffers(self):
+        """
+        定时任务：写入超过间隔未写入的缓冲；Redis 异常已在内部记录，不会中断定时任务。
+
+        :return: None
+        :rtype: None
+        """
+        self.revision_state.flush_if_stale()
+        return None
+
+    def _restore_frontier(self):
+        """
+        从持久化边界恢复上次运行的进度：未完成的 ID 重新排队，Search 从保存的偏移继续。
+
+        Search 按 revision_date 排序，两次运行之间有结构更新时后续偏移会前移，
+        因此恢复时回退一页，重复返回的 ID 由 `CrawlFrontier.filter_new` 过滤。
+
+        :return: None
+        :rtype: None
+        """
+        state = self.frontier.load()
+        if not state:
+            self.logger.info("🧭 frontier=%s 无历史进度，从 start_from=%d 开始", self.frontier.name, self.start_from)
+            return None
+
+        self.total_enqueued = state["total_enqueued"]
+        self.search_exhausted = self.search_finished = state["search_finished"]
+        self.next_search_start = max(0, state["next_search_start"] - (0 if self.search_finished else self.batch_size))
+
+        # ID 列表模式下偏移为已读取的 ID 数（同一文件、同一分片），直接跳过；回退的一页同样由 filter_new 去重
+
+        if self.id_source:
+            self.next_search_start = self.id_source.skip(self.next_search_start)
+
+        # 增量模式沿用上次的起始日期，保证偏移对应同一个 Search 查询
+
+        if self.mode == "incremental" and state["increment_start"]:
+            self.increment_start_date = state["increment_start"]
+        self.revision_state.update_run_max(state["run_max_revision"])
+
+        self.entry_queue.extend(state["pending"])
+        if self.mode == "incremental":
+            self.revision_state.prefetch(state["pending"])
+        self.logger.info(
+            "🧭 frontier=%s 从断点继续：已完成 %d，待重新处理 %d，Search 偏移 %d%s",
+            self.frontier.name,
+            state["completed_count"],
+            len(state["pending"]),
+            self.next_search_start,
+            "（Search 已结束）" if self.search_finished else "",
+        )
+        return None
+
+    def _on_items_stored(self, receipts, spider):
+        """
+        存储 Pipeline 批量写入成功后再记录 revision 与完成状态（含队列 ack），
+        仍在 Pipeline 缓冲区或写入失败的结构不会推进增量游标，中断后会被重新处理。
+
+        Scrapy 关闭时先关闭 Pipeline（写入剩余缓冲）再调用 `closed`，最后一批回执早于边界与 revision 的收尾写入。
+
+        :param receipts: 已写入结构的回执，含 pdb_id 与 revision
+        :type receipts: list[dict]
+        :param spider: 当前爬虫
+        :type spider: scrapy.Spider
+        :return: None
+        :rtype: None
+        """
+        for receipt in receipts:
+            pdb_id = receipt.get("pdb_id")
+            revision = receipt.get("revision")
+            self._mark_completed(pdb_id, revision)
+            if revision:
+                self.revision_state.persist_revision(pdb_id, revision)
+        return None
+
+    def _mark_completed(self, pdb_id, revision):
+        """
+        记录结构已完成（入库或判重跳过）：更新运行期最大 revision，并写入持久化边界。
+
+        :param pdb_id: 结构 ID
+        :type pdb_id: str
+        :param revision: 结构的 revision_date
+        :type revision: str or None
+        :return: None
+        :rtype: None
+        """
+        self.revision_state.update_run_max(revision)
+        if self.frontier:
+            self.frontier.mark_completed(pdb_id, self.revision_state.run_max_revision)
+        message_id = self.queue_messages.pop(pdb_id, None)
+        if message_id:
+            self.work_queue.ack([message_id])
+        return None
+
     def start_requests(self):
         """
-        Scrapy 入口：调度 Search API 请求。
+        Scrapy 入口：调度 ID 列表中的 Entry 或 Search API 请求。
 
         :return: Search 请求序列
         :rtype: Generator[scrapy.Request, None, None]
         """
-        # 构造 Search API 请求，返回 scrapy.Request
-        yield from self._request_search(self.start_from)
+        # 批量模式先加载 Data API Schema 生成完整字段选择，加载完成后再开始调度 Entry
+
+        if self.fetch_mode != "rest" and self.role != "seeder":
+            yield from self._request_graphql_schemas()
+            return
+
+        # 先调度断点恢复的 ID，再从 ID 列表读取或按 `next_search_start` 构造 Search API 请求
+        yield from self._fill_window()
+
+    def _request_graphql_schemas(self):
+        """
+        请求批量模式所需的 JSON Schema：graphql 需要全部，rest_batch 只需要 entry。
+
+        :return: Schema 请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+        names = list(GRAPHQL_SCHEMA_NAMES) if self.fetch_mode == "graphql" else ["entry"]
+        self.schema_pending = len(names)
+        for name in names:
+            yield self.request_builder.build_api_request(
+                "schema",
+                name,
+                callback=self._parse_graphql_schema,
+                errback=self._graphql_schema_errback,
+                meta={"schema": name},
+            )
+
+    def _parse_graphql_schema(self, response):
+        """
+        由 Schema 生成字段选择；全部返回后开始调度 Entry。
+
+        :param response: Schema 响应
+        :type response: scrapy.http.Response
+        :return: None（通过 yield 产生请求）
+        :rtype: None
+        """
+        name = response.meta["schema"]
+        if not self.graphql_queries.add_schema(name, self.data_parser.parse(response, self.logger)):
+            self.logger.warning("Schema %s 未生成任何字段", name)
+        yield from self._finish_graphql_schema()
+        return None
+
+    def _graphql_schema_errback(self, failure):
+        """
+        Schema 请求失败时记录原因，仍计入已完成，避免阻塞调度。
+
+        :param failure: 失败对象
+        :type failure: scrapy.Failure
+        :return: None（通过 yield 产生请求）
+        :rtype: None
+        """
+        self.logger.error("Schema %s 请求失败: %s", failure.request.meta.get("schema"), failure.value)
+        yield from self._finish_graphql_schema()
+        return None
+
+    def _finish_graphql_schema(self):
+        """
+        递减 Schema 计数，全部结束后开始调度 Entry（Schema 不全时使用精简查询）。
+
+        :return: Entry/Search 请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+        self.schema_pending -= 1
+        if self.schema_pending > 0:
+            return None
+        required = GRAPHQL_SCHEMA_NAMES if self.fetch_mode == "graphql" else ["entry"]
+        missing = [name for name in required if name not in self.graphql_queries.selections]
+        if missing:
+            self.logger.warning(
+                "🧩 Schema 未全部加载（缺少 %s），%s 模式退回精简字段集，输出字段少于 REST 模式",
+                ",".join(missing),
+                self.fetch_mode,
+            )
+        else:
+            self.logger.info("🧩 %s 查询字段已按 Data API Schema 生成", self.fetch_mode)
+        yield from self._fill_window()
 
     def parse(self, response):
         """
@@ -212,12 +605,14 @@ class RcsbAllApiSpider(scrapy.Spider):
 
         yield from self.start_requests()
 
-    def _request_search(self, start):
+    def _request_search(self, start, retries=0):
         """
         构造 Search API 请求。
 
         :param start: 分页起点
         :type start: int
+        :param retries: 该页已重试次数，重试请求不经过去重过滤
+        :type retries: int
         :return: Search 请求
         :rtype: Generator[scrapy.Request, None, None]
         """
@@ -229,14 +624,57 @@ class RcsbAllApiSpider(scrapy.Spider):
 
         # 构造 Search API 请求，返回 scrapy.Request
 
-        yield self.request_builder.build_search_request(
+        self.search_in_flight = True
+        request = self.request_builder.build_search_request(
             start=start,
             rows=rows,
             mode=self.mode,
             increment_start=self.increment_start_date,
             logger=self.logger,
             callback=self.parse_search,
-        )
+        ).replace(errback=self._search_errback, dont_filter=retries > 0)
+        request.meta["search_retries"] = retries
+        yield request
+
+    def _retry_search(self, request, reason):
+        """
+        Search 分页失败时重试同一页；重试用尽后标记 Search 失败并结束翻页。
+
+        seeder 随后写入带失败标记的 `:seeded`，worker 处理完已入队部分即可退出，不会一直等待。
+
+        :param request: 失败的 Search 请求
+        :type request: scrapy.Request
+        :param reason: 失败原因（用于日志）
+        :type reason: str
+        :return: Search 重试请求，或窗口补充/入队后的请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+        self.search_in_flight = False
+        start = request.meta.get("start", self.next_search_start)
+        retries = request.meta.get("search_retries", 0)
+        if retries < self.SEARCH_MAX_RETRIES:
+            self.logger.warning(
+                "Search 分页 start=%s 失败（%s），第 %d/%d 次重试", start, reason, retries + 1, self.SEARCH_MAX_RETRIES
+            )
+            yield from self._request_search(start, retries + 1)
+            return None
+
+        self.logger.error("Search 分页 start=%s 重试 %d 次仍失败（%s），停止翻页", start, retries, reason)
+        self.search_finished = self.search_failed = True
+        yield from self._fill_window()
+        return None
+
+    def _search_errback(self, failure):
+        """
+        Search 请求失败（重试中间件用尽后的 5xx、超时、连接错误）时重试该页。
+
+        :param failure: 失败对象
+        :type failure: scrapy.Failure
+        :return: None（通过 yield 产生请求）
+        :rtype: None
+        """
+        yield from self._retry_search(failure.request, repr(failure.value))
+        return None
 
     def parse_search(self, response):
         """
@@ -250,8 +688,10 @@ class RcsbAllApiSpider(scrapy.Spider):
 
         # 检查响应状态码。
 
+        self.search_in_flight = False
         if response.status != 200:
             self.logger.error("Search API 返回异常 %s, body=%s", response.status, response.text)
+            yield from self._retry_search(response.request, f"HTTP {response.status}")
             return None
 
         # 解析 JSON，如果没有结果则标记完成。
@@ -259,34 +699,224 @@ class RcsbAllApiSpider(scrapy.Spider):
         data = self.data_parser.parse(response, self.logger)
         result_set = data.get("result_set", [])
         if not result_set:
-            self.search_finished = True
+            self.search_finished = self.search_exhausted = True
+            self._record_frontier_page([])
+            yield from self._fill_window()
             return None
 
-        # 解析结果集，注册 Entry 上下文并发起请求。
+        # 本页 ID 先进入 `entry_queue`，由在途窗口按完成情况逐步调度，避免上下文无限堆积。
+        # 启用 frontier 时先去掉已完成或已在待处理集合中的 ID。
 
-        for entry in result_set:
-            if self.total_enqueued >= self.max_targets:
-                break
-            pdb_id = entry.get("identifier")
-            if not pdb_id:
-                continue
-            self.total_enqueued += 1
-            yield from self._schedule_entry(pdb_id)
+        page_ids = self._enqueue_ids(
+            [entry["identifier"].upper() for entry in result_set if entry.get("identifier")]
+        )
+        self.next_search_start = response.meta.get("start", 0) + len(result_set)
+        if self.total_enqueued >= self.max_targets:
+            self.search_finished = self.search_exhausted = True
+        self._record_frontier_page(page_ids)
 
-        # 如果未达到上限，继续请求下一页。
+        yield from self._fill_window()
 
-        if self.total_enqueued < self.max_targets:
-            next_start = response.meta.get("start", 0) + len(result_set)
-            yield from self._request_search(next_start)
+    def _enqueue_ids(self, pdb_ids):
+        """
+        将一批 ID 放入 `entry_queue`（Search 分页与 ID 列表共用）。
+
+        启用 frontier 时先去掉已完成或已在待处理集合中的 ID，再按 `max_targets` 截断；
+        增量模式下用一次 HMGET 预取整批的已存储 revision，判重时不再逐条访问 Redis（seeder 不判重）。
+
+        :param pdb_ids: 大写的结构 ID 列表
+        :type pdb_ids: list
+        :return: 实际入队的 ID
+        :rtype: list
+        """
+        if self.frontier:
+            pdb_ids = self.frontier.filter_new(pdb_ids)
+        pdb_ids = pdb_ids[: max(self.max_targets - self.total_enqueued, 0)]
+        self.total_enqueued += len(pdb_ids)
+        if self.mode == "incremental" and self.role != "seeder":
+            self.revision_state.prefetch(pdb_ids)
+        self.entry_queue.extend(pdb_ids)
+        return pdb_ids
+
+    def _read_id_source(self, count):
+        """
+        从 ID 列表读取下一批 ID 入队，读完或达到 `max_targets` 时标记结束。
+
+        :param count: 读取数量
+        :type count: int
+        :return: None
+        :rtype: None
+        """
+        raw_ids = self.id_source.read(count)
+        self.next_search_start += len(raw_ids)
+        page_ids = self._enqueue_ids(raw_ids)
+        if self.total_enqueued >= self.max_targets:
+            self.id_source.close()
+        self.search_exhausted = self.id_source.exhausted
+        self._record_frontier_page(page_ids)
+        return None
+
+    def _record_frontier_page(self, page_ids):
+        """
+        将本页新入队的 ID 与推进后的 Search 偏移写入持久化边界。
+
+        :param page_ids: 本页新入队的结构 ID
+        :type page_ids: list
+        :return: None
+        :rtype: None
+        """
+        if not self.frontier:
+            return None
+        self.frontier.record_page(
+            page_ids,
+            self.next_search_start,
+            self.total_enqueued,
+            self.search_exhausted,
+            self.increment_start_date,
+        )
+        return None
+
+    def _fill_window(self):
+        """
+        从 `entry_queue` 取出 ID 填满在途窗口，队列不足一页时再请求 Search 下一页。
+
+        每当有 Entry 完成（保存、判重跳过或失败清理）都会调用，实现按完成情况拉取的背压。
+        rest_batch/graphql 模式下先收集 ID，再合并为批量查询。
+
+        :return: Entry/探测/Search 请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+        if self.role == "seeder":
+            yield from self._seed_queue()
+            return
+        if self.schema_pending:
+            return
+        if self.role == "worker":
+            self._claim_queue_entries()
+        if self.id_source and not self.id_source.exhausted and len(self.entry_queue) < self.batch_size:
+            self._read_id_source(max(self.batch_size, self.max_in_flight - len(self.entry_contexts)))
+
+        batch = [] if self.fetch_mode in {"rest_batch", "graphql"} else None
+        while self.entry_queue and len(self.entry_contexts) < self.max_in_flight:
+            yield from self._schedule_entry(self.entry_queue.popleft(), batch)
+            if batch is not None and len(batch) >= self.batch_size:
+                yield from self._request_batch_entries(batch)
+                batch = []
+        if batch:
+            yield from self._request_batch_entries(batch)
+
+        # 同一时刻最多一页 Search 在途，排队 ID 最多约两页，常驻内存由窗口大小决定
+
+        if not self.search_finished and not self.search_in_flight and len(self.entry_queue) < self.batch_size:
+            yield from self._request_search(self.next_search_start)
+
+    def _seed_queue(self):
+        """
+        seeder：把 Search 返回的 ID 写入共享队列，并立即请求下一页（不抓取 Entry，无需在途窗口）。
+
+        :return: Search 请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+
+        # ID 列表模式：一次读完整个列表，按批入队
+
+        while self.id_source and not self.id_source.exhausted:
+            self._read_id_source(self.batch_size)
+            if self.entry_queue:
+                self.work_queue.push(list(self.entry_queue))
+                self.entry_queue.clear()
+        if self.entry_queue:
+            pushed = self.work_queue.push(list(self.entry_queue))
+            self.logger.info("📤 入队 %d 条（本页 %d 条，已在队列中的跳过）", pushed, len(self.entry_queue))
+            self.entry_queue.clear()
+        if not self.search_finished and not self.search_in_flight:
+            yield from self._request_search(self.next_search_start)
+        elif (self.search_exhausted or self.search_failed) and not self.search_in_flight:
+
+            # Search 失败时同样标记 seeded（带失败标记），worker 处理完已入队部分后退出
+
+            self.work_queue.mark_seeded(search_failed=self.search_failed)
+            if self.search_failed:
+                self.logger.error("📤 Search 失败，已入队部分标记为本轮全部：%s", self.work_queue.summary())
+            else:
+                self.logger.info("📤 Search 已全部入队：%s", self.work_queue.summary())
+
+    def _claim_queue_entries(self):
+        """
+        worker：排队 ID 不足一页且窗口有空位时，从共享队列领取 ID。
+
+        :return: None
+        :rtype: None
+        """
+        room = self.max_in_flight - len(self.entry_contexts) - len(self.entry_queue)
+        if room <= 0 or len(self.entry_queue) >= self.batch_size:
+            return None
+        # 接管回来的消息可能是本进程仍在处理的结构，只更新消息 ID，不重复调度
+
+        queued = set(self.entry_queue)
+        pdb_ids = []
+        for message_id, pdb_id in self.work_queue.claim(room):
+            pdb_id = pdb_id.upper()
+            self.queue_messages[pdb_id] = message_id
+            if pdb_id not in self.entry_contexts and pdb_id not in queued:
+                queued.add(pdb_id)
+                pdb_ids.append(pdb_id)
+        if not pdb_ids:
+            return None
+        if self.mode == "incremental":
+            self.revision_state.prefetch(pdb_ids)
+        self.total_enqueued += len(pdb_ids)
+        self.entry_queue.extend(pdb_ids)
+        return None
+
+    def _request_batch_entries(self, pdb_ids):
+        """
+        按 fetch_mode 为一批 ID 发起批量 Entry 查询。
+
+        :param pdb_ids: 已注册上下文的结构 ID 列表
+        :type pdb_ids: list
+        :return: GraphQL 请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+        if self.fetch_mode == "graphql":
+            yield from self._request_graphql_entries(pdb_ids)
         else:
-            self.search_finished = True
+            yield from self._request_entry_batch(pdb_ids)
 
-    def _schedule_entry(self, pdb_id):
+    def _on_spider_idle(self):
+        """
+        空闲兜底：没有在途请求时，窗口内剩余的上下文已无法完成，清理后继续补充窗口。
+
+        :return: None
+        :rtype: None
+        """
+        if self.entry_contexts:
+            self.logger.error(
+                "在途窗口中 %d 条 Entry 已无后续请求，放弃：%s",
+                len(self.entry_contexts),
+                ",".join(sorted(self.entry_contexts)[:20]),
+            )
+            for pdb_id in list(self.entry_contexts):
+                self._cleanup_entry(pdb_id)
+
+        requests = list(self._fill_window())
+        if not requests:
+            # worker 在 seeder 未结束或其它 worker 仍有未确认消息时保持运行，空闲信号会周期性重试领取
+            if self.role == "worker" and not self.work_queue.is_drained():
+                raise DontCloseSpider
+            return None
+        for request in requests:
+            self.crawler.engine.crawl(request)
+        raise DontCloseSpider
+
+    def _schedule_entry(self, pdb_id, batch=None):
         """
         注册 Entry 上下文并发起请求。
 
         :param pdb_id: 结构 ID
         :type pdb_id: str
+        :param batch: 批量模式下收集 ID 的列表，传入时不单独发起 Entry 请求
+        :type batch: list or None
         :return: Entry/资源预探测请求
         :rtype: Generator[scrapy.Request, None, None]
         """
@@ -303,16 +933,129 @@ class RcsbAllApiSpider(scrapy.Spider):
         context = EntryContext.from_bundle(pdb_id, bundle)
         self.entry_contexts[pdb_id] = context
 
-        # 构造 Entry API 请求，返回 scrapy.Request
+        # 构造 Entry API 请求，返回 scrapy.Request；批量模式下由调用方统一请求
 
-        yield self.request_builder.build_api_request(
-            "entry",
-            pdb_id,
-            callback=self.parse_entry,
-            errback=self._entry_errback,
-            meta={"pdb_id": pdb_id},
+        if batch is not None:
+            batch.append(pdb_id)
+        else:
+            yield from self._request_single_entries([pdb_id])
+
+        # CIF 与结构图片的探测与 Entry 请求并行进行，不阻塞反应器
+
+        yield from self._schedule_probes(context, bundle["probe_targets"])
+
+    def _schedule_probes(self, context, targets):
+        """
+        为附件探测目标发起 HEAD 请求，并累加 `asset` 计数器。
+
+        :param context: Entry 上下文
+        :type context: EntryContext
+        :param targets: (审计字段, 候选 URL 列表) 列表
+        :type targets: list
+        :return: 探测请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+        for asset, candidates in targets:
+            context["pending"]["asset"] += 1
+            yield self._build_probe(context["pdb_id"], asset, candidates)
+
+    def _build_probe(self, pdb_id, asset, candidates, method="HEAD"):
+        """
+        构造单个附件的探测请求，候选 URL 列表随 meta 传递以便依次回退。
+
+        :param pdb_id: 结构 ID
+        :type pdb_id: str
+        :param asset: 审计字段名
+        :type asset: str
+        :param candidates: 候选 URL 列表，首个为当前探测目标
+        :type candidates: list
+        :param method: HEAD 或 GET
+        :type method: str
+        :return: 探测请求
+        :rtype: scrapy.Request
+        """
+        return self.request_builder.build_probe_request(
+            candidates[0],
+            method=method,
+            timeout=self.file_downloader.timeout,
+            max_retries=self.file_downloader.max_retries,
+            callback=self._parse_probe,
+            errback=self._probe_errback,
+            meta={"pdb_id": pdb_id, "asset": asset, "candidates": candidates},
         )
 
+    def _parse_probe(self, response):
+        """
+        解析附件探测结果：405 回退为 GET，结构图片不可用时探测下一个候选，否则写入审计。
+
+        :param response: 探测响应
+        :type response: scrapy.http.Response
+        :return: None（通过 yield 产生请求）
+        :rtype: None
+        """
+        pdb_id = response.meta["pdb_id"]
+        context = self.entry_contexts.get(pdb_id)
+        if not context:
+            return None
+
+        # 服务器不支持 HEAD（405）时，改用 GET 重新探测同一 URL。
+
+        method = response.request.method
+        if method == "HEAD" and response.status == HTTP_STATUS["method_not_allowed"]:
+            yield self._build_probe(
+                pdb_id, response.meta["asset"], response.meta["candidates"], method="GET"
+            )
+            return None
+
+        result = self.file_downloader.build_probe_result(
+            response.meta["candidates"][0], status=response.status, method=method
+        )
+        yield from self._finish_probe(context, response.meta, result)
+
+    def _probe_errback(self, failure):
+        """
+        探测请求在重试耗尽后仍失败（超时、连接错误等），记录原因并继续后续流程。
+
+        :param failure: 失败对象
+        :type failure: scrapy.Failure
+        :return: None（通过 yield 产生请求）
+        :rtype: None
+        """
+        meta = failure.request.meta
+        context = self.entry_contexts.get(meta.get("pdb_id"))
+        if not context:
+            return None
+        result = self.file_downloader.build_probe_result(
+            meta["candidates"][0], reason=str(failure.value)
+        )
+        yield from self._finish_probe(context, meta, result)
+
+    def _finish_probe(self, context, meta, result):
+        """
+        结果不可用且仍有候选时探测下一个，否则写入审计、递减计数器并检查是否可以保存。
+
+        :param context: Entry 上下文
+        :type context: EntryContext
+        :param meta: 探测请求的 meta
+        :type meta: dict
+        :param result: 探测结果
+        :type result: dict
+        :return: 后续请求或 Item
+        :rtype: Generator
+        """
+        asset = meta["asset"]
+        remaining = meta["candidates"][1:]
+        if not result.get("available") and remaining:
+            yield self._build_probe(context["pdb_id"], asset, remaining)
+            return None
+
+        self.file_downloader.record_probe(context, asset, result)
+        context["pending"]["asset"] = max(0, context["pending"]["asset"] - 1)
+        followups = self._maybe_finalize(context["pdb_id"])
+        if followups:
+            yield from followups
+        return None
+
 
     def parse_entry(self, response):
         """
@@ -336,43 +1079,42 @@ class RcsbAllApiSpider(scrapy.Spider):
         data = self.data_parser.parse(response, self.logger)
         if not data:
             self._cleanup_entry(pdb_id)
+            yield from self._fill_window()
             return None
 
         # 提取 rcsb_id 和 properties，进行字段规范化。
 
-        context["result"]["rcsb_id"] = data.get("rcsb_id")
         properties = {k: v for k, v in data.items() if k != "rcsb_id"}
         properties = self.data_parser.normalize(properties)
-        context["result"]["properties"] = properties
-
-        # 提取 revision_date，更新运行期最大 revision。
+        if not self._apply_entry_data(context, data.get("rcsb_id"), properties):
+            yield from self._fill_window()
+            return None
 
-        revision_date = (data.get("rcsb_accession_info") or {}).get("revision_date")
-        context["revision_date"] = revision_date
-        self.revision_state.update_run_max(revision_date)
+        # 检查是否有验证报告，调度验证文件探测，再调度实体与 Assembly。
 
-        # 检查是否有验证报告，处理验证文件。
-        has_validation_report = "pdbx_vrpt_summary" in data
-        self.file_downloader.handle_validation_assets(context, has_validation_report)
+        yield from self._schedule_validation_probes(context)
+        yield from self._schedule_entry_children(context)
 
-        # 增量模式下检查是否重复，如果重复则跳过。
+    def _schedule_entry_children(self, context):
+        """
+        根据 Entry 的容器标识调度 Assembly 与实体请求。
 
-        if self.mode == "incremental" and self.revision_state.is_duplicate(pdb_id, revision_date):
-            self.duplicate_skipped += 1
-            self.logger.info(
-                "⏭️ 跳过未更新结构 (revision: %s, total_skipped=%d)",
-                revision_date,
-                self.duplicate_skipped,
-            )
-            self._cleanup_entry(pdb_id)
-            return None
+        :param context: 已写入 Entry 数据的上下文
+        :type context: EntryContext
+        :return: Assembly/实体/后续请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+        pdb_id = context["pdb_id"]
 
         # 提取实体 ID 列表，设置待处理计数器。
+        # Entry 文档中的字段名是 `non_polymer_entity_ids`（REST 与 GraphQL 相同），`nonpolymer_entity_ids` 仅作兼容
 
-        container = data.get("rcsb_entry_container_identifiers", {})
+        container = context["result"]["properties"].get("rcsb_entry_container_identifiers") or {}
         entity_ids = {
             "polymer_entity": container.get("polymer_entity_ids", []) or [],
-            "nonpolymer_entity": container.get("nonpolymer_entity_ids", []) or [],
+            "nonpolymer_entity": (
+                container.get("non_polymer_entity_ids") or container.get("nonpolymer_entity_ids") or []
+            ),
             "branched_entity": container.get("branched_entity_ids", []) or [],
         }
 
@@ -411,6 +1153,231 @@ class RcsbAllApiSpider(scrapy.Spider):
                     meta={"pdb_id": pdb_id, "entity_type": entity_type},
                 )
 
+    def _apply_entry_data(self, context, rcsb_id, properties):
+        """
+        写入 Entry 基本信息、更新 revision，并在增量模式下判重。
+
+        :param context: Entry 上下文
+        :type context: EntryContext
+        :param rcsb_id: Entry 的 rcsb_id
+        :type rcsb_id: str
+        :param properties: 已规范化的 Entry 属性
+        :type properties: dict
+        :return: 是否继续处理（重复时已清理上下文并返回 False）
+        :rtype: bool
+        """
+        pdb_id = context["pdb_id"]
+        context["pending"]["entry"] = 0
+        context["result"]["rcsb_id"] = rcsb_id
+        context["result"]["properties"] = properties
+
+        # 提取 revision_date；运行期最大 revision 在结构完成（入库或判重跳过）时才更新。
+
+        revision_date = (properties.get("rcsb_accession_info") or {}).get("revision_date")
+        context["revision_date"] = revision_date
+
+        # 增量模式下检查是否重复，如果重复则跳过。
+
+        if self.mode == "incremental" and self.revision_state.is_duplicate(pdb_id, revision_date):
+            self.duplicate_skipped += 1
+            self.logger.info(
+                "⏭️ 跳过未更新结构 (revision: %s, total_skipped=%d)",
+                revision_date,
+                self.duplicate_skipped,
+            )
+            self._mark_completed(pdb_id, revision_date)
+            self._cleanup_entry(pdb_id)
+            return False
+        return True
+
+    def _schedule_validation_probes(self, context):
+        """
+        根据 Entry 是否带验证报告，调度验证图片/PDF 探测。
+
+        :param context: Entry 上下文
+        :type context: EntryContext
+        :return: 探测请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+        has_validation_report = context["result"]["properties"].get("pdbx_vrpt_summary") is not None
+        yield from self._schedule_probes(
+            context, self.file_downloader.validation_targets(context, has_validation_report)
+        )
+
+    def _request_entry_batch(self, pdb_ids):
+        """
+        rest_batch 模式：整页 Entry 合并为一次 GraphQL 查询（Entry 自身的完整字段，与 REST Entry 文档一致）。
+
+        :param pdb_ids: 已注册上下文的结构 ID 列表
+        :type pdb_ids: list
+        :return: GraphQL 请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+        yield self.request_builder.build_graphql_request(
+            self.graphql_queries.entry_only_query(),
+            {"ids": pdb_ids},
+            callback=self._parse_entry_batch,
+            errback=self._entry_batch_errback,
+            meta={"pdb_ids": pdb_ids},
+        )
+
+    def _parse_entry_batch(self, response):
+        """
+        解析整页 Entry 的批量响应，分发到各自上下文后按 REST 方式调度实体。
+
+        :param response: GraphQL 响应
+        :type response: scrapy.http.Response
+        :return: None（通过 yield 产生请求与 Item）
+        :rtype: None
+        """
+        pdb_ids = response.meta["pdb_ids"]
+        payload = self.data_parser.parse(response, self.logger)
+        if payload.get("errors"):
+            self.logger.warning("Entry 批量查询返回错误 (%s): %s", ",".join(pdb_ids), payload["errors"])
+
+        found = set()
+        for entry in (payload.get("data") or {}).get("entries") or []:
+            if not entry:
+                continue
+            pdb_id = (entry.get("rcsb_id") or "").upper()
+            context = self.entry_contexts.get(pdb_id)
+            if not context:
+                continue
+            found.add(pdb_id)
+            properties = self.data_parser.normalize({k: v for k, v in entry.items() if k != "rcsb_id"})
+            if not self._apply_entry_data(context, entry.get("rcsb_id"), properties):
+                continue
+            yield from self._schedule_validation_probes(context)
+            yield from self._schedule_entry_children(context)
+
+        # 批量响应缺失的 Entry 回退为单条 REST 请求，避免个别 ID 拖累整页。
+
+        missing = [pdb_id for pdb_id in pdb_ids if pdb_id not in found and pdb_id in self.entry_contexts]
+        if missing:
+            self.logger.warning("Entry 批量响应缺少 %d 条，回退单条请求：%s", len(missing), ",".join(missing))
+            yield from self._request_single_entries(missing)
+
+        # 判重跳过的 Entry 已释放窗口
+        yield from self._fill_window()
+        return None
+
+    def _entry_batch_errback(self, failure):
+        """
+        Entry 批量请求失败时，整页回退为单条 REST Entry 请求。
+
+        :param failure: 失败对象
+        :type failure: scrapy.Failure
+        :return: None（通过 yield 产生请求）
+        :rtype: None
+        """
+        pdb_ids = [
+            pdb_id for pdb_id in failure.request.meta.get("pdb_ids") or [] if pdb_id in self.entry_contexts
+        ]
+        self.logger.error("Entry 批量请求失败，回退单条请求 (%d 条): %s", len(pdb_ids), failure.value)
+        yield from self._request_single_entries(pdb_ids)
+        return None
+
+    def _request_single_entries(self, pdb_ids):
+        """
+        为每个 ID 单独发起 REST Entry 请求。
+
+        :param pdb_ids: 结构 ID 列表
+        :type pdb_ids: list
+        :return: Entry 请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+        for pdb_id in pdb_ids:
+            yield self.request_builder.build_api_request(
+                "entry",
+                pdb_id,
+                callback=self.parse_entry,
+                errback=self._entry_errback,
+                meta={"pdb_id": pdb_id},
+            )
+
+    def _request_graphql_entries(self, pdb_ids):
+        """
+        将一页 Entry 按 `graphql_batch_size` 拆分为多个 GraphQL 查询。
+
+        :param pdb_ids: 已注册上下文的结构 ID 列表
+        :type pdb_ids: list
+        :return: GraphQL 请求
+        :rtype: Generator[scrapy.Request, None, None]
+        """
+        for start in range(0, len(pdb_ids), self.graphql_batch_size):
+            chunk = pdb_ids[start:start + self.graphql_batch_size]
+            yield self.request_builder.build_graphql_request(
+                self.graphql_queries.entries_query(),
+                {"ids": chunk},
+                callback=self._parse_graphql_entries,
+                errback=self._graphql_errback,
+                meta={"pdb_ids": chunk},
+            )
+
+    def _parse_graphql_entries(self, response):
+        """
+        解析 GraphQL 批量响应，按 rcsb_id 分发到各自的 EntryContext。
+
+        :param response: GraphQL 响应
+        :type response: scrapy.http.Response
+        :return: None（通过 yield 产生请求与 Item）
+        :rtype: None
+        """
+        pdb_ids = response.meta["pdb_ids"]
+        payload = self.data_parser.parse(response, self.logger)
+        if payload.get("errors"):
+            self.logger.warning("GraphQL 返回错误 (%s): %s", ",".join(pdb_ids), payload["errors"])
+
+        # 逐个 Entry 拆分为 REST 模式的结构，写入上下文。
+
+        found = set()
+        for entry in (payload.get("data") or {}).get("entries") or []:
+            if not entry:
+                continue
+            split = self.data_parser.split_graphql_entry(entry, DEFAULT_ASSEMBLY_ID)
+            pdb_id = (split["rcsb_id"] or "").upper()
+            context = self.entry_contexts.get(pdb_id)
+            if not context:
+                continue
+            found.add(pdb_id)
+            yield from self._apply_graphql_entry(context, split)
+
+        # 响应中缺失的 Entry（包括字段错误导致整批 data 为空）回退为 REST 单条请求。
+
+        missing = [pdb_id for pdb_id in pdb_ids if pdb_id not in found and pdb_id in self.entry_contexts]
+        if missing:
+            self.logger.warning("GraphQL 响应缺少 %d 条 Entry，回退 REST：%s", len(missing), ",".join(missing))
+            yield from self._request_single_entries(missing)
+
+        # 判重跳过的 Entry 已释放窗口
+        yield from self._fill_window()
+        return None
+
+    def _apply_graphql_entry(self, context, split):
+        """
+        将拆分后的 GraphQL Entry 写入上下文，实体、ChemComp、DrugBank、Assembly 一次到位。
+
+        :param context: Entry 上下文
+        :type context: EntryContext
+        :param split: `DataParser.split_graphql_entry` 的结果
+        :type split: dict
+        :return: 探测请求或 Item
+        :rtype: Generator
+        """
+        if not self._apply_entry_data(context, split["rcsb_id"], split["properties"]):
+            return None
+        yield from self._schedule_validation_probes(context)
+
+        for alias in ("polymer_entities", "nonpolymer_entities", "branched_entities"):
+            context["result"][alias] = split[alias]
+        context.add_references(split["chemcomp"], split["drugbank"])
+        context.apply_assembly(split["assembly"])
+
+        followups = self._maybe_finalize(context["pdb_id"])
+        if followups:
+            yield from followups
+        return None
+
     def _parse_entity(self, response):
         """
         解析实体数据并写入结果，检查实体阶段是否完成。
@@ -464,12 +1431,11 @@ class RcsbAllApiSpider(scrapy.Spider):
         if not context:
             return None
 
-        # 解析并规范化 Assembly 数据。
+        # 解析并规范化 Assembly 数据，立即并入 properties。
 
         data = self.data_parser.parse(response, self.logger)
         if data:
-            normalized = self.data_parser.normalize(data)
-            context["assembly_data"] = normalized
+            context.apply_assembly(self.data_parser.normalize(data))
 
         # 递减计数器，检查是否可以保存。
 
@@ -528,8 +1494,12 @@ class RcsbAllApiSpider(scrapy.Spider):
         comp_ids = sorted(comp_ids)
         drugbank_ids = sorted(drugbank_ids)
 
-        context["comp_ids"] = comp_ids
-        context["drugbank_ids"] = drugbank_ids
+        # 先查跨 Entry 缓存，命中的直接写入上下文，只为未命中的 ID 发请求。
+
+        cached_comps, comp_ids = self.comp_cache.get_many(comp_ids)
+        cached_drugbank, drugbank_ids = self.drugbank_cache.get_many(drugbank_ids)
+        context.add_references(cached_comps, cached_drugbank)
+
         context["pending"]["comp"] = 1 if comp_ids else 0
         context["pending"]["drugbank"] = 1 if drugbank_ids else 0
 
@@ -576,12 +1546,16 @@ class RcsbAllApiSpider(scrapy.Spider):
 
         # 检查所有计数器是否归零，如果都完成则保存结果。
 
+        # `entry` 在 Entry 数据写入前保持为 1，避免附件探测先于 Entry 完成时提前保存
+
         pending = context.get("pending", {})
         if (
-            pending.get("entity", 0) == 0
+            pending.get("entry", 0) == 0
+            and pending.get("entity", 0) == 0
             and pending.get("comp", 0) == 0
             and pending.get("drugbank", 0) == 0
             and pending.get("assembly", 0) == 0
+            and pending.get("asset", 0) == 0
         ):
             return self._save_result(context)
         return None
@@ -604,6 +1578,7 @@ class RcsbAllApiSpider(scrapy.Spider):
 
         # 处理批量响应，提取每个 comp_id 对应的数据。
 
+        fetched = {}
         comp_ids = response.meta.get("comp_ids")
         if comp_ids:
             items = data if isinstance(data, list) else ([data] if data else [])
@@ -620,7 +1595,7 @@ class RcsbAllApiSpider(scrapy.Spider):
                     continue
                 normalized = self.data_parser.normalize(item)
                 normalized["comp_id"] = comp_id
-                context["comp_data"][comp_id] = normalized
+                fetched[comp_id] = normalized
                 if comp_id in remaining:
                     remaining.remove(comp_id)
             if remaining:
@@ -634,9 +1609,14 @@ class RcsbAllApiSpider(scrapy.Spider):
             if data:
                 normalized = self.data_parser.normalize(data)
                 normalized["comp_id"] = comp_id
-                context["comp_data"][comp_id] = normalized
+                fetched[comp_id] = normalized
             context["pending"]["comp"] -= 1
 
+        # 写入上下文，并回写跨 Entry 缓存供后续结构复用。
+
+        context.add_references(comp_data=fetched)
+        self.comp_cache.put_many(fetched)
+
         followups = self._maybe_finalize(pdb_id)
         if followups:
             yield from followups
@@ -657,6 +1637,7 @@ class RcsbAllApiSpider(scrapy.Spider):
             return None
 
         data = self.data_parser.parse(response, self.logger)
+        fetched = {}
         drugbank_ids = response.meta.get("drugbank_ids")
         if drugbank_ids:
             items = data if isinstance(data, list) else ([data] if data else [])
@@ -673,7 +1654,7 @@ class RcsbAllApiSpider(scrapy.Spider):
                     continue
                 normalized = self.data_parser.normalize(item)
                 normalized["comp_id"] = drugbank_id
-                context["drugbank_data"][drugbank_id] = normalized
+                fetched[drugbank_id] = normalized
                 if drugbank_id in remaining:
                     remaining.remove(drugbank_id)
             if remaining:
@@ -684,9 +1665,12 @@ class RcsbAllApiSpider(scrapy.Spider):
             if data:
                 normalized = self.data_parser.normalize(data)
                 normalized["comp_id"] = drugbank_id
-                context["drugbank_data"][drugbank_id] = normalized
+                fetched[drugbank_id] = normalized
             context["pending"]["drugbank"] -= 1
 
+        context.add_references(drugbank_data=fetched)
+        self.drugbank_cache.put_many(fetched)
+
         followups = self._maybe_finalize(pdb_id)
         if followups:
             yield from followups
@@ -706,6 +1690,7 @@ class RcsbAllApiSpider(scrapy.Spider):
 
         if not context["result"].get("rcsb_id"):
             self._cleanup_entry(context["pdb_id"])
+            yield from self._fill_window()
             return None
 
         # 使用 EntryContext.to_item() 方法转换，避免重复代码
@@ -732,11 +1717,9 @@ class RcsbAllApiSpider(scrapy.Spider):
             else:
                 self.logger.error("❌ %s %s 获取失败：%s", item["pdb_id"], label, reason)
 
-        # 把当前结构的 revision 写入 Redis，用于增量模式的重复判断。
+        # revision 与完成状态在存储 Pipeline 写入成功后由 `_on_items_stored` 写入。
 
         revision = context.get("revision_date")
-        if revision:
-            self.revision_state.persist_revision(context["pdb_id"], revision)
 
         # 更新统计、日志提示、清理上下文，并把最终的 Item 交给 Pipeline。
 
@@ -745,6 +1728,32 @@ class RcsbAllApiSpider(scrapy.Spider):
         self._cleanup_entry(context["pdb_id"])
         yield item
 
+        # 释放窗口后补充新的 Entry
+        yield from self._fill_window()
+
+    def _close_frontier(self, reason):
+        """
+        关闭时处理持久化边界。
+
+        :param reason: 退出原因
+        :type reason: str
+        :return: None
+        :rtype: None
+        """
+        self.frontier.flush()
+        pending = self.frontier.pending_count()
+        if reason == "finished" and self.search_exhausted and not self.entry_queue and pending == 0:
+            self.frontier.clear()
+            self.logger.info("🧭 frontier=%s 整轮完成，已清除断点", self.frontier.name)
+        else:
+            self.logger.info(
+                "🧭 frontier=%s 已保存断点（待处理 %d，Search 偏移 %d），使用相同 frontier 重启即可继续",
+                self.frontier.name,
+                pending,
+                self.next_search_start,
+            )
+        return None
+
     def _cleanup_entry(self, pdb_id):
         """
         清理缓存的 Entry 上下文。
@@ -755,6 +1764,7 @@ class RcsbAllApiSpider(scrapy.Spider):
         :rtype: None
         """
         self.entry_contexts.pop(pdb_id, None)
+        self.revision_state.discard(pdb_id)
         return None
 
     def closed(self, reason):
@@ -767,20 +1777,36 @@ class RcsbAllApiSpider(scrapy.Spider):
         :rtype: None
         """
 
-        # 增量模式下，将最大 revision 写回 MongoDB。
+        # 停止定时写入，写入缓冲中剩余的 revision；增量模式下，将最大 revision 写回 MongoDB。
 
+        if self._flush_loop is not None and self._flush_loop.running:
+            self._flush_loop.stop()
+        self.revision_state.flush_revisions()
         if self.mode == "incremental":
             self.revision_state.flush()
 
+        # 写入 frontier 缓冲；整轮完成时删除边界，否则保留供同名重启继续。
+
+        if self.frontier:
+            self._close_frontier(reason)
+        if self.work_queue:
+            self.logger.info("📊 %s (role=%s)", self.work_queue.summary(), self.role)
+
         # 记录运行统计信息。
 
         self.logger.info(
-            "📊 本次运行保存 %d 条，判重跳过 %d 条 (mode=%s)",
+            "📊 本次运行保存 %d 条，判重跳过 %d 条 (mode=%s, fetch_mode=%s)",
             self.saved_count,
             self.duplicate_skipped,
             self.mode,
+            self.fetch_mode,
         )
 
+        # 输出 ChemComp / DrugBank 缓存命中统计。
+
+        self.logger.info("📊 %s", self.comp_cache.summary())
+        self.logger.info("📊 %s", self.drugbank_cache.summary())
+
         # 统计并输出文件获取失败的情况。
 
         if self.file_audit:
@@ -846,12 +1872,29 @@ class RcsbAllApiSpider(scrapy.Spider):
 
         :param failure: 失败对象
         :type failure: scrapy.Failure
-        :return: None
+        :return: None（通过 yield 产生请求）
         :rtype: None
         """
         pdb_id = failure.request.meta.get("pdb_id")
         self.logger.error("Entry 请求失败: %s", failure.value)
         self._cleanup_entry(pdb_id)
+        yield from self._fill_window()
+        return None
+
+    def _graphql_errback(self, failure):
+        """
+        GraphQL 批量请求失败时，该批次回退为 REST 单条请求。
+
+        :param failure: 失败对象
+        :type failure: scrapy.Failure
+        :return: None（通过 yield 产生请求）
+        :rtype: None
+        """
+        pdb_ids = [
+            pdb_id for pdb_id in failure.request.meta.get("pdb_ids") or [] if pdb_id in self.entry_contexts
+        ]
+        self.logger.error("GraphQL 请求失败，回退 REST (%s): %s", ",".join(pdb_ids), failure.value)
+        yield from self._request_single_entries(pdb_ids)
         return None
 
     def _entity_errback(self, failure):
@@ -950,7 +1993,6 @@ class RcsbAllApiSpider(scrapy.Spider):
         context = self.entry_contexts.get(pdb_id)
         if not context:
             return None
-        context["assembly_data"] = None
         # Assembly 阶段计数器递减
         context["pending"]["assembly"] -= 1
         followups = self._maybe_finalize(pdb_id)
@@ -12,6 +12,8 @@ from typing import List, Optional
 
 import scrapy
 
+from .constants import PROBE_HANDLED_HTTP_STATUS
+
 
 class RequestBuilder:
     """
@@ -19,13 +21,15 @@ class RequestBuilder:
 
     :param str search_api: Search API 基础地址
     :param dict endpoints: 其余 API 的 endpoint 映射
+    :param str graphql_api: GraphQL 接口地址
     """
 
-# 初始化时接收 Search API URL 和端点映射，保存为实例变量。
+# 初始化时接收 Search API URL 、端点映射和 GraphQL 地址，保存为实例变量。
 
-    def __init__(self, search_api: str, endpoints: dict):
+    def __init__(self, search_api: str, endpoints: dict, graphql_api: Optional[str] = None):
         self.search_api = search_api
         self.endpoints = endpoints
+        self.graphql_api = graphql_api
 
     def build_search_request(
         self,
@@ -104,6 +108,86 @@ class RequestBuilder:
             meta=meta or {}
         )
 
+    def build_graphql_request(
+        self,
+        query: str,
+        variables: dict,
+        callback=None,
+        errback=None,
+        meta: Optional[dict] = None,
+    ) -> scrapy.Request:
+        """
+        构造 data.rcsb.org GraphQL 的 POST 请求。
+
+        :param str query: GraphQL 查询语句
+        :param dict variables: 查询变量
+        :param callback: Scrapy 回调
+        :param errback: Scrapy errback
+        :param dict meta: 额外 meta 信息
+        :return: 已构造的 GraphQL 请求
+        :rtype: scrapy.Request
+        """
+        return scrapy.Request(
+            url=self.graphql_api,
+            method="POST",
+            body=json.dumps({"query": query, "variables": variables}),
+            headers={"Content-Type": "application/json", "Accept": "application/json"},
+            callback=callback,
+            errback=errback,
+            meta=meta or {},
+        )
+
+    def build_probe_request(
+        self,
+        url: str,
+        method: str = "HEAD",
+        timeout: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        callback=None,
+        errback=None,
+        meta: Optional[dict] = None,
+    ) -> scrapy.Request:
+        """
+        构造附件可用性探测请求（HEAD，服务器不支持时回退为单字节 Range GET）。
+
+        :param str url: 待探测的文件 URL
+        :param str method: HEAD 或 GET
+        :param int timeout: 单次探测超时，写入 `download_timeout`
+        :param int max_retries: 最大重试次数，写入 `max_retry_times`
+        :param callback: Scrapy 回调
+        :param errback: Scrapy errback
+        :param dict meta: 额外 meta 信息
+        :return: 已构造的探测请求
+        :rtype: scrapy.Request
+        """
+        probe_meta = dict(meta or {})
+
+        # 404/405 等状态码也需要进入回调，由 FileDownloader 翻译为审计结果；
+        # 只列出 4xx/5xx，3xx 仍由 RedirectMiddleware 跟随（对应旧实现的 allow_redirects=True）
+
+        probe_meta["handle_httpstatus_list"] = PROBE_HANDLED_HTTP_STATUS
+        if timeout is not None:
+            probe_meta["download_timeout"] = timeout
+        if max_retries is not None:
+            probe_meta["max_retry_times"] = max_retries
+
+        # GET 回退只请求首字节，避免把整个文件拉下来
+
+        headers = {"Range": "bytes=0-0"} if method == "GET" else None
+
+        # 探测不经过去重：同一结构在一次运行中可能被重新调度（Search 重试、队列接管、ID 列表重复），
+        # 被过滤的探测不会触发回调或 errback，Entry 会一直等待 asset 计数归零
+
+        return scrapy.Request(
+            url=url,
+            method=method,
+            headers=headers,
+            callback=callback,
+            errback=errback,
+            meta=probe_meta,
+            dont_filter=True,
+        )
+
     def _build_search_body(
         self, start: int, rows: int, mode: str, increment_start: Optional[str]
     ) -> dict:
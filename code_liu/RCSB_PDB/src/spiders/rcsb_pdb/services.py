@@ -7,17 +7,28 @@
 """
 from __future__ import annotations
 
+import gzip
+import json
+import re
+import sys
 import time
-from dataclasses import dataclass, field
+import zlib
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+from redis import RedisError, ResponseError
 
 from src.items.rcsb_pdb_item import RcsbAllApiItem
-from src.spiders.rcsb_pdb.constants import FIELD_SCHEMAS, HTTP_STATUS
-
-from concurrent.futures import ThreadPoolExecutor
+from src.spiders.rcsb_pdb.constants import (
+    FIELD_SCHEMAS,
+    GRAPHQL_ENTITY_COMP_KEYS,
+    GRAPHQL_ENTRIES_QUERY,
+    GRAPHQL_ENTRY_ONLY_QUERY,
+    GRAPHQL_SCHEMA_MAX_DEPTH,
+    GRAPHQL_SCHEMA_NAMES,
+    HTTP_STATUS,
+)
 
 
 class DataParser:
@@ -79,6 +90,82 @@ class DataParser:
                 result[field_name] = self._normalize_item(value, schema)
         return result
 
+    def split_graphql_entry(self, entry: Dict[str, Any], assembly_id: str) -> Dict[str, Any]:
+        """
+        将 GraphQL `entries` 中的单个 Entry 拆分为与 REST 模式一致的结构。
+
+        实体中嵌套的 ChemComp（`chem_comp_monomers` / `nonpolymer_comp`）及其 DrugBank
+        被拆出并按 ID 去重，实体本身不再保留这些嵌套字段。
+
+        :param dict entry: GraphQL 返回的单个 Entry
+        :param str assembly_id: 需要保留的 Assembly ID
+        :return: 包含 rcsb_id、properties、三类实体、chemcomp、drugbank、assembly 的字典
+        :rtype: dict
+        """
+        entry = dict(entry)
+        split = {
+            "rcsb_id": entry.pop("rcsb_id", None),
+            "chemcomp": {},
+            "drugbank": {},
+            "assembly": None,
+        }
+
+        # 拆分三类实体，并收集嵌套的 ChemComp / DrugBank
+
+        for alias, comp_key in GRAPHQL_ENTITY_COMP_KEYS.items():
+            entities = []
+            for entity in entry.pop(alias, None) or []:
+                if not entity:
+                    continue
+                entity = dict(entity)
+                comps = entity.pop(comp_key, None)
+                if isinstance(comps, dict):
+                    comps = [comps]
+                for comp in comps or []:
+                    self._collect_graphql_comp(comp, split)
+                entities.append(self.normalize(entity))
+            split[alias] = entities
+
+        # 仅保留默认 Assembly，与 REST 模式请求 `assembly/{pdb_id}/{assembly_id}` 一致
+
+        for assembly in entry.pop("assemblies", None) or []:
+            container = (assembly or {}).get("rcsb_assembly_container_identifiers") or {}
+            if container.get("assembly_id") == assembly_id:
+                split["assembly"] = self.normalize(assembly)
+                break
+
+        split["properties"] = self.normalize(entry)
+        return split
+
+    def _collect_graphql_comp(self, comp: Optional[Dict[str, Any]], split: Dict[str, Any]) -> None:
+        """
+        将单个嵌套 ChemComp（及其 DrugBank）写入拆分结果。
+
+        :param dict comp: GraphQL CoreChemComp 节点
+        :param dict split: `split_graphql_entry` 的中间结果
+        """
+        if not comp:
+            return
+        comp = dict(comp)
+        drugbank = comp.pop("drugbank", None)
+        comp_id = comp.get("rcsb_id") or (comp.get("chem_comp") or {}).get("id")
+        if not comp_id:
+            return
+        if comp_id not in split["chemcomp"]:
+            normalized = self.normalize(comp)
+            normalized["comp_id"] = comp_id
+            split["chemcomp"][comp_id] = normalized
+
+        # 与 REST 模式一致按 rcsb_id 作键；CoreDrugbank 以所属 ChemComp 为主键，缺失时用 comp_id
+
+        if not drugbank:
+            return
+        drugbank_key = drugbank.get("rcsb_id") or comp_id
+        if drugbank_key not in split["drugbank"]:
+            normalized = self.normalize(drugbank)
+            normalized["comp_id"] = drugbank_key
+            split["drugbank"][drugbank_key] = normalized
+
     @staticmethod
     def _normalize_item(item: Dict[str, Any], schema: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -95,11 +182,141 @@ class DataParser:
         return normalized
 
 
-@dataclass
+class GraphQLQueryBuilder:
+    """
+    按 Data API 的 JSON Schema 生成 GraphQL 字段选择，使批量查询取回与 REST 文档相同的字段集。
+
+    所需 Schema 未加载时回退到 `constants` 中手写的精简查询。
+    """
+
+    _NAME_PATTERN = re.compile(r"^[_A-Za-z][_0-9A-Za-z]*$")
+
+    def __init__(self):
+        self.selections: Dict[str, str] = {}
+        self._entries_query: Optional[str] = None
+
+    def add_schema(self, name: str, schema: Any) -> bool:
+        """
+        从 Schema 生成字段选择并保存。
+
+        :param str name: Schema 名称（见 `GRAPHQL_SCHEMA_NAMES`）
+        :param dict schema: `/rest/v1/schema/{name}` 返回的 JSON Schema
+        :return: 是否生成了非空的字段选择
+        :rtype: bool
+        """
+        if not isinstance(schema, dict):
+            return False
+        selection = self.selection_from_schema(schema, schema.get("definitions") or {})
+        if not selection:
+            return False
+        self.selections[name] = selection
+        self._entries_query = None
+        return True
+
+    @property
+    def complete(self) -> bool:
+        """graphql 模式所需的 Schema 是否全部就绪。"""
+        return all(name in self.selections for name in GRAPHQL_SCHEMA_NAMES)
+
+    def entry_only_query(self) -> str:
+        """
+        rest_batch 模式的批量查询：只取 Entry 自身字段。
+
+        :return: GraphQL 查询语句
+        :rtype: str
+        """
+        if "entry" not in self.selections:
+            return GRAPHQL_ENTRY_ONLY_QUERY
+        return (
+            "query Entries($ids: [String!]!) { entries(entry_ids: $ids) { "
+            f"{self.selections['entry']} "
+            "} }"
+        )
+
+    def entries_query(self) -> str:
+        """
+        graphql 模式的批量查询：Entry、三类实体（含嵌套 ChemComp/DrugBank）与 Assembly。
+
+        :return: GraphQL 查询语句
+        :rtype: str
+        """
+        if not self.complete:
+            return GRAPHQL_ENTRIES_QUERY
+        if self._entries_query is None:
+            sel = self.selections
+            comp_keys = GRAPHQL_ENTITY_COMP_KEYS
+            self._entries_query = (
+                "fragment ChemCompFields on CoreChemComp { "
+                f"{sel['chem_comp']} drugbank {{ {sel['drugbank']} }} }}\n"
+                "query Entries($ids: [String!]!) { entries(entry_ids: $ids) { "
+                f"{sel['entry']} "
+                f"polymer_entities {{ {sel['polymer_entity']} {comp_keys['polymer_entities']} {{ ...ChemCompFields }} }} "
+                f"nonpolymer_entities {{ {sel['nonpolymer_entity']} {comp_keys['nonpolymer_entities']} {{ ...ChemCompFields }} }} "
+                f"branched_entities {{ {sel['branched_entity']} {comp_keys['branched_entities']} {{ ...ChemCompFields }} }} "
+                f"assemblies {{ {sel['assembly']} }} "
+                "} }"
+            )
+        return self._entries_query
+
+    @classmethod
+    def selection_from_schema(cls, schema: Dict[str, Any], definitions: Dict[str, Any], depth: int = 0) -> str:
+        """
+        将 JSON Schema 的 `properties` 转为 GraphQL 字段选择：标量与标量数组直接列出，对象递归展开。
+
+        无固定属性的对象（GraphQL 中无法选择子字段）与不合法的字段名被忽略。
+
+        :param dict schema: JSON Schema 节点
+        :param dict definitions: 根节点的 `definitions`，用于解析本地 `$ref`
+        :param int depth: 当前嵌套深度
+        :return: 以空格分隔的字段选择
+        :rtype: str
+        """
+        parts = []
+        for name, spec in (schema.get("properties") or {}).items():
+            if not cls._NAME_PATTERN.match(name):
+                continue
+            spec = cls._resolve(spec, definitions)
+            if "items" in spec:
+                spec = cls._resolve(spec["items"], definitions)
+            if spec.get("properties"):
+                if depth >= GRAPHQL_SCHEMA_MAX_DEPTH:
+                    continue
+                nested = cls.selection_from_schema(spec, definitions, depth + 1)
+                if nested:
+                    parts.append(f"{name} {{ {nested} }}")
+                continue
+            types = spec.get("type")
+            if types == "object" or (isinstance(types, list) and "object" in types):
+                continue
+            parts.append(name)
+        return " ".join(parts)
+
+    @staticmethod
+    def _resolve(spec: Any, definitions: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        解析 `#/definitions/...` 形式的本地引用。
+
+        :param dict spec: Schema 节点
+        :param dict definitions: 根节点的 `definitions`
+        :return: 引用目标（无法解析时返回空字典）
+        :rtype: dict
+        """
+        if not isinstance(spec, dict):
+            return {}
+        ref = spec.get("$ref")
+        if not ref:
+            return spec
+        return definitions.get(ref.rsplit("/", 1)[-1]) or {}
+
+
 class EntryContext:
     """
     管理单个 PDB Entry 的运行期上下文数据。
 
+    使用 `__slots__` 去掉每个实例的 `__dict__`；ChemComp/DrugBank 字典按需创建，
+    Assembly 到达后立即并入 `properties`，`to_item()` 产出 Item 后释放全部载荷，
+    窗口内同时在途的上下文只保留尚未完成阶段真正需要的数据。
+
     :param str pdb_id: 结构 ID
     :param list file_urls: 已确认可下载的文件 URL 列表
     :param dict file_audit: 文件审计信息
@@ -107,41 +324,55 @@ class EntryContext:
     :param str validation_pdf_url: 验证 PDF URL
     """
 
-    # 定义 Entry 的基本信息字段。
-
-    pdb_id: str
-    file_urls: List[str]
-    file_audit: Dict[str, Dict[str, Any]]
-    validation_url: Optional[str]
-    validation_pdf_url: Optional[str]
+    __slots__ = (
+        "pdb_id",
+        "file_urls",
+        "file_audit",
+        "validation_url",
+        "validation_pdf_url",
+        "result",
+        "pending",
+        "comp_data",
+        "drugbank_data",
+        "revision_date",
+    )
 
-    # 使用 `default_factory` 确保每个实例都有独立的字典。
+    def __init__(
+        self,
+        pdb_id: str,
+        file_urls: List[str],
+        file_audit: Dict[str, Dict[str, Any]],
+        validation_url: Optional[str],
+        validation_pdf_url: Optional[str],
+    ) -> None:
+        """
+        初始化上下文，结果容器与阶段计数器每个实例独立。
 
-    result: Dict[str, Any] = field(
-        default_factory=lambda: {
+        :param str pdb_id: 结构 ID
+        :param list file_urls: 已确认可下载的文件 URL 列表
+        :param dict file_audit: 文件审计信息
+        :param str validation_url: 验证图片 URL
+        :param str validation_pdf_url: 验证 PDF URL
+        """
+        self.pdb_id = pdb_id
+        self.file_urls = file_urls
+        self.file_audit = file_audit
+        self.validation_url = validation_url
+        self.validation_pdf_url = validation_pdf_url
+        self.result: Optional[Dict[str, Any]] = {
             "rcsb_id": None,
             "properties": {},
             "polymer_entities": [],
             "nonpolymer_entities": [],
             "branched_entities": [],
-            "chemcomp": [],
-            "drugbank": [],
         }
-    )
-    pending: Dict[str, int] = field(
-        default_factory=lambda: {"entity": 0, "comp": 0, "drugbank": 0, "assembly": 0}
-    )
-    comp_ids: Set[str] = field(default_factory=set)
-    drugbank_ids: Set[str] = field(default_factory=set)
-    comp_data: Dict[str, Dict[str, Any]] = field(default_factory=dict)
-    drugbank_data: Dict[str, Dict[str, Any]] = field(default_factory=dict)
-    assembly_data: Optional[Dict[str, Any]] = None
-    revision_date: Optional[str] = None
-    started_at: datetime = field(default_factory=datetime.utcnow)
-    stats: Dict[str, int] = field(
-        default_factory=lambda: {"entity_total": 0, "comp_total": 0, "drugbank_total": 0}
-    )
+        self.pending: Dict[str, int] = {"entry": 1, "entity": 0, "comp": 0, "drugbank": 0, "assembly": 0, "asset": 0}
+
+        # 大多数结构没有 DrugBank，部分结构没有 ChemComp，首次写入时再创建字典。
 
+        self.comp_data: Optional[Dict[str, Dict[str, Any]]] = None
+        self.drugbank_data: Optional[Dict[str, Dict[str, Any]]] = None
+        self.revision_date: Optional[str] = None
 
     # 代码中大量使用了字典式访问，所以添加 __getitem__ 、 __setitem__  和 get方法
 
@@ -173,6 +404,40 @@ class EntryContext:
         """
         return getattr(self, key, default)
 
+    def add_references(
+        self,
+        comp_data: Optional[Dict[str, Dict[str, Any]]] = None,
+        drugbank_data: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        """
+        写入 ChemComp / DrugBank 数据，字典在第一次有数据时创建。
+
+        :param dict comp_data: {comp_id: ChemComp 数据}
+        :param dict drugbank_data: {drugbank_id: DrugBank 数据}
+        """
+        if comp_data:
+            if self.comp_data is None:
+                self.comp_data = {}
+            self.comp_data.update(comp_data)
+        if drugbank_data:
+            if self.drugbank_data is None:
+                self.drugbank_data = {}
+            self.drugbank_data.update(drugbank_data)
+
+    def apply_assembly(self, assembly_data: Any) -> None:
+        """
+        Assembly 阶段完成后立即并入 `properties`，不再单独保留一份载荷到保存阶段。
+
+        :param assembly_data: 规范化后的 Assembly 数据，失败时为 None
+        """
+        if not assembly_data:
+            return
+        properties = self.result.setdefault("properties", {})
+        if isinstance(assembly_data, dict):
+            properties.update(assembly_data)
+        else:
+            properties["assembly"] = assembly_data
+
     @classmethod
     def from_bundle(cls, pdb_id: str, bundle: Dict[str, Any]) -> "EntryContext":
         """
@@ -197,25 +462,20 @@ class EntryContext:
     def to_item(self) -> RcsbAllApiItem:
         """
         阶段四：将 EntryContext 对转换为 Scrapy Item，用于最终输出给 Pipeline。
+        转换后释放 result 与 ChemComp/DrugBank 字典，同一上下文只能调用一次。
 
         :return: 转换后的 Item
         :rtype: RcsbAllApiItem
         """
 
-        # 将字典格式转换为列表格式。
+        # 将字典格式转换为列表格式（按 ID 排序，缓存命中与网络返回的顺序不影响输出与内容哈希）。
+        # Assembly 已在 `apply_assembly()` 中并入 properties。
 
         result = self.result
-        result["chemcomp"] = list(self.comp_data.values())
-        result["drugbank"] = list(self.drugbank_data.values())
-
-        # 将 Assembly 数据合并到 properties 中
-
-        if self.assembly_data:
-            result.setdefault("properties", {})
-            if isinstance(self.assembly_data, dict):
-                result["properties"].update(self.assembly_data)
-            else:
-                result["properties"]["assembly"] = self.assembly_data
+        comp_data = self.comp_data or {}
+        drugbank_data = self.drugbank_data or {}
+        result["chemcomp"] = [comp_data[key] for key in sorted(comp_data)]
+        result["drugbank"] = [drugbank_data[key] for key in sorted(drugbank_data)]
 
         # 创建 Scrapy Item 并填充所有字段
 
@@ -243,13 +503,21 @@ class EntryContext:
                 item["validation_image"] = url
             elif "_full_validation.pdf" in url:
                 item["validation_pdf"] = url
-        
+
+        # 载荷已全部转交给 Item，上下文只保留后续审计与 revision 写回需要的少量字段。
+
+        self.result = None
+        self.comp_data = None
+        self.drugbank_data = None
         return item
 
 
 class FileDownloader:
     """
-    管理文件 URL 探测与审计
+    管理文件 URL 构造、探测结果解析与审计。
+
+    探测请求本身由 Spider 通过 Scrapy HEAD 请求发出，与其它下载共享反应器与连接池，
+    本类只负责生成候选 URL、把响应状态翻译成审计结果并回写到 EntryContext。
     """
 
     def __init__(self, logger, timeout: int = 5, max_retries: int = 5):
@@ -258,9 +526,9 @@ class FileDownloader:
 
         :param logger: 日志实例
         :type logger: logging.Logger
-        :param timeout: 单次请求超时
+        :param timeout: 单次探测请求超时（写入 `download_timeout`）
         :type timeout: int
-        :param max_retries: 探测最大重试次数
+        :param max_retries: 探测最大重试次数（写入 `max_retry_times`）
         :type max_retries: int
         """
 
@@ -272,11 +540,11 @@ class FileDownloader:
         """
         阶段一：PDB ID 转字典。
         1. 构造所有可能的文件 URL（CIF、结构图片、验证文件等）
-        2. 并行探测文件可用性（使用 ThreadPoolExecutor）
-        3. 收集可用的文件 URL 和审计信息
+        2. 生成首批待探测目标（CIF、结构图片候选），由 Spider 以 HEAD 请求异步探测
+        3. 初始化审计信息，探测完成前均标记为 `pending_check`
 
         :param str pdb_id: 结构 ID
-        :return: 包含 file_urls 与 audit 信息的字典
+        :return: 包含 file_urls、audit 与 probe_targets 的字典
         :rtype: dict
         """
 
@@ -293,67 +561,41 @@ class FileDownloader:
             f"https://files.rcsb.org/validation/view/{pdb_id_lower}_full_validation.pdf"
         )
 
-        audit_entry: Dict[str, Dict[str, Any]] = {}
-        file_urls: List[str] = []
-
-        # 并行检查 CIF 和结构图片候选
-        urls_to_check = [cif_url, assembly_url, model_url]
-        results = self._parallel_check(urls_to_check)
-
-        # 处理 CIF 文件结果，如果可用则加入 URL 列表
-
-        cif_result = results[0]
-        audit_entry["cif_file"] = cif_result
-        if cif_result.get("available"):
-            file_urls.append(cif_url)
-
-        # 挑选结构图片（从 assembly/model 结果中选）
-        structure_results = results[1:]
-        structure_result = self._pick_structure_from_results(structure_results, [assembly_url, model_url])
-        audit_entry["structure_image"] = structure_result
-        if structure_result.get("selected"):
-            file_urls.append(structure_result["selected"])
+        audit_entry: Dict[str, Dict[str, Any]] = {
+            field_name: {"pending_check": True, "available": False, "missing": False}
+            for field_name in ("cif_file", "structure_image", "validation_image", "validation_pdf")
+        }
 
-        audit_entry["validation_image"] = {"pending_check": True, "available": False, "missing": False}
-        audit_entry["validation_pdf"] = {"pending_check": True, "available": False, "missing": False}
+        # 结构图片按候选顺序探测：assembly 不可用时再探测 model
 
         return {
-            "file_urls": file_urls,
+            "file_urls": [],
             "audit": audit_entry,
             "validation_image_url": validation_url,
             "validation_pdf_url": validation_pdf_url,
+            "probe_targets": [
+                ("cif_file", [cif_url]),
+                ("structure_image", [assembly_url, model_url]),
+            ],
         }
 
-    def handle_validation_assets(self, entry: EntryContext, has_validation_report: bool) -> None:
+    def validation_targets(self, entry: EntryContext, has_validation_report: bool) -> List[tuple]:
         """
-        针对 validation 图片/PDF 做延迟探测。需要先获取 Entry 数据，检查是否有 pdbx_vrpt_summary 字段
+        针对 validation 图片/PDF 生成延迟探测目标。需要先获取 Entry 数据，检查是否有 pdbx_vrpt_summary 字段
         如果有验证报告，才探测验证图片；如果没有，直接标记为缺失
         避免对没有验证报告的结构发送无效 HTTP 请求，节约时间
 
         :param EntryContext entry: 目标上下文
         :param bool has_validation_report: 是否存在验证报告元数据
+        :return: (审计字段, 候选 URL 列表) 列表
+        :rtype: list
         """
+        targets = []
 
         # 根据是否有验证报告决定是否检查验证图片
 
-        urls_to_check = []
         if has_validation_report:
-            urls_to_check.append(entry.validation_url)
-        urls_to_check.append(entry.validation_pdf_url)  # PDF 不需 report 判断
-
-        if not urls_to_check:
-            return
-
-        # 并行检查验证文件
-
-        results = self._parallel_check(urls_to_check)
-
-        # 处理 validation_image
-        if has_validation_report:
-            validation_image_result = results.pop(0)
-            entry.file_audit["validation_image"] = validation_image_result
-            if validation_image_result.get("available"):
-                entry.file_urls.append(entry.validation_url)
+            targets.append(("validation_image", [entry.validation_url]))
         else:
             entry.file_audit["validation_image"] = {
                 "selected": None,
@@ -363,133 +605,82 @@ class FileDownloader:
                 "status": None,
             }
 
-        # 处理 validation_pdf
-        validation_pdf_result = results[0] if results else {}
-        entry.file_audit["validation_pdf"] = validation_pdf_result
-        if validation_pdf_result.get("available"):
-            entry.file_urls.append(entry.validation_pdf_url)
-
-    def _parallel_check(self, urls: List[str]) -> List[Dict[str, Any]]:
-        """
-        用线程池并行检查多个 URL，最多 4 个并发
-
-        :param list urls: URL 列表
-        :return: 结果列表
-        :rtype: list
-        """
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            return list(executor.map(self._check_url, urls))
-
-    def _pick_structure_from_results(self, results: List[Dict[str, Any]], candidates: List[str]) -> Dict[str, Any]:
-        """
-        从并行结果中挑选第一个可用结构图。
-
-        :param list results: 探测结果列表
-        :param list candidates: 对应 URL 列表
-        :return: 挑选结果
-        :rtype: dict
-        """
-        # 初始化结果字典，默认所有字段为不可用状态。
-
-        info = {
-            "selected": None,
-            "reason": "无候选 URL",
-            "missing": False,
-            "available": False,
-            "status": None,
-        }
-
-        # 遍历探测结果，找到第一个可用的图片。
-
-        for result, url in zip(results, candidates):
-            info["status"] = result["status"]
-            info["reason"] = result["reason"]
-            info["missing"] = result["missing"]
-            if result["available"]:
-                info["selected"] = url
-                info["available"] = True
-                info["reason"] = None
-                return info
-        return info
+        targets.append(("validation_pdf", [entry.validation_pdf_url]))  # PDF 不需 report 判断
+        return targets
 
-    def _check_url(self, url: Optional[str]) -> Dict[str, Any]:
+    def build_probe_result(
+        self,
+        url: Optional[str],
+        status: Optional[int] = None,
+        reason: Optional[str] = None,
+        method: str = "HEAD",
+    ) -> Dict[str, Any]:
         """
-        对指定 URL 执行 HEAD/GET 探测。
+        将探测响应的状态码（或失败原因）翻译为审计结果。
 
-        :param str url: 目标 URL
+        :param str url: 探测的 URL
+        :param int status: HTTP 状态码，请求失败时为 None
+        :param str reason: 请求失败原因
+        :param str method: 探测使用的方法，GET 回退时 206 同样视为可用
         :return: 包含状态的字典
         :rtype: dict
         """
         result = {
             "selected": url,
-            "status": None,
-            "reason": None,
+            "status": status,
+            "reason": reason,
             "missing": False,
             "available": False,
         }
         if not url:
             result["reason"] = "URL 未提供"
             return result
+        if status is None:
+            return result
 
-        # 尝试 HEAD 请求，获取状态码后关闭连接。
-
-        for attempt in range(1, self.max_retries + 1):
-            start_ts = time.perf_counter()
-            try:
-                resp = requests.head(url, allow_redirects=True, timeout=self.timeout)
-                status = resp.status_code
-                resp.close()
-
-                # 如果服务器不支持 HEAD（405），改用 GET 请求。
-
-                if status == HTTP_STATUS["method_not_allowed"]:
-                    resp = requests.get(url, allow_redirects=True, timeout=self.timeout, stream=True)
-                    status = resp.status_code
-                    resp.close()
-
-                # 200 状态码表示文件可用，立即返回。
-
-                result["status"] = status
-                if status == HTTP_STATUS["success"]:
-                    elapsed = time.perf_counter() - start_ts
-                    if elapsed > 1:
-                        self.logger.debug("⏱️ Probe %s success in %.2fs", url, elapsed)
-                    result["available"] = True
-                    return result
-
-                # 404 表示文件不存在，不重试，立即返回。
-
-                if status == HTTP_STATUS["not_found"]:
-                    result["missing"] = True
-                    result["reason"] = "HTTP 404"
-                    return result
+        # 200 状态码表示文件可用（GET 回退使用 Range 请求，206 同样可用）。
 
-                # 其他 HTTP 错误：记录但不重试
-                result["reason"] = f"HTTP {status}"
-                return result
+        if status == HTTP_STATUS["success"] or (
+            method == "GET" and status == HTTP_STATUS["partial_content"]
+        ):
+            result["available"] = True
+            return result
 
-            # 超时异常，达到最大重试次数后返回。
+        # 404 表示文件不存在。
 
-            except requests.Timeout as exc:
-                if attempt == self.max_retries:
-                    result["reason"] = str(exc)
-                    elapsed = time.perf_counter() - start_ts
-                    if elapsed > 1:
-                        self.logger.debug("⏱️ Probe timeout %s took %.2fs (%s)", url, elapsed, result["reason"])
-                    return result
+        if status == HTTP_STATUS["not_found"]:
+            result["missing"] = True
+            result["reason"] = "HTTP 404"
+            return result
 
-            # 其他异常不重试
+        # 其他 HTTP 错误：记录状态
+        result["reason"] = f"HTTP {status}"
+        return result
 
-            except requests.RequestException as exc:
-                result["reason"] = str(exc)
-                return result
+    def record_probe(self, entry: EntryContext, asset: str, result: Dict[str, Any]) -> None:
+        """
+        将最终探测结果写入审计信息，可用时追加到 `file_urls`。
 
-        return result
+        :param EntryContext entry: 目标上下文
+        :param str asset: 审计字段名（cif_file/structure_image/validation_image/validation_pdf）
+        :param dict result: `build_probe_result` 的返回值
+        """
+        if result.get("available"):
+            entry.file_urls.append(result["selected"])
+        elif asset == "structure_image":
+            # 结构图片所有候选均不可用时，不指向任何 URL
+            result = dict(result, selected=None)
+        entry.file_audit[asset] = result
 
 
 class RevisionState:
     """
     负责增量游标读取、去重判定以及游标持久化。
+
+    Redis 读写均做了批量化：Search 分页到达时用一次 HMGET 预取整页 revision，
+    保存后的 revision 先进入写缓冲，累计 `flush_size` 条时、或由 Spider 的定时任务
+    （`flush_if_stale`）发现距上次写入超过 `flush_interval` 秒时通过 pipeline 一次性 HSET，
+    关闭时再做最终写入。
     """
 
     def __init__(
@@ -500,6 +691,9 @@ class RevisionState:
         redis_hash: str,
         ttl_seconds: int,
         overlap_days: int,
+        flush_size: int = 100,
+        flush_interval: float = 5.0,
+        logger=None,
     ):
         self.collection = collection
         self.redis_conn = redis_conn
@@ -507,6 +701,15 @@ class RevisionState:
         self.redis_hash = redis_hash
         self.ttl_seconds = ttl_seconds
         self.overlap_days = overlap_days
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.logger = logger
+
+        # 预取的已存储 revision（判重或上下文清理时弹出）与待写入 Redis 的缓冲区
+
+        self._prefetched: Dict[str, Optional[str]] = {}
+        self._pending_writes: Dict[str, str] = {}
+        self._last_write = time.monotonic()
 
         # 从 MongoDB 加载上次的游标，计算增量起始日期（向前推 `overlap_days` 天）。
         record = self.collection.find_one({"_id": self.doc_id})
@@ -543,6 +746,34 @@ class RevisionState:
         if current and incoming and incoming > current:
             self.run_max_revision = revision
 
+    def prefetch(self, pdb_ids: List[str]) -> None:
+        """
+        用一次 HMGET 预取一批结构的已存储 revision，供后续 `is_duplicate` 直接查表。
+
+        :param list pdb_ids: 结构 ID 列表
+        """
+        pdb_ids = [pdb_id for pdb_id in pdb_ids if pdb_id not in self._prefetched]
+        if not pdb_ids:
+            return
+
+        # Redis 异常时不记录预取结果，`is_duplicate` 会逐条 HGET
+
+        try:
+            values = self.redis_conn.hmget(self.redis_hash, pdb_ids)
+        except RedisError as exc:
+            if self.logger:
+                self.logger.warning("revision 批量预取失败（%d 条改为逐条读取）: %s", len(pdb_ids), exc)
+            return
+        self._prefetched.update(zip(pdb_ids, values))
+
+    def discard(self, pdb_id: str) -> None:
+        """
+        丢弃结构的预取结果（上下文清理时调用：失败、放弃或没有 revision 的结构不会经过 `is_duplicate`）。
+
+        :param str pdb_id: 结构 ID
+        """
+        self._prefetched.pop(pdb_id, None)
+
     def is_duplicate(self, pdb_id: str, revision: Optional[str]) -> bool:
         """
         判断当前 revision 是否已处理。
@@ -555,9 +786,15 @@ class RevisionState:
         if not revision:
             return False
 
-        # 从 Redis 读取已存储的 revision，如果当前 revision 小于等于已存储的，则判定为重复。
+        # 依次查写缓冲、预取结果，都没有时才单独 HGET；
+        # 如果当前 revision 小于等于已存储的，则判定为重复。
 
-        stored = self.redis_conn.hget(self.redis_hash, pdb_id)
+        if pdb_id in self._pending_writes:
+            stored = self._pending_writes[pdb_id]
+        elif pdb_id in self._prefetched:
+            stored = self._prefetched.pop(pdb_id)
+        else:
+            stored = self.redis_conn.hget(self.redis_hash, pdb_id)
         if not stored:
             return False
         stored_dt = self._to_datetime(stored)
@@ -566,24 +803,57 @@ class RevisionState:
 
     def persist_revision(self, pdb_id: str, revision: Optional[str]) -> None:
         """
-        将最新 revision 写入 Redis。
+        将最新 revision 放入写缓冲，达到条数或时间阈值时批量写入 Redis。
 
         :param str pdb_id: 结构 ID
         :param str revision: revision 字符串
         """
         if not revision:
             return
-        self.redis_conn.hset(self.redis_hash, pdb_id, revision)
-        self.redis_conn.expire(self.redis_hash, self.ttl_seconds)
+        self._pending_writes[pdb_id] = revision
+        if len(self._pending_writes) >= self.flush_size:
+            self.flush_revisions()
+        else:
+            self.flush_if_stale()
+
+    def flush_if_stale(self) -> None:
+        """
+        距上次写入超过 `flush_interval` 秒且缓冲非空时写入；由 Spider 定时调用，保证写入稀疏的尾段也能落到 Redis。
+        """
+        if self._pending_writes and time.monotonic() - self._last_write >= self.flush_interval:
+            self.flush_revisions()
+
+    def flush_revisions(self) -> None:
+        """
+        通过 pipeline 一次性写入缓冲中的 revision（HSET mapping + EXPIRE）。
+
+        写入失败时保留缓冲，等待下次阈值触发或关闭时重试。
+        """
+        self._last_write = time.monotonic()
+        if not self._pending_writes:
+            return
+        try:
+            pipe = self.redis_conn.pipeline(transaction=False)
+            pipe.hset(self.redis_hash, mapping=self._pending_writes)
+            pipe.expire(self.redis_hash, self.ttl_seconds)
+            pipe.execute()
+        except RedisError as exc:
+            if self.logger:
+                self.logger.warning("revision 批量写入 Redis 失败（%d 条待重试）: %s", len(self._pending_writes), exc)
+            return
+        self._pending_writes = {}
 
     def flush(self) -> None:
         """
         将运行期的最大 revision 写回 MongoDB 游标。
+
+        使用 `$max` 保证游标只前进：分布式模式下多个 worker 各自写回时，较小的值不会覆盖较大的值
+        （revision 均为 UTC ISO 字符串，字典序与时间顺序一致）。
         """
         if self.run_max_revision:
             self.collection.update_one(
                 {"_id": self.doc_id},
-                {"$set": {"last_revision": self.run_max_revision}},
+                {"$max": {"last_revision": self.run_max_revision}},
                 upsert=True,
             )
 
@@ -605,3 +875,615 @@ class RevisionState:
         except ValueError:
             return None
 
+
+
+class CrawlFrontier:
+    """
+    持久化的抓取边界（Redis），记录 Search 偏移、待处理与已完成的 PDB ID。
+
+    - `state`（Hash）：下一页 Search 偏移、已入队数量、Search 是否结束、增量起点与已完成部分的最大 revision
+    - `pending`（Set）：已从 Search 取出但尚未完成的 ID，重启后优先重新调度
+    - `completed`（Set）：已入库或判重跳过的 ID，重启后不再请求
+
+    Search 分页与其 ID 在同一个 MULTI 中写入，偏移不会越过未记录的 ID；完成标记先进入写缓冲，
+    与 `RevisionState` 相同按条数或时间批量落盘，崩溃时最多重复抓取最后一批。
+    """
+
+    def __init__(
+        self,
+        redis_conn,
+        key_prefix: str,
+        name: str,
+        ttl_seconds: int,
+        flush_size: int = 100,
+        flush_interval: float = 5.0,
+        logger=None,
+    ):
+        self.redis_conn = redis_conn
+        self.name = name
+        self.state_key = f"{key_prefix}:{name}:state"
+        self.pending_key = f"{key_prefix}:{name}:pending"
+        self.completed_key = f"{key_prefix}:{name}:completed"
+        self.ttl_seconds = ttl_seconds
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.logger = logger
+
+        # 待写入的完成 ID 与最新 revision 游标
+
+        self._completed_buffer: List[str] = []
+        self._run_max_revision: Optional[str] = None
+        self._last_write = time.monotonic()
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        读取上次保存的边界状态。
+
+        :return: 状态字典（含 pending 列表），不存在时返回 None
+        :rtype: dict or None
+        """
+        state = self.redis_conn.hgetall(self.state_key)
+        if not state:
+            return None
+        pending = sorted(self.redis_conn.smembers(self.pending_key))
+        return {
+            "next_search_start": int(state.get("next_search_start") or 0),
+            "total_enqueued": int(state.get("total_enqueued") or 0),
+            "search_finished": state.get("search_finished") == "1",
+            "increment_start": state.get("increment_start") or None,
+            "run_max_revision": state.get("run_max_revision") or None,
+            "completed_count": self.redis_conn.scard(self.completed_key),
+            "pending": pending,
+        }
+
+    def filter_new(self, pdb_ids: List[str]) -> List[str]:
+        """
+        过滤掉已完成或已在待处理集合中的 ID（一次 pipeline 批量 SISMEMBER）。
+
+        :param list pdb_ids: Search 返回的结构 ID
+        :return: 需要调度的结构 ID
+        :rtype: list
+        """
+        if not pdb_ids:
+            return []
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for pdb_id in pdb_ids:
+            pipe.sismember(self.completed_key, pdb_id)
+            pipe.sismember(self.pending_key, pdb_id)
+        flags = pipe.execute()
+        return [
+            pdb_id
+            for index, pdb_id in enumerate(pdb_ids)
+            if not flags[2 * index] and not flags[2 * index + 1]
+        ]
+
+    def record_page(
+        self,
+        pdb_ids: List[str],
+        next_search_start: int,
+        total_enqueued: int,
+        search_finished: bool,
+        increment_start: Optional[str] = None,
+    ) -> None:
+        """
+        在同一个事务中记录一页 Search 的新 ID 与推进后的偏移。
+
+        :param list pdb_ids: 本页新入队的结构 ID
+        :param int next_search_start: 下一页 Search 偏移
+        :param int total_enqueued: 累计入队数量
+        :param bool search_finished: Search 是否已结束
+        :param str increment_start: 增量模式的起始日期，重启后沿用，保证偏移对应同一查询
+        """
+        pipe = self.redis_conn.pipeline(transaction=True)
+        if pdb_ids:
+            pipe.sadd(self.pending_key, *pdb_ids)
+        pipe.hset(
+            self.state_key,
+            mapping={
+                "next_search_start": next_search_start,
+                "total_enqueued": total_enqueued,
+                "search_finished": 1 if search_finished else 0,
+                "increment_start": increment_start or "",
+                "updated_at": datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+            },
+        )
+        for key in (self.state_key, self.pending_key, self.completed_key):
+            pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def mark_completed(self, pdb_id: str, run_max_revision: Optional[str] = None) -> None:
+        """
+        标记结构已完成（入库或判重跳过），达到条数或时间阈值时批量写入。
+
+        :param str pdb_id: 结构 ID
+        :param str run_max_revision: 当前已完成部分的最大 revision
+        """
+        self._completed_buffer.append(pdb_id)
+        if run_max_revision:
+            self._run_max_revision = run_max_revision
+        if (
+            len(self._completed_buffer) >= self.flush_size
+            or time.monotonic() - self._last_write >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        将缓冲的完成 ID 从 pending 移入 completed，并更新 revision 游标。
+
+        写入失败时保留缓冲，等待下次阈值触发或关闭时重试。
+        """
+        self._last_write = time.monotonic()
+        if not self._completed_buffer:
+            return
+        try:
+            pipe = self.redis_conn.pipeline(transaction=True)
+            pipe.sadd(self.completed_key, *self._completed_buffer)
+            pipe.srem(self.pending_key, *self._completed_buffer)
+            if self._run_max_revision:
+                pipe.hset(self.state_key, "run_max_revision", self._run_max_revision)
+            pipe.execute()
+        except RedisError as exc:
+            if self.logger:
+                self.logger.warning("frontier 完成标记写入 Redis 失败（%d 条待重试）: %s", len(self._completed_buffer), exc)
+            return
+        self._completed_buffer = []
+
+    def pending_count(self) -> int:
+        """
+        获取尚未完成的 ID 数量。
+
+        :return: 待处理数量
+        :rtype: int
+        """
+        return self.redis_conn.scard(self.pending_key)
+
+    def clear(self) -> None:
+        """
+        删除全部边界数据（整轮完成后调用，下次同名运行从头开始）。
+        """
+        self._completed_buffer = []
+        self.redis_conn.delete(self.state_key, self.pending_key, self.completed_key)
+
+
+class DistributedQueue:
+    """
+    分布式模式下的共享 PDB ID 队列（Redis Stream + 消费组）。
+
+    - seeder 调用 `push` 写入新 ID：先查 `seen` 集合去重，再在同一个 MULTI 中 XADD 并 SADD，
+      同一队列内每个 ID 只会入队一次；Search 翻完后调用 `mark_seeded`。
+    - worker 调用 `claim` 领取：优先接管空闲超过 `claim_idle_seconds` 的未确认消息（失联 worker 留下的），
+      再用 XREADGROUP 读取新消息；结构完成后 `ack`（XACK + XDEL）。
+    - 需要 Redis 6.2 及以上（XPENDING 的 IDLE 过滤）。
+    """
+
+    def __init__(
+        self,
+        redis_conn,
+        key_prefix: str,
+        name: str,
+        consumer: str,
+        group: str,
+        ttl_seconds: int,
+        claim_idle_seconds: int,
+        max_deliveries: int,
+        logger=None,
+    ):
+        self.redis_conn = redis_conn
+        self.name = name
+        self.consumer = consumer
+        self.group = group
+        self.stream_key = f"{key_prefix}:{name}:stream"
+        self.seen_key = f"{key_prefix}:{name}:seen"
+        self.seeded_key = f"{key_prefix}:{name}:seeded"
+        self.failed_key = f"{key_prefix}:{name}:failed"
+        self.ttl_seconds = ttl_seconds
+        self.claim_idle_ms = claim_idle_seconds * 1000
+        self.max_deliveries = max_deliveries
+        self.logger = logger
+
+        # 接管失联消息的扫描间隔（不必每次领取都扫描 PEL）
+
+        self._reclaim_interval = max(1.0, claim_idle_seconds / 10)
+        self._last_reclaim = 0.0
+
+    def ensure_group(self) -> None:
+        """
+        创建 Stream 与消费组（已存在时忽略）。
+        """
+        try:
+            self.redis_conn.xgroup_create(self.stream_key, self.group, id="0", mkstream=True)
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    def push(self, pdb_ids: List[str]) -> int:
+        """
+        将未入过队的 ID 写入 Stream。
+
+        :param list pdb_ids: 结构 ID 列表
+        :return: 实际新入队数量
+        :rtype: int
+        """
+        if not pdb_ids:
+            return 0
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for pdb_id in pdb_ids:
+            pipe.sismember(self.seen_key, pdb_id)
+        new_ids = [pdb_id for pdb_id, seen in zip(pdb_ids, pipe.execute()) if not seen]
+        new_ids = list(dict.fromkeys(new_ids))
+        if not new_ids:
+            return 0
+
+        # 入队与去重标记在同一个事务中写入，seeder 中途退出时不会出现“已标记未入队”的 ID
+
+        pipe = self.redis_conn.pipeline(transaction=True)
+        for pdb_id in new_ids:
+            pipe.xadd(self.stream_key, {"pdb_id": pdb_id})
+        pipe.sadd(self.seen_key, *new_ids)
+        pipe.expire(self.stream_key, self.ttl_seconds)
+        pipe.expire(self.seen_key, self.ttl_seconds)
+        pipe.execute()
+        return len(new_ids)
+
+    def mark_seeded(self, search_failed: bool = False) -> None:
+        """
+        标记 Search 已全部入队，worker 在队列清空后据此退出。
+        Search 重试用尽时同样标记（值带 `failed:` 前缀），避免 worker 无限等待。
+
+        :param bool search_failed: Search 是否因失败提前结束
+        """
+        value = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+        if search_failed:
+            value = f"failed:{value}"
+        self.redis_conn.set(self.seeded_key, value, ex=self.ttl_seconds)
+
+    def search_failed(self) -> bool:
+        """
+        判断 seeder 的 Search 是否失败结束（队列只包含部分 ID）。
+
+        :return: 是否失败
+        :rtype: bool
+        """
+        value = self.redis_conn.get(self.seeded_key)
+        return bool(value) and value.startswith("failed:")
+
+    def claim(self, count: int) -> List[Tuple[str, str]]:
+        """
+        领取最多 `count` 条消息。
+
+        :param int count: 领取上限
+        :return: [(消息 ID, PDB ID)]
+        :rtype: list
+        """
+        if count <= 0:
+            return []
+        messages = []
+        if time.monotonic() - self._last_reclaim >= self._reclaim_interval:
+            self._last_reclaim = time.monotonic()
+            messages.extend(self._reclaim_stale(count))
+        if len(messages) < count:
+            response = self.redis_conn.xreadgroup(
+                self.group, self.consumer, {self.stream_key: ">"}, count=count - len(messages)
+            )
+            for _, entries in response or []:
+                messages.extend((message_id, fields.get("pdb_id")) for message_id, fields in entries if fields)
+        return [(message_id, pdb_id) for message_id, pdb_id in messages if pdb_id]
+
+    def _reclaim_stale(self, count: int) -> List[Tuple[str, str]]:
+        """
+        接管空闲超时的未确认消息；投递次数达到上限的记入 failed 并确认，避免无限重试。
+
+        :param int count: 接管上限
+        :return: [(消息 ID, PDB ID)]
+        :rtype: list
+        """
+        stale = self.redis_conn.xpending_range(
+            self.stream_key, self.group, min="-", max="+", count=count, idle=self.claim_idle_ms
+        )
+        if not stale:
+            return []
+        retry_ids = [item["message_id"] for item in stale if item["times_delivered"] < self.max_deliveries]
+        exhausted_ids = [item["message_id"] for item in stale if item["times_delivered"] >= self.max_deliveries]
+        if exhausted_ids:
+            failed = [pdb_id for _, pdb_id in self._read_messages(exhausted_ids)]
+            if failed:
+                self.redis_conn.sadd(self.failed_key, *failed)
+                self.redis_conn.expire(self.failed_key, self.ttl_seconds)
+            self.ack(exhausted_ids)
+            if self.logger:
+                self.logger.error("分布式队列中 %d 条结构重试 %d 次仍未完成，记入 failed：%s",
+                                  len(failed), self.max_deliveries, ",".join(failed[:20]))
+        if not retry_ids:
+            return []
+        claimed = self.redis_conn.xclaim(self.stream_key, self.group, self.consumer, self.claim_idle_ms, retry_ids)
+        if claimed and self.logger:
+            self.logger.warning("接管 %d 条空闲超时的未确认结构", len(claimed))
+        return [(message_id, fields.get("pdb_id")) for message_id, fields in claimed or [] if fields]
+
+    def _read_messages(self, message_ids: List[str]) -> List[Tuple[str, str]]:
+        """
+        按消息 ID 读取 PDB ID。
+
+        :param list message_ids: 消息 ID 列表
+        :return: [(消息 ID, PDB ID)]
+        :rtype: list
+        """
+        pipe = self.redis_conn.pipeline(transaction=False)
+        for message_id in message_ids:
+            pipe.xrange(self.stream_key, min=message_id, max=message_id)
+        result = []
+        for entries in pipe.execute():
+            result.extend((message_id, fields.get("pdb_id")) for message_id, fields in entries if fields)
+        return result
+
+    def ack(self, message_ids: List[str]) -> None:
+        """
+        确认消息已完成，并从 Stream 删除以释放内存（去重由 `seen` 集合负责）。
+
+        :param list message_ids: 消息 ID 列表
+        """
+        if not message_ids:
+            return
+        pipe = self.redis_conn.pipeline(transaction=False)
+        pipe.xack(self.stream_key, self.group, *message_ids)
+        pipe.xdel(self.stream_key, *message_ids)
+        pipe.execute()
+
+    def is_drained(self) -> bool:
+        """
+        判断队列是否已处理完：seeder 已结束且消费组内没有未确认的消息。
+        调用方需先确认 `claim` 已读不到新消息。
+
+        :return: 是否处理完
+        :rtype: bool
+        """
+        if not self.redis_conn.exists(self.seeded_key):
+            return False
+        return self.redis_conn.xpending(self.stream_key, self.group)["pending"] == 0
+
+    def summary(self) -> str:
+        """
+        生成队列统计文本。
+
+        :return: 统计信息
+        :rtype: str
+        """
+        return (
+            f"分布式队列 {self.name}：已入队 {self.redis_conn.scard(self.seen_key)}，"
+            f"待领取/处理中 {self.redis_conn.xlen(self.stream_key)}，"
+            f"未确认 {self.redis_conn.xpending(self.stream_key, self.group)['pending']}，"
+            f"失败 {self.redis_conn.scard(self.failed_key)}"
+            + ("（seeder Search 失败，队列不完整）" if self.search_failed() else "")
+        )
+
+
+class IdListSource:
+    """
+    从文件或标准输入流式读取 PDB ID，并按分片取其中一部分。
+
+    - 每行取第一个字段（空白或逗号分隔），空行与 `#` 开头的行跳过，兼容 RCSB holdings 列表
+      （如 `pdb_entry_type.txt`）与每行一个 ID 的差异文件；`.gz` 文件直接按文本解压读取。
+    - 分片按 `crc32(ID) % shard_count == shard_index` 选取，与行序无关：同一份或不同来源的列表中，
+      同一个 ID 总是落在同一个分片，各进程互不重叠且合起来覆盖全部 ID。
+    """
+
+    def __init__(self, path: Optional[str] = None, shard_index: int = 0, shard_count: int = 1, lines=None):
+        """
+        :param str path: 文件路径，`-` 表示标准输入
+        :param int shard_index: 当前分片序号（从 0 开始）
+        :param int shard_count: 分片总数
+        :param lines: 不读文件时直接使用的行序列
+        """
+        if shard_count < 1 or not 0 <= shard_index < shard_count:
+            raise ValueError(f"分片参数无效：shard_index={shard_index}, shard_count={shard_count}")
+        self.path = path
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.read_count = 0
+        self.exhausted = False
+        self._file = None
+        self._lines = lines
+        self._ids = self._iter_ids()
+
+    @classmethod
+    def from_ids(cls, pdb_ids: List[str]) -> "IdListSource":
+        """
+        由内存中的 ID 列表构造（单个 `pdb_id` 参数使用）。
+
+        :param list pdb_ids: 结构 ID 列表
+        :return: ID 来源
+        :rtype: IdListSource
+        """
+        return cls(lines=list(pdb_ids))
+
+    def read(self, count: int) -> List[str]:
+        """
+        读取最多 `count` 个属于当前分片的 ID，读完后 `exhausted` 置为 True 并关闭文件。
+
+        :param int count: 读取上限
+        :return: 大写的结构 ID 列表
+        :rtype: list
+        """
+        pdb_ids = []
+        if self.exhausted:
+            return pdb_ids
+        for pdb_id in self._ids:
+            pdb_ids.append(pdb_id)
+            if len(pdb_ids) >= count:
+                break
+        else:
+            self.close()
+        self.read_count += len(pdb_ids)
+        return pdb_ids
+
+    def skip(self, count: int) -> int:
+        """
+        跳过前 `count` 个属于当前分片的 ID（断点恢复时使用）。
+
+        :param int count: 跳过数量
+        :return: 实际跳过数量
+        :rtype: int
+        """
+        skipped = 0
+        while skipped < count and not self.exhausted:
+            skipped += len(self.read(min(count - skipped, 10000)))
+        return skipped
+
+    def close(self) -> None:
+        """
+        标记读取结束并关闭文件（标准输入不关闭）。
+        """
+        self.exhausted = True
+        if hasattr(self._file, "close") and self._file is not sys.stdin:
+            self._file.close()
+        self._file = None
+
+    def _iter_ids(self):
+        """
+        逐行解析 ID 并按分片过滤。
+
+        :return: 结构 ID 迭代器
+        :rtype: Generator[str, None, None]
+        """
+        if self._lines is not None:
+            self._file = self._lines
+        elif self.path == "-":
+            self._file = sys.stdin
+        elif self.path.endswith(".gz"):
+            self._file = gzip.open(self.path, "rt", encoding="utf-8")
+        else:
+            self._file = open(self.path, "r", encoding="utf-8")
+        for line in self._file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            pdb_id = line.replace(",", " ").split()[0].upper()
+            if self.shard_count > 1 and zlib.crc32(pdb_id.encode("utf-8")) % self.shard_count != self.shard_index:
+                continue
+            yield pdb_id
+
+
+class ReferenceCache:
+    """
+    ChemComp / DrugBank 的两级缓存：进程内 LRU + Redis Hash（整表 TTL 从创建时开始计算）。
+
+    读取顺序为 LRU → Redis（一次 HMGET）→ 网络；网络结果通过 `put_many` 同时回写两级缓存。
+    值以 JSON 字符串保存，每次命中都解码出新的字典，避免多个 Entry 共享同一对象被下游修改。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        redis_conn,
+        redis_hash: str,
+        ttl_seconds: int,
+        max_size: int,
+        logger=None,
+    ):
+        self.name = name
+        self.redis_conn = redis_conn
+        self.redis_hash = redis_hash
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.logger = logger
+        self._lru: "OrderedDict[str, str]" = OrderedDict()
+        self.stats = {"memory_hits": 0, "redis_hits": 0, "misses": 0, "redis_errors": 0}
+
+    def get_many(self, keys: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        批量读取缓存。
+
+        :param list keys: 待查询的 ID 列表
+        :return: (命中的 {ID: 数据}, 未命中需走网络的 ID 列表)
+        :rtype: tuple
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        pending: List[str] = []
+
+        # 第一级：进程内 LRU，命中后移到队尾表示最近使用。
+
+        for key in keys:
+            raw = self._lru.get(key)
+            if raw is None:
+                pending.append(key)
+                continue
+            self._lru.move_to_end(key)
+            found[key] = json.loads(raw)
+            self.stats["memory_hits"] += 1
+
+        # 第二级：Redis Hash，一次 HMGET 取回所有 LRU 未命中的 ID；Redis 异常时降级为全部未命中。
+
+        missing: List[str] = []
+        if pending:
+            try:
+                values = self.redis_conn.hmget(self.redis_hash, pending)
+            except RedisError as exc:
+                self.stats["redis_errors"] += 1
+                if self.logger:
+                    self.logger.warning("%s 缓存读取 Redis 失败，回退网络请求: %s", self.name, exc)
+                values = [None] * len(pending)
+            for key, raw in zip(pending, values):
+                if raw is None:
+                    missing.append(key)
+                    continue
+                self._remember(key, raw)
+                found[key] = json.loads(raw)
+                self.stats["redis_hits"] += 1
+
+        self.stats["misses"] += len(missing)
+        return found, missing
+
+    def put_many(self, values: Dict[str, Dict[str, Any]]) -> None:
+        """
+        将网络取回的数据写入两级缓存（Redis 写入通过 pipeline 合并为一次往返）。
+
+        :param dict values: {ID: 规范化后的数据}
+        """
+        if not values:
+            return
+        encoded = {key: json.dumps(value, ensure_ascii=False, default=str) for key, value in values.items()}
+        for key, raw in encoded.items():
+            self._remember(key, raw)
+        # TTL 只在 Hash 新建（TTL 为 -1）时设置，持续写入不会顺延过期时间，整表按周期整体失效。
+        # 不用 `EXPIRE ... NX`（需要 Redis 7），第二次往返只发生在 Hash 刚创建时。
+
+        try:
+            pipe = self.redis_conn.pipeline(transaction=False)
+            pipe.hset(self.redis_hash, mapping=encoded)
+            pipe.ttl(self.redis_hash)
+            _, ttl = pipe.execute()
+            if ttl == -1:
+                self.redis_conn.expire(self.redis_hash, self.ttl_seconds)
+        except RedisError as exc:
+            self.stats["redis_errors"] += 1
+            if self.logger:
+                self.logger.warning("%s 缓存写入 Redis 失败: %s", self.name, exc)
+
+    def summary(self) -> str:
+        """
+        生成命中统计描述，供 `closed()` 输出。
+
+        :return: 统计描述
+        :rtype: str
+        """
+        hits = self.stats["memory_hits"] + self.stats["redis_hits"]
+        total = hits + self.stats["misses"]
+        rate = hits / total * 100 if total else 0.0
+        return (
+            f"{self.name} 缓存命中 {hits}/{total} ({rate:.1f}%)："
+            f"内存 {self.stats['memory_hits']}，Redis {self.stats['redis_hits']}，"
+            f"未命中 {self.stats['misses']}，Redis 异常 {self.stats['redis_errors']}"
+        )
+
+    def _remember(self, key: str, raw: str) -> None:
+        """
+        写入 LRU，超出上限时淘汰最久未使用的条目。
+
+        :param str key: 缓存 ID
+        :param str raw: JSON 字符串
+        """
+        self._lru[key] = raw
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 18:10
+# @User  : 刘子都
+# @Descriotion  : 单元测试公共配置：把项目根目录加入导入路径（与 scrapy 运行时一致，以 `src.` 导入）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
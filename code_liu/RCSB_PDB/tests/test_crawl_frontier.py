@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 19:10
+# @User  : 刘子都
+# @Descriotion  : CrawlFrontier：Search 分页记录、完成标记批量落盘与断点恢复
+"""
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.spiders.rcsb_pdb.services import CrawlFrontier
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def make_frontier(redis_conn, **kwargs):
+    options = {"ttl_seconds": 3600, "flush_size": 2, "flush_interval": 3600}
+    options.update(kwargs)
+    return CrawlFrontier(redis_conn, "rcsb_all_api:frontier", "test", **options)
+
+
+def test_load_without_state_returns_none(redis_conn):
+    assert make_frontier(redis_conn).load() is None
+
+
+def test_record_page_and_load_round_trip(redis_conn):
+    frontier = make_frontier(redis_conn)
+    frontier.record_page(["2ABC", "1ABC"], next_search_start=100, total_enqueued=2, search_finished=False,
+                         increment_start="2026-01-01")
+
+    state = make_frontier(redis_conn).load()
+
+    assert state["pending"] == ["1ABC", "2ABC"]
+    assert state["next_search_start"] == 100 and state["total_enqueued"] == 2
+    assert state["search_finished"] is False and state["increment_start"] == "2026-01-01"
+    assert state["completed_count"] == 0 and state["run_max_revision"] is None
+    assert redis_conn.ttl(frontier.pending_key) > 0
+
+
+def test_completed_ids_flush_in_batches(redis_conn):
+    frontier = make_frontier(redis_conn)
+    frontier.record_page(["1ABC", "2ABC", "3ABC"], 3, 3, False)
+
+    frontier.mark_completed("1ABC", "2026-01-01")
+    assert frontier.pending_count() == 3
+
+    frontier.mark_completed("2ABC", "2026-02-01")
+    state = frontier.load()
+    assert state["pending"] == ["3ABC"] and state["completed_count"] == 2
+    assert state["run_max_revision"] == "2026-02-01"
+
+
+def test_filter_new_skips_pending_and_completed(redis_conn):
+    frontier = make_frontier(redis_conn, flush_size=1)
+    frontier.record_page(["1ABC", "2ABC"], 2, 2, False)
+    frontier.mark_completed("1ABC")
+
+    assert frontier.filter_new(["1ABC", "2ABC", "3ABC"]) == ["3ABC"]
+    assert frontier.filter_new([]) == []
+
+
+def test_unflushed_completions_stay_pending_after_restart(redis_conn):
+    frontier = make_frontier(redis_conn)
+    frontier.record_page(["1ABC", "2ABC"], 2, 2, True)
+    frontier.mark_completed("1ABC")
+
+    # 进程在落盘前退出：新实例仍把 1ABC 视为待处理，重启后会重新抓取
+    state = make_frontier(redis_conn).load()
+
+    assert state["pending"] == ["1ABC", "2ABC"] and state["search_finished"] is True
+
+
+def test_clear_removes_all_keys(redis_conn):
+    frontier = make_frontier(redis_conn, flush_size=1)
+    frontier.record_page(["1ABC"], 1, 1, True)
+    frontier.mark_completed("1ABC")
+
+    frontier.clear()
+
+    assert frontier.load() is None and frontier.pending_count() == 0
+    assert not redis_conn.exists(frontier.completed_key)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 19:20
+# @User  : 刘子都
+# @Descriotion  : DistributedQueue：入队去重、领取与确认、失联消息接管、seeded 与 Search 失败标记
+"""
+
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.spiders.rcsb_pdb.services import DistributedQueue
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def make_queue(redis_conn, consumer, **kwargs):
+    options = {"ttl_seconds": 3600, "claim_idle_seconds": 600, "max_deliveries": 3}
+    options.update(kwargs)
+    queue = DistributedQueue(redis_conn, "rcsb_all_api:queue", "test", consumer, "workers", **options)
+    queue.ensure_group()
+    return queue
+
+
+def test_push_skips_ids_already_queued(redis_conn):
+    queue = make_queue(redis_conn, "seeder")
+
+    assert queue.push(["1ABC", "2ABC", "2ABC"]) == 2
+    assert queue.push(["2ABC", "3ABC"]) == 1
+    assert queue.push([]) == 0
+    assert redis_conn.xlen(queue.stream_key) == 3
+
+
+def test_ensure_group_is_idempotent(redis_conn):
+    make_queue(redis_conn, "worker-a")
+    make_queue(redis_conn, "worker-b")
+
+
+def test_workers_claim_disjoint_messages_and_ack_removes_them(redis_conn):
+    make_queue(redis_conn, "seeder").push(["1ABC", "2ABC", "3ABC"])
+    worker_a = make_queue(redis_conn, "worker-a")
+    worker_b = make_queue(redis_conn, "worker-b")
+
+    claimed_a = worker_a.claim(2)
+    claimed_b = worker_b.claim(2)
+
+    assert [pdb_id for _, pdb_id in claimed_a] == ["1ABC", "2ABC"]
+    assert [pdb_id for _, pdb_id in claimed_b] == ["3ABC"]
+    assert worker_a.claim(0) == []
+
+    worker_a.ack([message_id for message_id, _ in claimed_a])
+    assert redis_conn.xpending(worker_a.stream_key, "workers")["pending"] == 1
+    assert redis_conn.xlen(worker_a.stream_key) == 1
+
+
+def test_is_drained_requires_seeded_and_no_pending(redis_conn):
+    seeder = make_queue(redis_conn, "seeder")
+    worker = make_queue(redis_conn, "worker-a")
+    seeder.push(["1ABC"])
+    claimed = worker.claim(1)
+
+    assert not worker.is_drained()
+    seeder.mark_seeded()
+    assert not worker.is_drained()
+
+    worker.ack([message_id for message_id, _ in claimed])
+    assert worker.is_drained()
+
+
+def test_stale_messages_are_reclaimed_by_another_worker(redis_conn):
+    make_queue(redis_conn, "seeder").push(["1ABC"])
+    make_queue(redis_conn, "worker-a").claim(1)
+    time.sleep(0.01)
+
+    # worker-a 失联；空闲阈值为 0 时 worker-b 立即接管其未确认消息
+    worker_b = make_queue(redis_conn, "worker-b", claim_idle_seconds=0)
+    claimed = worker_b.claim(1)
+
+    assert [pdb_id for _, pdb_id in claimed] == ["1ABC"]
+    consumers = {item["name"]: item["pending"] for item in redis_conn.xinfo_consumers(worker_b.stream_key, "workers")}
+    assert consumers["worker-b"] == 1 and consumers["worker-a"] == 0
+
+
+def test_messages_over_max_deliveries_are_failed_and_acked(redis_conn):
+    make_queue(redis_conn, "seeder").push(["1ABC"])
+    make_queue(redis_conn, "worker-a").claim(1)
+    time.sleep(0.01)
+    worker_b = make_queue(redis_conn, "worker-b", claim_idle_seconds=0, max_deliveries=1)
+
+    assert worker_b.claim(1) == []
+    assert redis_conn.smembers(worker_b.failed_key) == {"1ABC"}
+    assert redis_conn.xpending(worker_b.stream_key, "workers")["pending"] == 0
+
+
+def test_failed_search_still_marks_seeded(redis_conn):
+    seeder = make_queue(redis_conn, "seeder")
+    worker = make_queue(redis_conn, "worker-a")
+
+    seeder.mark_seeded(search_failed=True)
+
+    assert worker.is_drained() and worker.search_failed()
+    assert "队列不完整" in worker.summary()
+
+    seeder.mark_seeded()
+    assert not worker.search_failed() and "队列不完整" not in worker.summary()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 19:50
+# @User  : 刘子都
+# @Descriotion  : IdListSource：列表解析、分片互不重叠且覆盖全部 ID、断点跳过
+"""
+
+import gzip
+
+import pytest
+
+pytest.importorskip("redis")
+
+from src.spiders.rcsb_pdb.services import IdListSource
+
+IDS = [f"{i}A{i % 7}B" for i in range(1, 60)]
+
+
+def read_all(source, count=7):
+    pdb_ids = []
+    while not source.exhausted:
+        pdb_ids.extend(source.read(count))
+    return pdb_ids
+
+
+def test_parses_holdings_style_lines(tmp_path):
+    path = tmp_path / "holdings.txt"
+    path.write_text("# header\n\n101m\tprot\tdiffraction\n1abc,extra\n  2xyz  \n", encoding="utf-8")
+
+    source = IdListSource(str(path))
+
+    assert read_all(source) == ["101M", "1ABC", "2XYZ"]
+    assert source.read_count == 3 and source.read(5) == []
+
+
+def test_reads_gzip(tmp_path):
+    path = tmp_path / "ids.txt.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write("1abc\n2abc\n")
+
+    assert read_all(IdListSource(str(path))) == ["1ABC", "2ABC"]
+
+
+def test_shards_are_disjoint_and_cover_all_ids():
+    shards = [read_all(IdListSource(lines=IDS, shard_index=index, shard_count=4)) for index in range(4)]
+
+    combined = [pdb_id for shard in shards for pdb_id in shard]
+    assert sorted(combined) == sorted(pdb_id.upper() for pdb_id in IDS)
+    assert len(combined) == len(set(combined))
+
+    # 分片只取决于 ID 本身，与行序无关
+    reordered = read_all(IdListSource(lines=list(reversed(IDS)), shard_index=1, shard_count=4))
+    assert sorted(reordered) == sorted(shards[1])
+
+
+def test_skip_resumes_after_read_count():
+    first = IdListSource.from_ids(IDS)
+    first.read(10)
+
+    resumed = IdListSource.from_ids(IDS)
+    assert resumed.skip(first.read_count) == 10
+    assert resumed.read(3) == [pdb_id.upper() for pdb_id in IDS[10:13]]
+
+
+def test_skip_past_end_marks_exhausted():
+    source = IdListSource.from_ids(IDS[:3])
+
+    assert source.skip(10) == 3 and source.exhausted
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 18:10
+# @User  : 刘子都
+# @Descriotion  : MongoDBRawStoragePipeline 缓冲写入：部分失败、连接失败重试与永久错误
+"""
+
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("pymongo")
+raw_storage_pipeline = pytest.importorskip("src.pipelines.raw_storage_pipeline")
+
+from pymongo import InsertOne
+from pymongo.errors import AutoReconnect, BulkWriteError, OperationFailure
+
+from src.signals import items_stored
+
+
+def make_pipeline(**attrs):
+    """构造未连接数据库的 Pipeline，bulk_write 与信号均为 mock。"""
+    pipeline = raw_storage_pipeline.MongoDBRawStoragePipeline()
+    pipeline.bulk_size = 100
+    pipeline.database_model = mock.MagicMock()
+    pipeline._signals = mock.MagicMock()
+    pipeline._spider = mock.sentinel.spider
+    for key, value in attrs.items():
+        setattr(pipeline, key, value)
+    return pipeline
+
+
+def bulk_write_of(pipeline):
+    return pipeline.database_model.db[pipeline.collection_name].bulk_write
+
+
+def stored_receipts(pipeline):
+    """按调用顺序取出 items_stored 信号发出的全部回执。"""
+    receipts = []
+    for call in pipeline._signals.send_catch_log.call_args_list:
+        assert call.kwargs["signal"] is items_stored
+        receipts.extend(call.kwargs["receipts"])
+    return receipts
+
+
+def enqueue(pipeline, *receipts, size=10):
+    for receipt in receipts:
+        pipeline._enqueue(InsertOne({"pdb_id": receipt}), size, receipt)
+
+
+def test_flush_success_notifies_all_receipts():
+    pipeline = make_pipeline()
+    enqueue(pipeline, "1ABC", "2ABC")
+
+    pipeline.flush()
+
+    assert len(bulk_write_of(pipeline).call_args.args[0]) == 2
+    assert stored_receipts(pipeline) == ["1ABC", "2ABC"]
+    assert pipeline._buffer == [] and pipeline._receipts == [] and pipeline._buffer_bytes == 0
+
+
+def test_partial_failure_skips_failed_receipts_and_does_not_requeue():
+    pipeline = make_pipeline()
+    enqueue(pipeline, "1ABC", "2ABC", "3ABC")
+    bulk_write_of(pipeline).side_effect = BulkWriteError(
+        {"writeErrors": [{"index": 1, "code": 121, "errmsg": "Document failed validation"}]}
+    )
+
+    pipeline.flush()
+
+    assert stored_receipts(pipeline) == ["1ABC", "3ABC"]
+    assert pipeline._buffer == [] and pipeline._buffer_bytes == 0
+
+
+def test_duplicate_id_on_retry_counts_as_stored():
+    pipeline = make_pipeline()
+    enqueue(pipeline, "1ABC", "2ABC")
+    bulk_write_of(pipeline).side_effect = BulkWriteError(
+        {"writeErrors": [{"index": 0, "code": 11000, "keyPattern": {"_id": 1}, "errmsg": "E11000"}]}
+    )
+
+    pipeline.flush()
+
+    assert stored_receipts(pipeline) == ["1ABC", "2ABC"]
+
+
+def test_connection_failure_requeues_batch_until_success():
+    pipeline = make_pipeline(bulk_size=2)
+    bulk_write_of(pipeline).side_effect = AutoReconnect("primary down")
+    enqueue(pipeline, "1ABC", "2ABC")
+
+    # 达到条数阈值时写入失败，整批放回缓冲区，不发送回执
+    assert bulk_write_of(pipeline).call_count == 1
+    assert pipeline._receipts == ["1ABC", "2ABC"] and pipeline._buffer_bytes == 20
+    assert stored_receipts(pipeline) == []
+
+    # 重试期间新文档只进入缓冲区，由定时任务写入
+    enqueue(pipeline, "3ABC")
+    assert bulk_write_of(pipeline).call_count == 1
+    assert pipeline._receipts == ["1ABC", "2ABC", "3ABC"]
+
+    bulk_write_of(pipeline).side_effect = None
+    pipeline.flush()
+
+    assert stored_receipts(pipeline) == ["1ABC", "2ABC", "3ABC"]
+    assert pipeline._failed_flushes == 0 and pipeline._buffer == []
+
+
+def test_connection_failure_drops_batch_after_max_retries():
+    pipeline = make_pipeline(bulk_max_retries=2)
+    bulk_write_of(pipeline).side_effect = AutoReconnect("primary down")
+    enqueue(pipeline, "1ABC")
+
+    pipeline.flush()
+    pipeline.flush()
+    assert pipeline._receipts == ["1ABC"]
+
+    pipeline.flush()
+    assert pipeline._buffer == [] and pipeline._buffer_bytes == 0
+    assert pipeline._failed_flushes == 0
+    assert stored_receipts(pipeline) == []
+
+
+def test_connection_failure_drops_batch_over_retry_bytes():
+    pipeline = make_pipeline(bulk_max_retry_bytes=15)
+    bulk_write_of(pipeline).side_effect = AutoReconnect("primary down")
+    enqueue(pipeline, "1ABC", "2ABC")
+
+    pipeline.flush()
+
+    assert pipeline._buffer == [] and pipeline._buffer_bytes == 0
+    assert stored_receipts(pipeline) == []
+
+
+def test_permanent_error_drops_batch_without_receipts():
+    pipeline = make_pipeline()
+    bulk_write_of(pipeline).side_effect = OperationFailure("not authorized", code=13)
+    enqueue(pipeline, "1ABC", "2ABC")
+
+    pipeline.flush()
+
+    assert pipeline._buffer == [] and pipeline._buffer_bytes == 0
+    assert pipeline._failed_flushes == 0
+    assert stored_receipts(pipeline) == []
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 18:25
+# @User  : 刘子都
+# @Descriotion  : RcsbPdbPipeline upsert 模式：内容哈希跳过未变化文档、查询失败的处理
+"""
+
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+rcsb_pdb_pipeline = pytest.importorskip("src.pipelines.storage.rcsb_pdb_pipeline")
+
+from pymongo.errors import AutoReconnect, OperationFailure
+from scrapy import Field
+
+from src.items.rcsb_pdb_item import RcsbAllApiItem
+
+
+class UpsertItem(RcsbAllApiItem):
+    """测试用 Item：补充 EntryContext.to_item 写入的字段。"""
+
+    pdb_id = Field()
+    created_at = Field()
+
+
+class BulkCollection:
+    """mongomock 集合包装：mongomock 的 bulk_write 不兼容 pymongo>=4.11 的 UpdateOne，这里逐条执行。"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self.collection.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+
+
+def make_pipeline(collection=None):
+    """构造 upsert 模式的 Pipeline，集合为 mongomock（或传入的 mock）。"""
+    pipeline = rcsb_pdb_pipeline.RcsbPdbPipeline()
+    pipeline.item_class = UpsertItem
+    pipeline.storage_mode = "upsert"
+    pipeline.bulk_size = 100
+    pipeline.metadata = {"spider_name": "rcsb_all_api"}
+    pipeline._signals = mock.MagicMock()
+    if collection is None:
+        collection = BulkCollection(mongomock.MongoClient().db[pipeline.collection_name])
+    pipeline.database_model = SimpleNamespace(db={pipeline.collection_name: collection})
+    return pipeline
+
+
+def make_item(pdb_id, title, created_at="2026-10-17T00:00:00Z"):
+    return UpsertItem(
+        pdb_id=pdb_id,
+        max_revision_date="2026-01-01",
+        entry_properties={"struct": {"title": title}},
+        created_at=created_at,
+    )
+
+
+def stored_receipts(pipeline):
+    receipts = []
+    for call in pipeline._signals.send_catch_log.call_args_list:
+        receipts.extend(receipt["pdb_id"] for receipt in call.kwargs["receipts"])
+    return receipts
+
+
+def write(pipeline, *items):
+    spider = SimpleNamespace(logger=mock.MagicMock())
+    for item in items:
+        pipeline.process_item(item, spider)
+    pipeline.flush()
+
+
+def test_unchanged_content_is_skipped_and_still_reported():
+    pipeline = make_pipeline()
+    collection = pipeline.database_model.db[pipeline.collection_name]
+    write(pipeline, make_item("1ABC", "lysozyme"))
+    first = collection.find_one({"pdb_id": "1ABC"})
+
+    # created_at 不参与哈希，只有它变化时视为内容未变化
+    write(pipeline, make_item("1ABC", "lysozyme", created_at="2026-10-18T00:00:00Z"))
+
+    assert pipeline.upserted == 1 and pipeline.unchanged_skipped == 1
+    assert collection.count_documents({}) == 1
+    assert collection.find_one({"pdb_id": "1ABC"})["update_time"] == first["update_time"]
+    assert stored_receipts(pipeline) == ["1ABC", "1ABC"]
+
+
+def test_changed_content_updates_document_in_place():
+    pipeline = make_pipeline()
+    collection = pipeline.database_model.db[pipeline.collection_name]
+    write(pipeline, make_item("1ABC", "lysozyme"))
+    old = collection.find_one({"pdb_id": "1ABC"})
+
+    write(pipeline, make_item("1ABC", "lysozyme C"))
+
+    new = collection.find_one({"pdb_id": "1ABC"})
+    assert collection.count_documents({}) == 1
+    assert new["content_hash"] != old["content_hash"]
+    assert new["entry_properties"]["struct"]["title"] == "lysozyme C"
+    assert new["create_time"] == old["create_time"]
+    assert pipeline.upserted == 2
+
+
+def test_duplicate_pdb_id_in_one_batch_keeps_last():
+    pipeline = make_pipeline()
+    collection = pipeline.database_model.db[pipeline.collection_name]
+
+    write(pipeline, make_item("1ABC", "first"), make_item("1ABC", "second"))
+
+    assert collection.count_documents({}) == 1
+    assert collection.find_one({"pdb_id": "1ABC"})["entry_properties"]["struct"]["title"] == "second"
+
+
+def test_hash_lookup_connection_failure_requeues_pending():
+    collection = mock.MagicMock()
+    collection.find.side_effect = AutoReconnect("primary down")
+    pipeline = make_pipeline(collection)
+
+    write(pipeline, make_item("1ABC", "lysozyme"))
+
+    assert list(pipeline._upserts) == ["1ABC"] and pipeline._buffer_bytes > 0
+    assert pipeline._failed_flushes == 1
+    collection.bulk_write.assert_not_called()
+    assert stored_receipts(pipeline) == []
+
+
+def test_hash_lookup_permanent_error_drops_pending():
+    collection = mock.MagicMock()
+    collection.find.side_effect = OperationFailure("not authorized", code=13)
+    pipeline = make_pipeline(collection)
+
+    write(pipeline, make_item("1ABC", "lysozyme"))
+
+    assert pipeline._upserts == {} and pipeline._buffer_bytes == 0
+    collection.bulk_write.assert_not_called()
+    assert stored_receipts(pipeline) == []
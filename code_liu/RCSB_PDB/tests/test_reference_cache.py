@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 19:30
+# @User  : 刘子都
+# @Descriotion  : ReferenceCache：LRU 与 Redis 两级读取、TTL 只在创建时设置
+"""
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.spiders.rcsb_pdb.services import ReferenceCache
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def make_cache(redis_conn, max_size=10):
+    return ReferenceCache("ChemComp", redis_conn, "rcsb:chemcomp", ttl_seconds=3600, max_size=max_size)
+
+
+def test_lookup_order_memory_then_redis_then_miss(redis_conn):
+    make_cache(redis_conn).put_many({"ATP": {"name": "ATP"}})
+    cache = make_cache(redis_conn)
+
+    found, missing = cache.get_many(["ATP", "HEM"])
+    assert found == {"ATP": {"name": "ATP"}} and missing == ["HEM"]
+    assert cache.stats["redis_hits"] == 1 and cache.stats["misses"] == 1
+
+    found, _ = cache.get_many(["ATP"])
+    assert cache.stats["memory_hits"] == 1
+
+    # 每次命中解码出新对象，修改不影响缓存
+    found["ATP"]["name"] = "changed"
+    assert cache.get_many(["ATP"])[0]["ATP"] == {"name": "ATP"}
+
+
+def test_lru_evicts_least_recently_used(redis_conn):
+    cache = make_cache(redis_conn, max_size=2)
+    cache.put_many({"A": {}, "B": {}})
+    cache.get_many(["A"])
+    cache.put_many({"C": {}})
+
+    assert list(cache._lru) == ["A", "C"]
+
+
+def test_ttl_is_set_on_create_and_not_extended(redis_conn):
+    cache = make_cache(redis_conn)
+    cache.put_many({"ATP": {}})
+    assert 0 < redis_conn.ttl("rcsb:chemcomp") <= 3600
+
+    redis_conn.expire("rcsb:chemcomp", 100)
+    cache.put_many({"HEM": {}})
+
+    assert redis_conn.ttl("rcsb:chemcomp") <= 100
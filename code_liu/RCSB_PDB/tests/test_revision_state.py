@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+# @Time    : 2026/10/17 19:40
+# @User  : 刘子都
+# @Descriotion  : RevisionState：HMGET 预取判重、写缓冲批量 HSET、预取异常回退与游标只前进
+"""
+
+from unittest import mock
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+mongomock = pytest.importorskip("mongomock")
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.spiders.rcsb_pdb.services import RevisionState
+
+HASH = "rcsb_all_api:revision"
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().db.rcsb_increment_state
+
+
+def make_state(collection, redis_conn, **kwargs):
+    options = {"ttl_seconds": 3600, "overlap_days": 1, "flush_size": 2, "flush_interval": 3600}
+    options.update(kwargs)
+    return RevisionState(collection, redis_conn, "rcsb_all_api", HASH, **options)
+
+
+def test_prefetch_answers_is_duplicate_without_extra_reads(collection, redis_conn):
+    redis_conn.hset(HASH, mapping={"1ABC": "2026-01-01T00:00:00Z"})
+    state = make_state(collection, redis_conn)
+    state.prefetch(["1ABC", "2ABC"])
+
+    with mock.patch.object(redis_conn, "hget", side_effect=AssertionError("unexpected HGET")):
+        assert state.is_duplicate("1ABC", "2026-01-01T00:00:00Z")
+        assert not state.is_duplicate("2ABC", "2026-01-01T00:00:00Z")
+
+    # 预取结果用过即弹出
+    assert state._prefetched == {}
+
+
+def test_newer_revision_is_not_duplicate(collection, redis_conn):
+    redis_conn.hset(HASH, mapping={"1ABC": "2026-01-01T00:00:00Z"})
+    state = make_state(collection, redis_conn)
+
+    assert not state.is_duplicate("1ABC", "2026-02-01T00:00:00Z")
+
+
+def test_prefetch_failure_falls_back_to_single_reads(collection, redis_conn):
+    redis_conn.hset(HASH, mapping={"1ABC": "2026-01-01T00:00:00Z"})
+    state = make_state(collection, redis_conn)
+
+    with mock.patch.object(redis_conn, "hmget", side_effect=RedisConnectionError("down")):
+        state.prefetch(["1ABC"])
+
+    assert state._prefetched == {}
+    assert state.is_duplicate("1ABC", "2026-01-01T00:00:00Z")
+
+
+def test_discard_releases_prefetched_entry(collection, redis_conn):
+    state = make_state(collection, redis_conn)
+    state.prefetch(["1ABC"])
+
+    state.discard("1ABC")
+
+    assert state._prefetched == {}
+
+
+def test_writes_are_buffered_until_flush_size(collection, redis_conn):
+    state = make_state(collection, redis_conn)
+
+    state.persist_revision("1ABC", "2026-01-01T00:00:00Z")
+    assert not redis_conn.exists(HASH)
+    assert state.is_duplicate("1ABC", "2026-01-01T00:00:00Z")
+
+    state.persist_revision("2ABC", "2026-01-02T00:00:00Z")
+    assert redis_conn.hgetall(HASH) == {"1ABC": "2026-01-01T00:00:00Z", "2ABC": "2026-01-02T00:00:00Z"}
+    assert redis_conn.ttl(HASH) > 0
+
+
+def test_flush_if_stale_writes_after_interval(collection, redis_conn):
+    state = make_state(collection, redis_conn, flush_interval=0)
+    state._pending_writes["1ABC"] = "2026-01-01T00:00:00Z"
+
+    state.flush_if_stale()
+
+    assert redis_conn.hget(HASH, "1ABC") == "2026-01-01T00:00:00Z"
+
+
+def test_failed_write_keeps_buffer(collection, redis_conn):
+    state = make_state(collection, redis_conn)
+    state._pending_writes["1ABC"] = "2026-01-01T00:00:00Z"
+
+    with mock.patch.object(redis_conn, "pipeline", side_effect=RedisConnectionError("down")):
+        state.flush_revisions()
+
+    assert state._pending_writes == {"1ABC": "2026-01-01T00:00:00Z"}
+
+
+
+def test_cursor_only_moves_forward(collection, redis_conn):
+    collection.insert_one({"_id": "rcsb_all_api", "last_revision": "2026-03-01T00:00:00Z"})
+    state = make_state(collection, redis_conn)
+    assert state.increment_start == "2026-02-28T00:00:00Z"
+
+    state.run_max_revision = "2026-02-01T00:00:00Z"
+    state.flush()
+
+    assert collection.find_one({"_id": "rcsb_all_api"})["last_revision"] == "2026-03-01T00:00:00Z"